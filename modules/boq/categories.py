@@ -0,0 +1,190 @@
+from array import array
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from modules.boq.models import BOQCategory, BOQItem
+
+ZERO = Decimal("0")
+CATEGORY = "category"
+ITEM = "item"
+SUBTOTAL = "subtotal"
+
+class CategoryTreeError(ValueError):
+    pass
+
+class _Fenwick:
+    """Prefix sums of Decimals with O(log n) point updates."""
+
+    def __init__(self, values: Sequence[Decimal]):
+        size = len(values)
+        self.tree = [ZERO] + list(values)
+        for position in range(1, size + 1):
+            parent = position + (position & -position)
+            if parent <= size:
+                self.tree[parent] += self.tree[position]
+
+    def add(self, position: int, delta: Decimal) -> None:
+        position += 1
+        tree = self.tree
+        while position < len(tree):
+            tree[position] += delta
+            position += position & -position
+
+    def prefix(self, end: int) -> Decimal:
+        """Sum of positions [0, end)."""
+        total, tree = ZERO, self.tree
+        while end > 0:
+            total += tree[end]
+            end -= end & -end
+        return total
+
+    def range(self, start: int, end: int) -> Decimal:
+        return self.prefix(end) - self.prefix(start)
+
+@dataclass
+class BillLine:
+    kind: str  # CATEGORY, ITEM or SUBTOTAL
+    depth: int
+    category: BOQCategory
+    item: Optional[BOQItem] = None
+    amount: Decimal = ZERO
+    provisional_amount: Decimal = ZERO
+
+class BOQCategoryTree:
+    """Pre-order view of one project's BOQ categories with range-sum subtotals.
+
+    Siblings are ordered by (sequence_order, code). Each category's subtree is
+    the contiguous slice [position, end) of the pre-order arrays, so subtotals
+    of BOQItem.amount, and of its provisional-sum share, are range sums over
+    per-category totals held in Fenwick trees. Adding, changing or removing an
+    item updates one position in O(log n); no subtotal has to be recomputed.
+    """
+
+    def __init__(self, categories: Sequence[BOQCategory], items: Iterable[BOQItem] = ()):
+        by_id: Dict[str, BOQCategory] = {}
+        for category in categories:
+            if category.id in by_id:
+                raise CategoryTreeError(f"duplicate BOQ category id {category.id}")
+            by_id[category.id] = category
+        children: Dict[Optional[str], List[BOQCategory]] = {}
+        for category in categories:
+            if category.parent_category_id is not None and category.parent_category_id not in by_id:
+                raise CategoryTreeError(f"BOQ category {category.id} references unknown parent "
+                                        f"{category.parent_category_id}")
+            children.setdefault(category.parent_category_id, []).append(category)
+        for siblings in children.values():
+            siblings.sort(key=lambda c: (c.sequence_order, c.code))
+
+        self.categories: List[BOQCategory] = []
+        self.parent = array('l')
+        self.depth = array('l')
+        stack: List[Tuple[BOQCategory, int, int]] = [(category, -1, 0) for category in reversed(children.get(None, []))]
+        while stack:
+            category, parent, depth = stack.pop()
+            position = len(self.categories)
+            self.categories.append(category)
+            self.parent.append(parent)
+            self.depth.append(depth)
+            stack.extend((child, position, depth + 1) for child in reversed(children.get(category.id, [])))
+
+        if len(self.categories) != len(by_id):
+            reached = {category.id for category in self.categories}
+            stuck = sorted(category_id for category_id in by_id if category_id not in reached)
+            raise CategoryTreeError(f"BOQ category parent links form a cycle through {', '.join(stuck[:10])}")
+
+        size = len(self.categories)
+        self.ids: List[str] = [category.id for category in self.categories]
+        self.index: Dict[str, int] = {category_id: i for i, category_id in enumerate(self.ids)}
+        # end[p]: one past the last descendant of p in pre-order.
+        self.end = array('l', range(1, size + 1))
+        for position in range(size - 1, -1, -1):
+            parent = self.parent[position]
+            if parent >= 0 and self.end[position] > self.end[parent]:
+                self.end[parent] = self.end[position]
+
+        self.items: Dict[str, Dict[str, BOQItem]] = {category_id: {} for category_id in self.ids}
+        self._placed: Dict[str, Tuple[int, Decimal, bool]] = {}  # item id -> position, amount, provisional
+        amounts = [ZERO] * size
+        provisional = [ZERO] * size
+        for item in items:
+            if item.id in self._placed:
+                raise CategoryTreeError(f"duplicate BOQ item id {item.id}")
+            position = self._position(item)
+            self.items[item.category_id][item.id] = item
+            self._placed[item.id] = (position, item.amount, item.is_provisional)
+            amounts[position] += item.amount
+            if item.is_provisional:
+                provisional[position] += item.amount
+        self._amounts = _Fenwick(amounts)
+        self._provisional = _Fenwick(provisional)
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def _position(self, item: BOQItem) -> int:
+        position = self.index.get(item.category_id)
+        if position is None:
+            raise CategoryTreeError(f"BOQ item {item.id} references unknown category {item.category_id}")
+        return position
+
+    def remove_item(self, item_id: str) -> None:
+        placed = self._placed.pop(item_id, None)
+        if placed is None:
+            return
+        position, amount, is_provisional = placed
+        del self.items[self.ids[position]][item_id]
+        self._amounts.add(position, -amount)
+        if is_provisional:
+            self._provisional.add(position, -amount)
+
+    def upsert_item(self, item: BOQItem) -> None:
+        """Add an item or apply a change to one already placed (amount, category or provisional flag)."""
+        position = self._position(item)
+        self.remove_item(item.id)
+        self.items[item.category_id][item.id] = item
+        self._placed[item.id] = (position, item.amount, item.is_provisional)
+        self._amounts.add(position, item.amount)
+        if item.is_provisional:
+            self._provisional.add(position, item.amount)
+
+    def subtotal(self, category_id: str, include_children: bool = True) -> Decimal:
+        position = self.index[category_id]
+        return self._amounts.range(position, self.end[position] if include_children else position + 1)
+
+    def provisional_subtotal(self, category_id: str, include_children: bool = True) -> Decimal:
+        position = self.index[category_id]
+        return self._provisional.range(position, self.end[position] if include_children else position + 1)
+
+    def firm_subtotal(self, category_id: str, include_children: bool = True) -> Decimal:
+        return self.subtotal(category_id, include_children) - self.provisional_subtotal(category_id, include_children)
+
+    def total(self) -> Decimal:
+        return self._amounts.prefix(len(self.categories))
+
+    def descendants(self, category_id: str) -> List[str]:
+        position = self.index[category_id]
+        return self.ids[position + 1:self.end[position]]
+
+    def flatten(self) -> Iterator[BillLine]:
+        """The printed bill: each category heading, its items by item_code, then its subcategories,
+        closed by a subtotal line once its whole subtree has been emitted."""
+        open_categories: List[int] = []
+
+        def close(position: int) -> BillLine:
+            start, end = position, self.end[position]
+            return BillLine(SUBTOTAL, self.depth[position], self.categories[position],
+                            amount=self._amounts.range(start, end),
+                            provisional_amount=self._provisional.range(start, end))
+
+        for position, category in enumerate(self.categories):
+            while open_categories and self.end[open_categories[-1]] <= position:
+                yield close(open_categories.pop())
+            depth = self.depth[position]
+            yield BillLine(CATEGORY, depth, category)
+            for item in sorted(self.items[category.id].values(), key=lambda item: item.item_code):
+                yield BillLine(ITEM, depth + 1, category, item, item.amount,
+                               item.amount if item.is_provisional else ZERO)
+            open_categories.append(position)
+        while open_categories:
+            yield close(open_categories.pop())
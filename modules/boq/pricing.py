@@ -0,0 +1,156 @@
+from datetime import datetime
+from decimal import Context, Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from modules.boq.models import BOQItem, RateCard
+from modules.core.intervals import EffectiveIntervals
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+# Wide enough that quantity x rate products are exact before the final quantize.
+EXACT = Context(prec=60, rounding=ROUND_HALF_UP, traps=[InvalidOperation])
+
+RateKey = Tuple[str, str]  # project_id, item_code
+
+def _effective(card: RateCard) -> datetime:
+    return card.effective_date
+
+def _expiry(card: RateCard) -> Optional[datetime]:
+    return card.expiry_date
+
+class RateCardIndex:
+    """RateCards per (project, item code) as effective-dated intervals, with upserts by card id.
+
+    A card is in force until its expiry or the next card's effective date, so
+    an expired card never hands back to the one it replaced.
+    """
+
+    def __init__(self, cards: Iterable[RateCard] = ()):
+        self.cards: Dict[str, RateCard] = {}
+        self._intervals: Dict[RateKey, EffectiveIntervals[RateCard]] = {}
+        for card in cards:
+            self.upsert(card)
+
+    def _remove(self, card: RateCard) -> None:
+        key = (card.project_id, card.item_code)
+        intervals = self._intervals[key]
+        intervals.remove(card)
+        if not intervals:
+            del self._intervals[key]
+
+    def upsert(self, card: RateCard) -> Set[RateKey]:
+        """Add or replace a card; returns the keys whose rates may have changed."""
+        affected = {(card.project_id, card.item_code)}
+        previous = self.cards.get(card.id)
+        if previous is not None:
+            self._remove(previous)
+            affected.add((previous.project_id, previous.item_code))
+        self.cards[card.id] = card
+        intervals = self._intervals.get((card.project_id, card.item_code))
+        if intervals is None:
+            intervals = self._intervals[card.project_id, card.item_code] = EffectiveIntervals(_effective, _expiry)
+        intervals.add(card)
+        return affected
+
+    def remove(self, card_id: str) -> Set[RateKey]:
+        card = self.cards.pop(card_id, None)
+        if card is None:
+            return set()
+        self._remove(card)
+        return {(card.project_id, card.item_code)}
+
+    def lookup(self, project_id: str, item_code: str, as_of: datetime) -> Optional[RateCard]:
+        """The card in force on ``as_of``, or None when none is."""
+        intervals = self._intervals.get((project_id, item_code))
+        return None if intervals is None else intervals.at(as_of)
+
+def unit_rate(card: RateCard, exponent: Decimal = CENT) -> Decimal:
+    return EXACT.multiply(card.base_rate, card.location_factor).quantize(exponent, context=EXACT)
+
+def line_amount(quantity: Decimal, rate: Decimal, exponent: Decimal = CENT) -> Decimal:
+    return EXACT.multiply(quantity, rate).quantize(exponent, context=EXACT)
+
+class BOQPricer:
+    """Prices BOQ lines from a RateCardIndex: rate = base_rate x location_factor, amount = quantity x rate.
+
+    Lines are grouped by (project, item code), so each rate is resolved once
+    per group rather than once per line, and re-pricing after a rate card
+    change touches only the groups whose codes changed. Items are updated in
+    place; lines with no card in force keep their rate and are listed in
+    ``unpriced``. ``totals`` holds the running amount per project.
+    """
+
+    def __init__(self, index: RateCardIndex, as_of: Optional[datetime] = None,
+                 rate_exponent: Decimal = CENT, amount_exponent: Decimal = CENT):
+        self.index = index
+        self.as_of = as_of
+        self.rate_exponent = rate_exponent
+        self.amount_exponent = amount_exponent
+        self.lines: Dict[RateKey, Dict[str, BOQItem]] = {}
+        self.keys: Dict[str, RateKey] = {}
+        self.unpriced: Set[str] = set()
+        self.totals: Dict[str, Decimal] = {}
+
+    def _rate(self, key: RateKey) -> Optional[Decimal]:
+        card = self.index.lookup(key[0], key[1], self.as_of or datetime.now())
+        return None if card is None else unit_rate(card, self.rate_exponent)
+
+    def _reprice(self, key: RateKey, items: Iterable[BOQItem], now: datetime) -> List[BOQItem]:
+        rate = self._rate(key)
+        changed = []
+        totals, exponent = self.totals, self.amount_exponent
+        for item in items:
+            if rate is None:
+                self.unpriced.add(item.id)
+                continue
+            self.unpriced.discard(item.id)
+            amount = line_amount(item.quantity, rate, exponent)
+            if item.rate != rate or item.amount != amount:
+                totals[item.project_id] = totals.get(item.project_id, ZERO) + amount - item.amount
+                item.rate, item.amount, item.updated_at = rate, amount, now
+                changed.append(item)
+        return changed
+
+    def add(self, items: Iterable[BOQItem]) -> List[BOQItem]:
+        """Track and price lines; returns the items whose rate or amount changed."""
+        groups: Dict[RateKey, List[BOQItem]] = {}
+        for item in items:
+            self.remove(item.id)
+            key = self.keys[item.id] = (item.project_id, item.item_code)
+            self.lines.setdefault(key, {})[item.id] = item
+            self.totals[item.project_id] = self.totals.get(item.project_id, ZERO) + item.amount
+            groups.setdefault(key, []).append(item)
+        now = datetime.now()
+        return [item for key, group in groups.items() for item in self._reprice(key, group, now)]
+
+    def remove(self, item_id: str) -> None:
+        key = self.keys.pop(item_id, None)
+        if key is None:
+            return
+        item = self.lines[key].pop(item_id)
+        if not self.lines[key]:
+            del self.lines[key]
+        self.totals[item.project_id] -= item.amount
+        self.unpriced.discard(item_id)
+
+    def reprice(self, keys: Optional[Iterable[RateKey]] = None) -> List[BOQItem]:
+        """Re-price the lines under ``keys``, or every tracked line (e.g. after moving ``as_of``)."""
+        now = datetime.now()
+        changed: List[BOQItem] = []
+        for key in (self.lines if keys is None else keys):
+            group = self.lines.get(key)
+            if group:
+                changed.extend(self._reprice(key, group.values(), now))
+        return changed
+
+    def update_rate_cards(self, cards: Iterable[RateCard] = (), removed_card_ids: Iterable[str] = ()) -> List[BOQItem]:
+        """Apply rate card upserts and removals, re-pricing only lines on the affected codes."""
+        affected: Set[RateKey] = set()
+        for card in cards:
+            affected |= self.index.upsert(card)
+        for card_id in removed_card_ids:
+            affected |= self.index.remove(card_id)
+        return self.reprice(affected)
+
+    def total(self, project_id: str) -> Decimal:
+        return self.totals.get(project_id, ZERO)
@@ -0,0 +1,188 @@
+from collections import OrderedDict
+import dataclasses
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from modules.boq.models import BOQItem, BOQRevision
+
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+ZERO = Decimal("0")
+
+State = Dict[str, BOQItem]  # item_code -> line
+
+class RevisionError(ValueError):
+    pass
+
+def _content(item: BOQItem) -> Tuple:
+    """Everything that makes two lines with the same item code differ, ignoring ids and timestamps."""
+    return (item.quantity, item.rate, item.amount, item.description, item.specification, item.unit,
+            item.unit_type, item.category_id, item.trade_id, item.wbs_node_id, item.is_provisional)
+
+@dataclass
+class LineChange:
+    item_code: str
+    change: str
+    old: Optional[BOQItem]
+    new: Optional[BOQItem]
+
+    @property
+    def quantity_delta(self) -> Decimal:
+        return (self.new.quantity if self.new else ZERO) - (self.old.quantity if self.old else ZERO)
+
+    @property
+    def rate_delta(self) -> Decimal:
+        return (self.new.rate if self.new else ZERO) - (self.old.rate if self.old else ZERO)
+
+    @property
+    def amount_delta(self) -> Decimal:
+        return (self.new.amount if self.new else ZERO) - (self.old.amount if self.old else ZERO)
+
+@dataclass
+class RevisionDiff:
+    from_revision_id: Optional[str]
+    to_revision_id: str
+    changes: List[LineChange] = field(default_factory=list)
+    category_deltas: Dict[str, Decimal] = field(default_factory=dict)
+    total_delta: Decimal = ZERO
+
+@dataclass
+class _Delta:
+    upserts: State
+    removed: Set[str]
+    checkpoint: Optional[State] = None
+
+    @property
+    def touched(self) -> Set[str]:
+        return self.removed.union(self.upserts)
+
+def _diff(old: State, new: State, codes: Iterable[str], from_id: Optional[str], to_id: str) -> RevisionDiff:
+    diff = RevisionDiff(from_id, to_id)
+    deltas = diff.category_deltas
+    for code in codes:
+        before, after = old.get(code), new.get(code)
+        if before is after:
+            continue
+        if before is None:
+            change = ADDED
+        elif after is None:
+            change = REMOVED
+        elif _content(before) == _content(after):
+            continue
+        else:
+            change = CHANGED
+        diff.changes.append(LineChange(code, change, before, after))
+        if before is not None:
+            deltas[before.category_id] = deltas.get(before.category_id, ZERO) - before.amount
+        if after is not None:
+            deltas[after.category_id] = deltas.get(after.category_id, ZERO) + after.amount
+    diff.category_deltas = {category: delta for category, delta in deltas.items() if delta}
+    diff.total_delta = sum(diff.category_deltas.values(), ZERO)
+    return diff
+
+class BOQRevisionStore:
+    """BOQ revisions stored as line deltas keyed by item_code, with a full checkpoint every few revisions.
+
+    Lines are copied on commit, so later in-place edits by the caller (such
+    as BOQPricer re-pricing) never reach stored history. Each revision keeps
+    only the lines added, changed or removed since the previous one; unchanged
+    lines are shared between revisions, not copied again. Reading a revision
+    replays at most ``checkpoint_every - 1`` deltas onto the nearest
+    checkpoint, and recently read states are cached. Diffs between any two
+    revisions only hash-join the item codes touched by the deltas in between.
+    """
+
+    def __init__(self, checkpoint_every: int = 10, cache_size: int = 4):
+        if checkpoint_every < 1:
+            raise RevisionError("checkpoint_every must be at least 1")
+        self.checkpoint_every = checkpoint_every
+        self.cache_size = cache_size
+        self.revisions: List[BOQRevision] = []
+        self.position: Dict[str, int] = {}
+        self._deltas: List[_Delta] = []
+        self._states: "OrderedDict[int, State]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.revisions)
+
+    def _index(self, revision_id: str) -> int:
+        try:
+            return self.position[revision_id]
+        except KeyError:
+            raise RevisionError(f"unknown BOQ revision {revision_id}") from None
+
+    def _cache(self, position: int, state: State) -> State:
+        self._states[position] = state
+        self._states.move_to_end(position)
+        while len(self._states) > self.cache_size:
+            self._states.popitem(last=False)
+        return state
+
+    def _state(self, position: int) -> State:
+        state = self._states.get(position)
+        if state is not None:
+            self._states.move_to_end(position)
+            return state
+        base = position
+        while self._deltas[base].checkpoint is None and base - 1 not in self._states:
+            base -= 1
+        if self._deltas[base].checkpoint is not None:
+            state = dict(self._deltas[base].checkpoint)
+        else:
+            state = dict(self._states[base - 1])
+            base -= 1
+        for delta in self._deltas[base + 1:position + 1]:
+            for code in delta.removed:
+                del state[code]
+            state.update(delta.upserts)
+        return self._cache(position, state)
+
+    def commit(self, revision: BOQRevision, items: Iterable[BOQItem]) -> RevisionDiff:
+        """Store the full line set of a new revision; sets its total_amount and returns the diff from the last one."""
+        if revision.id in self.position:
+            raise RevisionError(f"BOQ revision {revision.id} is already stored")
+        position = len(self.revisions)
+        old = self._state(position - 1) if position else {}
+        # Hash join on item code. Only new or changed lines are copied; unchanged ones share the stored copy.
+        new: State = {}
+        upserts: State = {}
+        for item in items:
+            code = item.item_code
+            if code in new:
+                raise RevisionError(f"item code {code} appears twice in revision {revision.id}")
+            previous = old.get(code)
+            if previous is not None and _content(previous) == _content(item):
+                new[code] = previous
+            else:
+                new[code] = upserts[code] = dataclasses.replace(item)
+        removed = {code for code in old if code not in new}
+        delta = _Delta(upserts, removed, new if position % self.checkpoint_every == 0 else None)
+        diff = _diff(old, new, delta.touched, self.revisions[-1].id if position else None, revision.id)
+
+        revision.total_amount = sum((item.amount for item in new.values()), ZERO)
+        self.revisions.append(revision)
+        self.position[revision.id] = position
+        self._deltas.append(delta)
+        self._cache(position, new)
+        return diff
+
+    def state(self, revision_id: str) -> State:
+        """Lines of a revision by item code; treat as read-only, it may be shared with the cache."""
+        return self._state(self._index(revision_id))
+
+    def items(self, revision_id: str) -> List[BOQItem]:
+        return list(self.state(revision_id).values())
+
+    def diff(self, from_revision_id: str, to_revision_id: str) -> RevisionDiff:
+        start, end = self._index(from_revision_id), self._index(to_revision_id)
+        touched: Set[str] = set()
+        for delta in self._deltas[min(start, end) + 1:max(start, end) + 1]:
+            touched |= delta.touched
+        return _diff(self._state(start), self._state(end), touched, from_revision_id, to_revision_id)
+
+    def stored_lines(self) -> int:
+        """Line references held by deltas and checkpoints, against len(revisions) x lines for full snapshots."""
+        return sum(len(delta.upserts) + len(delta.removed) + len(delta.checkpoint or ())
+                   for delta in self._deltas)
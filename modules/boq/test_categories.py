@@ -0,0 +1,49 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from modules.boq.categories import CATEGORY, ITEM, SUBTOTAL, BOQCategoryTree, CategoryTreeError
+from modules.boq.models import BOQCategory, BOQItem, UnitType
+
+NOW = datetime(2025, 1, 1)
+
+def _category(category_id: str, parent=None, order: int = 0) -> BOQCategory:
+    return BOQCategory(category_id, "p1", category_id, category_id, None, parent, order)
+
+def _item(item_id: str, category_id: str, amount: str, provisional: bool = False) -> BOQItem:
+    return BOQItem(item_id, "p1", None, item_id, item_id, None, "m2", UnitType.AREA, Decimal("1"), Decimal(amount),
+                   Decimal(amount), category_id, None, provisional, NOW, NOW)
+
+def _tree(items=()):
+    categories = [_category("sub", order=1), _category("civil", order=0), _category("civil.1", "civil"),
+                  _category("civil.2", "civil", order=1)]
+    return BOQCategoryTree(categories, items)
+
+def test_subtotals_follow_item_changes():
+    tree = _tree([_item("a", "civil.1", "100.00"), _item("b", "civil.2", "40.00", provisional=True),
+                  _item("c", "sub", "7.00")])
+    assert tree.ids == ["civil", "civil.1", "civil.2", "sub"]
+    assert tree.subtotal("civil") == Decimal("140.00")
+    assert tree.provisional_subtotal("civil") == Decimal("40.00")
+    assert tree.firm_subtotal("civil") == Decimal("100.00")
+
+    tree.upsert_item(_item("a", "civil.2", "60.00"))
+    tree.remove_item("c")
+    assert tree.subtotal("civil.1") == Decimal("0.00")
+    assert tree.subtotal("civil.2") == Decimal("100.00")
+    assert tree.total() == Decimal("100.00")
+
+def test_flatten_closes_each_category_with_its_subtotal():
+    tree = _tree([_item("a", "civil.1", "100.00"), _item("c", "sub", "7.00")])
+    lines = [(line.kind, line.category.id, line.amount) for line in tree.flatten()]
+    assert lines == [
+        (CATEGORY, "civil", Decimal("0")), (CATEGORY, "civil.1", Decimal("0")), (ITEM, "civil.1", Decimal("100.00")),
+        (SUBTOTAL, "civil.1", Decimal("100.00")), (CATEGORY, "civil.2", Decimal("0")),
+        (SUBTOTAL, "civil.2", Decimal("0")), (SUBTOTAL, "civil", Decimal("100.00")),
+        (CATEGORY, "sub", Decimal("0")), (ITEM, "sub", Decimal("7.00")), (SUBTOTAL, "sub", Decimal("7.00")),
+    ]
+
+def test_duplicate_item_ids_are_rejected():
+    with pytest.raises(CategoryTreeError):
+        _tree([_item("a", "civil.1", "1.00"), _item("a", "civil.2", "2.00")])
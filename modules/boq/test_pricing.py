@@ -0,0 +1,36 @@
+from datetime import datetime
+from decimal import Decimal
+
+from modules.boq.models import BOQItem, RateCard, UnitType
+from modules.boq.pricing import BOQPricer, RateCardIndex
+
+NOW = datetime(2025, 1, 1)
+
+def _card(card_id: str, rate: str, start: datetime, expiry=None) -> RateCard:
+    return RateCard(card_id, "p1", "A1", "Blockwork", "m2", Decimal(rate), Decimal("1.10"), start, expiry, None)
+
+def test_expired_card_does_not_fall_back_to_the_card_it_replaced():
+    index = RateCardIndex([_card("old", "10.00", datetime(2024, 1, 1)),
+                           _card("new", "12.00", datetime(2024, 6, 1), expiry=datetime(2024, 12, 31))])
+    assert index.lookup("p1", "A1", datetime(2023, 12, 31)) is None
+    assert index.lookup("p1", "A1", datetime(2024, 5, 31)).id == "old"
+    assert index.lookup("p1", "A1", datetime(2024, 12, 31)).id == "new"
+    assert index.lookup("p1", "A1", datetime(2025, 1, 1)) is None
+
+def test_lines_without_a_card_in_force_are_unpriced():
+    index = RateCardIndex([_card("old", "10.00", datetime(2024, 1, 1)),
+                           _card("new", "12.00", datetime(2024, 6, 1), expiry=datetime(2024, 12, 31))])
+    item = BOQItem("i1", "p1", None, "A1", "Blockwork", None, "m2", UnitType.AREA, Decimal("10"),
+                   Decimal("0"), Decimal("0"), "cat", None, False, NOW, NOW)
+    pricer = BOQPricer(index, as_of=datetime(2024, 7, 1))
+    pricer.add([item])
+    assert (item.rate, item.amount) == (Decimal("13.20"), Decimal("132.00"))
+
+    pricer.as_of = datetime(2025, 2, 1)
+    assert pricer.reprice() == []
+    assert pricer.unpriced == {"i1"}
+    assert item.rate == Decimal("13.20")
+
+    pricer.update_rate_cards(removed_card_ids=["new"])
+    assert pricer.unpriced == set()
+    assert (item.rate, item.amount) == (Decimal("11.00"), Decimal("110.00"))
@@ -0,0 +1,31 @@
+from datetime import datetime
+from decimal import Decimal
+
+from modules.boq.models import BOQItem, BOQRevision, BOQStatus, UnitType
+from modules.boq.revisions import CHANGED, BOQRevisionStore
+
+NOW = datetime(2025, 1, 1)
+
+def _item(code: str, quantity: str, rate: str) -> BOQItem:
+    return BOQItem(f"id-{code}", "p1", None, code, code, None, "m2", UnitType.AREA, Decimal(quantity),
+                   Decimal(rate), Decimal(quantity) * Decimal(rate), "cat", None, False, NOW, NOW)
+
+def _revision(number: int) -> BOQRevision:
+    return BOQRevision(f"r{number}", "p1", str(number), "", BOQStatus.DRAFT, Decimal("0"), None, None, "u", NOW)
+
+def test_items_changed_in_place_are_diffed_and_history_is_kept():
+    store = BOQRevisionStore(checkpoint_every=1)
+    line, other = _item("A1", "10", "2.00"), _item("B1", "5", "3.00")
+    store.commit(_revision(1), [line, other])
+
+    line.rate = Decimal("2.50")
+    line.amount = Decimal("25.00")
+    diff = store.commit(_revision(2), [line, other])
+
+    assert [(change.item_code, change.change) for change in diff.changes] == [("A1", CHANGED)]
+    assert diff.changes[0].rate_delta == Decimal("0.50")
+    assert diff.total_delta == Decimal("5.00")
+    assert store.state("r1")["A1"].rate == Decimal("2.00")
+    assert store.state("r1")["A1"].amount == Decimal("20.00")
+    assert store.revisions[0].total_amount == Decimal("35.00")
+    assert store.diff("r1", "r2").total_delta == Decimal("5.00")
@@ -0,0 +1,72 @@
+"""Codec throughput against the naive asdict + manual construction path.
+
+Run with ``python -m modules.core.bench_codecs [rows]``.
+"""
+import dataclasses
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from modules.core.codecs import codec_for
+from modules.stores.models import StockMovement, StockMovementType
+
+def _sample(rows: int):
+    start = datetime(2026, 1, 1)
+    kinds = list(StockMovementType)
+    return [
+        StockMovement(
+            id=f"mov-{i:08d}", store_id=f"store-{i % 200}", stock_item_id=f"item-{i % 5000}",
+            movement_type=kinds[i % len(kinds)], reference_number=f"PO-{i // 10}", reference_type="PO",
+            quantity=Decimal(i % 997) / 4, unit_cost=Decimal("12.50"), total_cost=Decimal(i % 997) * 3,
+            from_location_id=None, to_location_id=f"loc-{i % 50}", movement_date=start + timedelta(minutes=i),
+            created_by=f"user-{i % 300}", notes=None, created_at=start + timedelta(seconds=i),
+        )
+        for i in range(rows)
+    ]
+
+def _naive_dumps(records) -> str:
+    def default(value):
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, StockMovementType):
+            return value.value
+        raise TypeError(type(value))
+    return json.dumps([dataclasses.asdict(record) for record in records], default=default)
+
+def _naive_loads(text: str):
+    records = []
+    for row in json.loads(text):
+        row["movement_type"] = StockMovementType(row["movement_type"])
+        for name in ("quantity", "unit_cost", "total_cost"):
+            row[name] = Decimal(str(row[name]))
+        for name in ("movement_date", "created_at"):
+            row[name] = datetime.fromisoformat(row[name])
+        records.append(StockMovement(**row))
+    return records
+
+def _timed(label: str, rows: int, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<28}{elapsed * 1000:>10.1f} ms{rows / elapsed:>14,.0f} rows/s")
+    return result
+
+def main(rows: int = 200_000) -> None:
+    records = _sample(rows)
+    codec = codec_for(StockMovement)
+    text = _timed("naive asdict + dumps", rows, _naive_dumps, records)
+    assert _timed("naive loads + construct", rows, _naive_loads, text) == records
+    text = _timed("codec dumps_many", rows, codec.dumps_many, records)
+    assert _timed("codec loads_many", rows, codec.loads_many, text) == records
+    packed = _timed("codec pack_many", rows, codec.pack_many, records)
+    assert _timed("codec unpack_many", rows, codec.unpack_many, packed) == records
+    row_tuples = [tuple(getattr(record, name) for name in codec.columns) for record in records]
+    assert _timed("codec from_rows", rows, codec.from_rows, row_tuples) == records
+    print(f"json {len(text):,} bytes, binary {len(packed):,} bytes")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,318 @@
+import json
+import struct
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Callable, Dict, Generic, Iterable, List, Sequence, Tuple, Type, TypeVar
+
+from modules.core.fields import FieldKind, FieldSpec, field_specs
+
+T = TypeVar("T")
+
+MAGIC = b"ERC1"
+EPOCH = datetime(1970, 1, 1)
+NAIVE = -32768  # utc offset marker for naive datetimes
+
+_U32 = struct.Struct("<I")
+_MICROSECOND = timedelta(microseconds=1)
+_MINUTE = timedelta(minutes=1)
+
+def _decimal(value) -> Decimal:
+    if value.__class__ is Decimal:
+        return value
+    return Decimal(repr(value) if value.__class__ is float else value)
+
+def _datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+def _date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+def _datetime_parts(value: datetime) -> Tuple[int, int]:
+    offset = value.utcoffset()
+    if offset is None:
+        return (value - EPOCH) // _MICROSECOND, NAIVE
+    return (value.replace(tzinfo=None) - offset - EPOCH) // _MICROSECOND, offset // _MINUTE
+
+def _from_datetime_parts(micros: int, offset: int) -> datetime:
+    value = EPOCH + timedelta(microseconds=micros)
+    if offset == NAIVE:
+        return value
+    tz = timezone.utc if offset == 0 else timezone(timedelta(minutes=offset))
+    return (value + timedelta(minutes=offset)).replace(tzinfo=tz)
+
+def _encode_str_list(values: List[str]) -> bytes:
+    parts = [value.encode() for value in values]
+    return struct.pack(f"<{len(parts)}I", *map(len, parts)) + b"".join(parts) if parts else b""
+
+def _decode_str_list(data: bytes, count: int) -> List[str]:
+    sizes = struct.unpack_from(f"<{count}I", data)
+    values, offset = [], 4 * count
+    for size in sizes:
+        values.append(data[offset:offset + size].decode())
+        offset += size
+    return values
+
+def _encode_int_list(values: List[int]) -> bytes:
+    return struct.pack(f"<{len(values)}q", *values)
+
+def _decode_int_list(data: bytes, count: int) -> List[int]:
+    return list(struct.unpack(f"<{count}q", data))
+
+def _encode_str_dict(values: Dict[str, str]) -> bytes:
+    return _encode_str_list([item for pair in values.items() for item in pair])
+
+def _decode_str_dict(data: bytes, count: int) -> Dict[str, str]:
+    items = _decode_str_list(data, 2 * count)
+    return dict(zip(items[::2], items[1::2]))
+
+# Expressions per field kind; {v} is the field value.
+_TO_JSON = {
+    FieldKind.DECIMAL: "str({v})",
+    FieldKind.DATETIME: "{v}.isoformat()",
+    FieldKind.DATE: "{v}.isoformat()",
+    FieldKind.ENUM: "{v}.value",
+    FieldKind.STR_LIST: "list({v})",
+    FieldKind.INT_LIST: "list({v})",
+    FieldKind.STR_DICT: "dict({v})",
+}
+_FROM_JSON = {
+    FieldKind.FLOAT: "float({v})",
+    FieldKind.DECIMAL: "_decimal({v})",
+    FieldKind.DATETIME: "_datetime({v})",
+    FieldKind.DATE: "_date({v})",
+    FieldKind.ENUM: "_enum_{name}[{v}]",
+    FieldKind.STR_LIST: "list({v})",
+    FieldKind.INT_LIST: "list({v})",
+    FieldKind.STR_DICT: "dict({v})",
+}
+# Binary layout: one fixed-width header per record (presence flags, scalars,
+# byte lengths of variable fields), then the variable-length payloads in order.
+_HEADER_CODES = {
+    FieldKind.STR: "I",
+    FieldKind.DECIMAL: "I",
+    FieldKind.INT: "q",
+    FieldKind.FLOAT: "d",
+    FieldKind.BOOL: "?",
+    FieldKind.DATETIME: "qh",
+    FieldKind.DATE: "i",
+    FieldKind.ENUM: "B",
+    FieldKind.STR_LIST: "II",
+    FieldKind.INT_LIST: "II",
+    FieldKind.STR_DICT: "II",
+}
+_PAYLOAD = {
+    FieldKind.STR: "{v}.encode()",
+    FieldKind.DECIMAL: "str({v}).encode()",
+    FieldKind.STR_LIST: "_encode_str_list({v})",
+    FieldKind.INT_LIST: "_encode_int_list({v})",
+    FieldKind.STR_DICT: "_encode_str_dict({v})",
+}
+_FROM_PAYLOAD = {
+    FieldKind.STR: "{data}.decode()",
+    FieldKind.DECIMAL: "Decimal({data}.decode())",
+    FieldKind.STR_LIST: "_decode_str_list({data}, _c_{name})",
+    FieldKind.INT_LIST: "_decode_int_list({data}, _c_{name})",
+    FieldKind.STR_DICT: "_decode_str_dict({data}, _c_{name})",
+}
+_COLLECTIONS = {FieldKind.STR_LIST, FieldKind.INT_LIST, FieldKind.STR_DICT}
+
+def _convert(template: Dict[FieldKind, str], spec: FieldSpec, value: str) -> str:
+    expression = template.get(spec.kind)
+    if expression is None:
+        return value
+    converted = expression.format(v=value, name=spec.name)
+    if spec.optional:
+        return f"(None if {value} is None else {converted})"
+    return converted
+
+def _compile(cls: type, specs: Sequence[FieldSpec]) -> Dict[str, Callable]:
+    namespace: Dict[str, Any] = {
+        "cls": cls, "Decimal": Decimal, "date": date,
+        "_decimal": _decimal, "_datetime": _datetime, "_date": _date,
+        "_datetime_parts": _datetime_parts, "_from_datetime_parts": _from_datetime_parts,
+        "_encode_str_list": _encode_str_list, "_decode_str_list": _decode_str_list,
+        "_encode_int_list": _encode_int_list, "_decode_int_list": _decode_int_list,
+        "_encode_str_dict": _encode_str_dict, "_decode_str_dict": _decode_str_dict,
+    }
+    for spec in specs:
+        if spec.kind is FieldKind.OBJECT:
+            raise TypeError(f"{cls.__name__}.{spec.name}: no codec for this field type")
+        if spec.enum is not None:
+            members = list(spec.enum)
+            lookup = {member.value: member for member in members}
+            lookup.update((member, member) for member in members)
+            namespace[f"_enum_{spec.name}"] = lookup
+            namespace[f"_index_{spec.name}"] = {member: i for i, member in enumerate(members)}
+            namespace[f"_members_{spec.name}"] = members
+
+    lines = ["def to_dict(obj):", "    return {"]
+    for spec in specs:
+        value = f"obj.{spec.name}"
+        lines.append(f"        {spec.name!r}: {_convert(_TO_JSON, spec, value)},")
+    lines.append("    }")
+
+    lines += ["def from_dict(d):", "    return cls("]
+    for spec in specs:
+        value = f"d.get({spec.name!r})" if spec.optional else f"d[{spec.name!r}]"
+        if spec.optional and spec.kind in _FROM_JSON:
+            lines.append(f"        {spec.name}=(None if (_{spec.name} := {value}) is None else "
+                         f"{_FROM_JSON[spec.kind].format(v='_' + spec.name, name=spec.name)}),")
+        else:
+            lines.append(f"        {spec.name}={_convert(_FROM_JSON, spec, value)},")
+    lines.append("    )")
+
+    lines += ["def from_row(r):", "    " + ", ".join(f"_{spec.name}" for spec in specs) + (
+        ", = r" if len(specs) == 1 else " = r"), "    return cls("]
+    # Drivers usually return Decimal/datetime already; the converters pass those through.
+    for spec in specs:
+        lines.append(f"        {spec.name}={_convert(_FROM_JSON, spec, '_' + spec.name)},")
+    lines.append("    )")
+
+    header_format, header_args, header_names, payloads = "<", [], [], []
+    lines += ["def pack(obj):"]
+    for spec in specs:
+        name = spec.name
+        lines.append(f"    _{name} = obj.{name}")
+        if spec.optional:
+            header_format += "?"
+            header_args.append(f"_{name} is not None")
+            header_names.append(f"_p_{name}")
+        header_format += _HEADER_CODES[spec.kind]
+        if spec.kind in _PAYLOAD:
+            payload = _PAYLOAD[spec.kind].format(v=f"_{name}")
+            if spec.optional:
+                payload = f"(b'' if _{name} is None else {payload})"
+            lines.append(f"    _b_{name} = {payload}")
+            payloads.append(f"_b_{name}")
+            if spec.kind in _COLLECTIONS:
+                count = f"len(_{name})" if not spec.optional else f"(0 if _{name} is None else len(_{name}))"
+                header_args.append(count)
+                header_names.append(f"_c_{name}")
+            header_args.append(f"len(_b_{name})")
+            header_names.append(f"_n_{name}")
+        elif spec.kind is FieldKind.DATETIME:
+            parts = f"_datetime_parts(_{name})"
+            if spec.optional:
+                parts = f"((0, 0) if _{name} is None else {parts})"
+            header_args.append(f"*{parts}")
+            header_names += [f"_m_{name}", f"_o_{name}"]
+        else:
+            value = {FieldKind.DATE: f"_{name}.toordinal()", FieldKind.ENUM: f"_index_{name}[_{name}]"}.get(
+                spec.kind, f"_{name}")
+            if spec.optional:
+                value = f"(0 if _{name} is None else {value})"
+            header_args.append(value)
+            header_names.append(f"_{name}")
+    lines.append(f"    return b''.join((_HEADER.pack({', '.join(header_args)}), {', '.join(payloads)}))"
+                 if payloads else f"    return _HEADER.pack({', '.join(header_args)})")
+    namespace["_HEADER"] = header = struct.Struct(header_format)
+
+    lines += ["def unpack(b, o):", f"    {', '.join(header_names)}, = _HEADER.unpack_from(b, o)",
+              f"    o += {header.size}"]
+    for spec in specs:
+        name = spec.name
+        # Absent optionals are decoded as None without touching their zeroed header slots or empty payloads.
+        if spec.kind in _FROM_PAYLOAD:
+            lines.append(f"    e = o + _n_{name}")
+            value = _FROM_PAYLOAD[spec.kind].format(data="b[o:e]", name=name)
+        elif spec.kind is FieldKind.DATETIME:
+            value = f"_from_datetime_parts(_m_{name}, _o_{name})"
+        elif spec.kind is FieldKind.DATE:
+            value = f"date.fromordinal(_{name})"
+        elif spec.kind is FieldKind.ENUM:
+            value = f"_members_{name}[_{name}]"
+        else:
+            value = None
+        if value is not None:
+            lines.append(f"    _{name} = {value} if _p_{name} else None" if spec.optional else f"    _{name} = {value}")
+        elif spec.optional:
+            lines.append(f"    if not _p_{name}:")
+            lines.append(f"        _{name} = None")
+        if spec.kind in _FROM_PAYLOAD:
+            lines.append("    o = e")
+    lines.append("    return cls(" + ", ".join(f"{spec.name}=_{spec.name}" for spec in specs) + "), o")
+
+    source = "\n".join(lines)
+    exec(compile(source, f"<codec {cls.__module__}.{cls.__qualname__}>", "exec"), namespace)
+    return {name: namespace[name] for name in ("to_dict", "from_dict", "from_row", "pack", "unpack")}
+
+def json_default(value):
+    """``default=`` hook for json.dumps on payloads that embed model values."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class ModelCodec(Generic[T]):
+    """Encoder/decoder pair generated from one dataclass's fields and type hints.
+
+    JSON uses enum values, Decimal strings and ISO dates. A binary record is a
+    fixed-width header (presence flags, ints/floats/bools, datetimes as epoch
+    microseconds plus UTC offset, dates as ordinals, enums as member indexes,
+    and byte lengths) followed by the UTF-8 payloads of strings, Decimals and
+    collections, so decoding is one struct unpack plus slicing.
+    """
+
+    def __init__(self, cls: Type[T]):
+        self.cls = cls
+        self.specs = field_specs(cls)
+        self.columns = tuple(spec.name for spec in self.specs)
+        functions = _compile(cls, self.specs)
+        self.to_dict: Callable[[T], Dict[str, Any]] = functions["to_dict"]
+        self.from_dict: Callable[[Dict[str, Any]], T] = functions["from_dict"]
+        self.from_row: Callable[[Sequence[Any]], T] = functions["from_row"]
+        self._pack = functions["pack"]
+        self._unpack = functions["unpack"]
+
+    def dumps(self, obj: T) -> str:
+        return json.dumps(self.to_dict(obj), separators=(",", ":"))
+
+    def loads(self, text: str) -> T:
+        return self.from_dict(json.loads(text))
+
+    def dumps_many(self, objs: Iterable[T]) -> str:
+        return json.dumps([self.to_dict(obj) for obj in objs], separators=(",", ":"))
+
+    def loads_many(self, text: str) -> List[T]:
+        from_dict = self.from_dict
+        return [from_dict(item) for item in json.loads(text)]
+
+    def from_rows(self, rows: Iterable[Sequence[Any]]) -> List[T]:
+        from_row = self.from_row
+        return [from_row(row) for row in rows]
+
+    def from_dicts(self, rows: Iterable[Dict[str, Any]]) -> List[T]:
+        from_dict = self.from_dict
+        return [from_dict(row) for row in rows]
+
+    def to_bytes(self, obj: T) -> bytes:
+        return self._pack(obj)
+
+    def from_bytes(self, data: bytes) -> T:
+        obj, offset = self._unpack(data, 0)
+        if offset != len(data):
+            raise ValueError(f"{len(data) - offset} trailing bytes after {self.cls.__name__} record")
+        return obj
+
+    def pack_many(self, objs: Iterable[T]) -> bytes:
+        pack = self._pack
+        records = [pack(obj) for obj in objs]
+        return MAGIC + _U32.pack(len(records)) + b"".join(records)
+
+    def unpack_many(self, data: bytes) -> List[T]:
+        if data[:4] != MAGIC:
+            raise ValueError("not a packed record batch")
+        count, = _U32.unpack_from(data, 4)
+        offset, unpack, objs = 8, self._unpack, []
+        for _ in range(count):
+            obj, offset = unpack(data, offset)
+            objs.append(obj)
+        return objs
+
+@lru_cache(maxsize=None)
+def codec_for(cls: Type[T]) -> ModelCodec[T]:
+    return ModelCodec(cls)
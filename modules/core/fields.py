@@ -0,0 +1,66 @@
+import dataclasses
+import typing
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Optional, Tuple, Type
+from dataclasses import dataclass
+
+class FieldKind(Enum):
+    STR = "str"
+    INT = "int"
+    FLOAT = "float"
+    BOOL = "bool"
+    DECIMAL = "decimal"
+    DATETIME = "datetime"
+    DATE = "date"
+    ENUM = "enum"
+    STR_LIST = "str_list"
+    INT_LIST = "int_list"
+    STR_DICT = "str_dict"
+    OBJECT = "object"
+
+_SCALARS = {
+    str: FieldKind.STR,
+    int: FieldKind.INT,
+    float: FieldKind.FLOAT,
+    bool: FieldKind.BOOL,
+    Decimal: FieldKind.DECIMAL,
+    datetime: FieldKind.DATETIME,
+    date: FieldKind.DATE,
+}
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    kind: FieldKind
+    optional: bool
+    enum: Optional[Type[Enum]] = None
+
+def _classify(hint) -> Tuple[FieldKind, bool, Optional[Type[Enum]]]:
+    optional = False
+    if typing.get_origin(hint) is typing.Union:
+        args = [arg for arg in typing.get_args(hint) if arg is not type(None)]
+        optional = len(args) != len(typing.get_args(hint))
+        hint = args[0] if len(args) == 1 else object
+    origin, args = typing.get_origin(hint), typing.get_args(hint)
+    if origin is list and args == (str,):
+        return FieldKind.STR_LIST, optional, None
+    if origin is list and args == (int,):
+        return FieldKind.INT_LIST, optional, None
+    if origin is dict and args == (str, str):
+        return FieldKind.STR_DICT, optional, None
+    if isinstance(hint, type) and issubclass(hint, Enum):
+        return FieldKind.ENUM, optional, hint
+    return _SCALARS.get(hint, FieldKind.OBJECT), optional, None
+
+@lru_cache(maxsize=None)
+def field_specs(cls: type) -> Tuple[FieldSpec, ...]:
+    """Storage-relevant description of each dataclass field, resolved once per class."""
+    hints = typing.get_type_hints(cls)
+    specs = []
+    for field in dataclasses.fields(cls):
+        kind, optional, enum = _classify(hints[field.name])
+        specs.append(FieldSpec(field.name, kind, optional, enum))
+    return tuple(specs)
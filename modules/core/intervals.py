@@ -0,0 +1,40 @@
+from bisect import bisect_right
+from typing import Any, Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+class EffectiveIntervals(Generic[T]):
+    """Effective-dated versions of one rate (or any record) as non-overlapping intervals.
+
+    A version is in force from its start until its own expiry or the next
+    version's start, whichever comes first; it never comes back into force when
+    a later version expires. Versions sharing a start resolve to the one added
+    last. ``at`` is a single bisect over the starts.
+    """
+
+    def __init__(self, start: Callable[[T], Any], expiry: Callable[[T], Optional[Any]]):
+        self.start = start
+        self.expiry = expiry
+        self.starts: List[Any] = []
+        self.versions: List[T] = []
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def add(self, version: T) -> None:
+        position = bisect_right(self.starts, self.start(version))
+        self.starts.insert(position, self.start(version))
+        self.versions.insert(position, version)
+
+    def remove(self, version: T) -> None:
+        position = next(i for i, existing in enumerate(self.versions) if existing is version)
+        del self.starts[position], self.versions[position]
+
+    def at(self, moment: Any) -> Optional[T]:
+        """The version in force at ``moment`` (expiry inclusive), or None if none is."""
+        position = bisect_right(self.starts, moment) - 1
+        if position < 0:
+            return None
+        version = self.versions[position]
+        expiry = self.expiry(version)
+        return version if expiry is None or moment <= expiry else None
@@ -0,0 +1,30 @@
+import dataclasses
+from typing import Dict, List
+
+from modules.boq import models as boq
+from modules.core.codecs import ModelCodec, codec_for
+from modules.cost_to_complete import models as cost_to_complete
+from modules.costing import models as costing
+from modules.goods_receipt import models as goods_receipt
+from modules.po_tracking import models as po_tracking
+from modules.procurement import models as procurement
+from modules.progress import models as progress
+from modules.projects import models as projects
+from modules.reporting import models as reporting
+from modules.stores import models as stores
+from modules.tasks import models as tasks
+from modules.timesheets import models as timesheets
+from modules.wbs import models as wbs
+
+MODEL_MODULES = (
+    boq, cost_to_complete, costing, goods_receipt, po_tracking, procurement, progress,
+    projects, reporting, stores, tasks, timesheets, wbs,
+)
+
+MODELS: List[type] = [
+    value for module in MODEL_MODULES for value in vars(module).values()
+    if dataclasses.is_dataclass(value) and isinstance(value, type) and value.__module__ == module.__name__
+]
+
+# Generated once at import so request handlers never pay for code generation.
+CODECS: Dict[type, ModelCodec] = {model: codec_for(model) for model in MODELS}
@@ -0,0 +1,299 @@
+import dataclasses
+from array import array
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, Generic, Iterable, Iterator, List, Optional, Type, TypeVar, Union
+
+from modules.core.fields import FieldKind, FieldSpec, field_specs
+
+T = TypeVar("T")
+
+EPOCH = datetime(1970, 1, 1)
+EPOCH_DAY = date(1970, 1, 1).toordinal()
+NULL_INT64 = -2 ** 63
+NULL_EXPONENT = 127
+
+@lru_cache(maxsize=None)
+def slotted(cls: Type[T]) -> Type[T]:
+    """Same fields and defaults as ``cls``, but with __slots__ instead of a per-instance __dict__."""
+    namespace: Dict[str, Any] = {
+        "__annotations__": dict(cls.__annotations__),
+        "__module__": cls.__module__,
+        "__qualname__": cls.__qualname__,
+        "__doc__": cls.__doc__,
+    }
+    for field in dataclasses.fields(cls):
+        if field.default is not dataclasses.MISSING or field.default_factory is not dataclasses.MISSING:
+            namespace[field.name] = dataclasses.field(default=field.default, default_factory=field.default_factory)
+    return dataclasses.dataclass(slots=True)(type(cls.__name__, (), namespace))
+
+def to_slotted(record: Any) -> Any:
+    cls = slotted(type(record))
+    return cls(**{field.name: getattr(record, field.name) for field in dataclasses.fields(record)})
+
+class _Column:
+    def __init__(self, spec: FieldSpec):
+        self.spec = spec
+
+    def nbytes(self) -> int:
+        return 0
+
+class _StringColumn(_Column):
+    # Dictionary-encoded while values repeat (ids of parents, codes, labels);
+    # switches to a packed UTF-8 buffer once the column looks mostly unique.
+    PROBE_ROWS = 4096
+    MAX_DISTINCT_RATIO = 0.5
+
+    def __init__(self, spec: FieldSpec):
+        super().__init__(spec)
+        self.codes = array('l')
+        self.values: List[str] = []
+        self.lookup: Optional[Dict[str, int]] = {}
+        self.buffer = bytearray()
+        self.ends = array('q')
+        self.nulls = bytearray()
+
+    def append(self, value: Optional[str]) -> None:
+        if self.lookup is None:
+            self._append_packed(value)
+            return
+        if value is None:
+            self.codes.append(-1)
+        else:
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.values)
+                self.values.append(value)
+            self.codes.append(code)
+        if len(self.codes) == self.PROBE_ROWS and len(self.values) > self.PROBE_ROWS * self.MAX_DISTINCT_RATIO:
+            self._pack()
+
+    def _append_packed(self, value: Optional[str]) -> None:
+        self.nulls.append(value is None)
+        if value is not None:
+            self.buffer += value.encode()
+        self.ends.append(len(self.buffer))
+
+    def _pack(self) -> None:
+        rows = [self.get(row) for row in range(len(self.codes))]
+        self.lookup, self.values, self.codes = None, [], array('l')
+        for value in rows:
+            self._append_packed(value)
+
+    def get(self, row: int) -> Optional[str]:
+        if self.lookup is None:
+            if self.nulls[row]:
+                return None
+            return self.buffer[self.ends[row - 1] if row else 0:self.ends[row]].decode()
+        code = self.codes[row]
+        return None if code < 0 else self.values[code]
+
+    def nbytes(self) -> int:
+        if self.lookup is None:
+            return len(self.buffer) + 8 * len(self.ends) + len(self.nulls)
+        return self.codes.itemsize * len(self.codes) + sum(len(value) + 49 for value in self.values)
+
+class _EnumColumn(_Column):
+    def __init__(self, spec: FieldSpec):
+        super().__init__(spec)
+        self.members = list(spec.enum)
+        self.positions = {member: i for i, member in enumerate(self.members)}
+        self.codes = array('b')
+
+    def append(self, value) -> None:
+        self.codes.append(-1 if value is None else self.positions[value])
+
+    def get(self, row: int):
+        code = self.codes[row]
+        return None if code < 0 else self.members[code]
+
+    def nbytes(self) -> int:
+        return len(self.codes)
+
+class _NumberColumn(_Column):
+    TYPECODES = {FieldKind.INT: 'q', FieldKind.FLOAT: 'd', FieldKind.BOOL: 'b'}
+
+    def __init__(self, spec: FieldSpec):
+        super().__init__(spec)
+        self.values = array(self.TYPECODES[spec.kind])
+        self.nulls = bytearray() if spec.optional else None
+        self.convert = bool if spec.kind is FieldKind.BOOL else None
+
+    def append(self, value) -> None:
+        if self.nulls is not None:
+            self.nulls.append(value is None)
+        self.values.append(0 if value is None else value)
+
+    def get(self, row: int):
+        if self.nulls is not None and self.nulls[row]:
+            return None
+        value = self.values[row]
+        return self.convert(value) if self.convert else value
+
+    def nbytes(self) -> int:
+        return self.values.itemsize * len(self.values) + len(self.nulls or b"")
+
+class _DecimalColumn(_Column):
+    # Coefficient and exponent are kept separately, so every value round-trips
+    # with its original exponent (Decimal("5.00") stays "5.00").
+    def __init__(self, spec: FieldSpec):
+        super().__init__(spec)
+        self.coefficients = array('q')
+        self.exponents = array('b')
+
+    def append(self, value: Optional[Decimal]) -> None:
+        if value is None:
+            self.coefficients.append(0)
+            self.exponents.append(NULL_EXPONENT)
+            return
+        sign, digits, exponent = value.as_tuple()
+        if not isinstance(exponent, int) or not -128 <= exponent < NULL_EXPONENT:
+            raise ValueError(f"{self.spec.name}: cannot store {value} in a fixed-point column")
+        coefficient = int("".join(map(str, digits)) or "0")
+        try:
+            self.coefficients.append(-coefficient if sign else coefficient)
+        except OverflowError:
+            raise ValueError(f"{self.spec.name}: {value} does not fit in 64 bits") from None
+        self.exponents.append(exponent)
+
+    def get(self, row: int) -> Optional[Decimal]:
+        exponent = self.exponents[row]
+        if exponent == NULL_EXPONENT:
+            return None
+        return Decimal(self.coefficients[row]).scaleb(exponent)
+
+    def nbytes(self) -> int:
+        return 9 * len(self.exponents)
+
+class _DateTimeColumn(_Column):
+    def __init__(self, spec: FieldSpec):
+        super().__init__(spec)
+        self.micros = array('q')
+        self.tzinfo = None
+        self.aware: Optional[bool] = None
+
+    def append(self, value: Optional[datetime]) -> None:
+        if value is None:
+            self.micros.append(NULL_INT64)
+            return
+        aware = value.tzinfo is not None
+        if self.aware is None:
+            self.aware, self.tzinfo = aware, value.tzinfo
+        elif aware != self.aware:
+            raise ValueError(f"{self.spec.name}: cannot mix naive and aware datetimes in one column")
+        if aware:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        self.micros.append((value - EPOCH) // timedelta(microseconds=1))
+
+    def get(self, row: int) -> Optional[datetime]:
+        micros = self.micros[row]
+        if micros == NULL_INT64:
+            return None
+        value = EPOCH + timedelta(microseconds=micros)
+        if self.aware:
+            value = value.replace(tzinfo=timezone.utc).astimezone(self.tzinfo)
+        return value
+
+    def nbytes(self) -> int:
+        return 8 * len(self.micros)
+
+class _DateColumn(_Column):
+    def __init__(self, spec: FieldSpec):
+        super().__init__(spec)
+        self.days = array('q')
+
+    def append(self, value: Optional[date]) -> None:
+        self.days.append(NULL_INT64 if value is None else value.toordinal() - EPOCH_DAY)
+
+    def get(self, row: int) -> Optional[date]:
+        days = self.days[row]
+        return None if days == NULL_INT64 else date.fromordinal(days + EPOCH_DAY)
+
+    def nbytes(self) -> int:
+        return 8 * len(self.days)
+
+class _ObjectColumn(_Column):
+    def __init__(self, spec: FieldSpec):
+        super().__init__(spec)
+        self.values: List[Any] = []
+
+    def append(self, value) -> None:
+        self.values.append(value)
+
+    def get(self, row: int):
+        return self.values[row]
+
+    def nbytes(self) -> int:
+        return 8 * len(self.values)
+
+_COLUMNS = {
+    FieldKind.STR: _StringColumn,
+    FieldKind.ENUM: _EnumColumn,
+    FieldKind.INT: _NumberColumn,
+    FieldKind.FLOAT: _NumberColumn,
+    FieldKind.BOOL: _NumberColumn,
+    FieldKind.DECIMAL: _DecimalColumn,
+    FieldKind.DATETIME: _DateTimeColumn,
+    FieldKind.DATE: _DateColumn,
+}
+
+class RecordBatch(Generic[T]):
+    """Columnar store for one dataclass model.
+
+    Strings are dictionary-encoded (or packed when mostly unique), enums kept as int8 member indexes, datetimes
+    as int64 epoch microseconds, dates as int64 epoch days and Decimals as an
+    int64 coefficient plus int8 exponent. Rows are materialised as model
+    instances (or their slotted variant) only when accessed.
+    """
+
+    def __init__(self, cls: Type[T], records: Iterable[T] = (), use_slots: bool = False):
+        self.cls = cls
+        self.factory = slotted(cls) if use_slots else cls
+        self.specs = field_specs(cls)
+        self.columns: Dict[str, _Column] = {
+            spec.name: _COLUMNS.get(spec.kind, _ObjectColumn)(spec) for spec in self.specs
+        }
+        self._appenders = [(spec.name, self.columns[spec.name].append) for spec in self.specs]
+        self._getters = [(spec.name, self.columns[spec.name].get) for spec in self.specs]
+        self.length = 0
+        self.extend(records)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def append(self, record: T) -> None:
+        for name, append in self._appenders:
+            append(getattr(record, name))
+        self.length += 1
+
+    def extend(self, records: Iterable[T]) -> None:
+        for record in records:
+            self.append(record)
+
+    def __getitem__(self, row: Union[int, slice]):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(self.length))]
+        if row < 0:
+            row += self.length
+        if not 0 <= row < self.length:
+            raise IndexError("record batch index out of range")
+        return self.factory(**{name: get(row) for name, get in self._getters})
+
+    def __iter__(self) -> Iterator[T]:
+        for row in range(self.length):
+            yield self[row]
+
+    def get(self, row: int, field: str):
+        return self.columns[field].get(row)
+
+    def column(self, field: str) -> List[Any]:
+        get = self.columns[field].get
+        return [get(row) for row in range(self.length)]
+
+    def raw(self, field: str) -> _Column:
+        """Underlying encoded column, for engines that work on the int arrays directly."""
+        return self.columns[field]
+
+    def nbytes(self) -> int:
+        return sum(column.nbytes() for column in self.columns.values())
@@ -0,0 +1,40 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+from modules.core.fields import FieldKind
+from modules.core.model_codecs import CODECS, MODELS
+
+SAMPLES = {
+    FieldKind.STR: "héllo",
+    FieldKind.INT: -42,
+    FieldKind.FLOAT: 2.5,
+    FieldKind.BOOL: True,
+    FieldKind.DECIMAL: Decimal("1234.5678"),
+    FieldKind.DATETIME: datetime(2025, 3, 4, 5, 6, 7, 890, tzinfo=timezone(timedelta(hours=2))),
+    FieldKind.DATE: date(2025, 3, 4),
+    FieldKind.STR_LIST: ["a", "bc"],
+    FieldKind.INT_LIST: [1, -2],
+    FieldKind.STR_DICT: {"k": "v"},
+}
+
+def sample_record(model: type, fill_optional: bool):
+    values = {}
+    for spec in CODECS[model].specs:
+        if spec.optional and not fill_optional:
+            values[spec.name] = None
+        elif spec.kind is FieldKind.ENUM:
+            values[spec.name] = list(spec.enum)[-1]
+        else:
+            values[spec.name] = SAMPLES[spec.kind]
+    return model(**values)
+
+@pytest.mark.parametrize("fill_optional", [False, True], ids=["optional-none", "optional-set"])
+@pytest.mark.parametrize("model", MODELS, ids=lambda model: model.__name__)
+def test_round_trips(model, fill_optional):
+    codec = CODECS[model]
+    record = sample_record(model, fill_optional)
+    assert codec.from_bytes(codec.to_bytes(record)) == record
+    assert codec.unpack_many(codec.pack_many([record, record])) == [record, record]
+    assert codec.loads(codec.dumps(record)) == record
@@ -0,0 +1,57 @@
+import dataclasses
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from modules.core.model_codecs import MODELS
+from modules.core.records import RecordBatch, slotted, to_slotted
+from modules.core.test_codecs import sample_record
+from modules.stores.models import StockMovement, StockMovementType
+
+START = datetime(2026, 1, 1)
+
+def _movement(i: int, **changes) -> StockMovement:
+    movement = StockMovement(f"mov-{i}", f"store-{i % 3}", "item-1", StockMovementType.RECEIPT, f"PO-{i}", "PO",
+                             Decimal("5.00"), Decimal("12.50"), Decimal("62.500"), None, "loc-1", START, "u", None,
+                             START)
+    return dataclasses.replace(movement, **changes)
+
+@pytest.mark.parametrize("fill_optional", [False, True], ids=["optional-none", "optional-set"])
+@pytest.mark.parametrize("model", MODELS, ids=lambda model: model.__name__)
+def test_every_model_round_trips(model, fill_optional):
+    record = sample_record(model, fill_optional)
+    batch = RecordBatch(model, [record, record])
+    assert list(batch) == [record, record]
+    assert batch[-1] == record
+
+def test_decimal_exponents_and_nulls_are_kept():
+    values = [Decimal("5.00"), Decimal("-0.001"), Decimal("12E+3"), Decimal("0")]
+    batch = RecordBatch(StockMovement, [_movement(i, quantity=value, notes=None if i % 2 else "n")
+                                        for i, value in enumerate(values)])
+    assert [str(value) for value in batch.column("quantity")] == ["5.00", "-0.001", "1.2E+4", "0"]
+    assert batch.column("notes") == ["n", None, "n", None]
+    with pytest.raises(ValueError):
+        batch.append(_movement(9, quantity=Decimal(2 ** 64)))
+
+def test_mostly_unique_strings_switch_to_a_packed_buffer():
+    batch = RecordBatch(StockMovement, (_movement(i) for i in range(5000)))
+    column = batch.raw("id")
+    assert column.lookup is None
+    assert batch.raw("store_id").lookup is not None
+    assert batch[4999].id == "mov-4999"
+    assert batch[1234] == _movement(1234)
+
+def test_mixed_naive_and_aware_datetimes_are_rejected():
+    batch = RecordBatch(StockMovement, [_movement(0)])
+    with pytest.raises(ValueError):
+        batch.append(_movement(1, movement_date=START.replace(tzinfo=timezone.utc)))
+
+def test_slotted_variants():
+    cls = slotted(StockMovement)
+    assert slotted(StockMovement) is cls
+    assert not hasattr(cls(**dataclasses.asdict(_movement(0))), "__dict__")
+    record = to_slotted(_movement(1))
+    assert record.reference_number == "PO-1"
+    batch = RecordBatch(StockMovement, [_movement(2)], use_slots=True)
+    assert type(batch[0]) is cls
@@ -0,0 +1,77 @@
+"""Risk simulation throughput on a synthetic schedule.
+
+Run with ``python -m modules.cost_to_complete.bench_risk_simulation [tasks] [iterations] [sampled]``;
+``sampled`` is how many tasks get a three-point duration estimate.
+"""
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from modules.cost_to_complete.risk_simulation import RiskSimulator, ThreePointEstimate, _draw, _sampler
+from modules.tasks.models import DependencyType, Task, TaskDependency, TaskPriority, TaskStatus
+from modules.tasks.scheduling import CriticalPathScheduler
+
+START = datetime(2026, 1, 5)
+
+def sample_schedule(tasks: int, seed: int = 7) -> CriticalPathScheduler:
+    """Layered network of ``tasks`` tasks with about two links each, mostly finish-to-start."""
+    rng = random.Random(seed)
+    kinds = [DependencyType.FINISH_TO_START] * 7 + [DependencyType.START_TO_START, DependencyType.FINISH_TO_FINISH,
+                                                    DependencyType.START_TO_FINISH]
+    records, links = [], []
+    for i in range(tasks):
+        start = START + timedelta(days=rng.randint(0, 300))
+        records.append(Task(f"t{i}", "p1", None, f"Task {i}", None, TaskStatus.NOT_STARTED, TaskPriority.MEDIUM,
+                            start, start + timedelta(days=rng.randint(1, 20)), None, None, 0.0, 0.0, 0.0,
+                            None, "u", START, START))
+        for pred in {rng.randrange(max(0, i - 50), i) for _ in range(2)} if i else ():
+            links.append(TaskDependency(f"d{len(links)}", f"t{pred}", f"t{i}", rng.choice(kinds),
+                                        rng.randint(0, 3), START))
+    return CriticalPathScheduler(records, links, project_start=START)
+
+def duration_estimates(scheduler: CriticalPathScheduler, sampled: int, seed: int = 11):
+    rng = random.Random(seed)
+    estimates = []
+    for node in rng.sample(range(len(scheduler.ids)), sampled):
+        base = scheduler.duration[node]
+        estimates.append(ThreePointEstimate(scheduler.ids[node], base * 0.8, base, base * 1.6))
+    return estimates
+
+def _timed(label: str, iterations: int, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<34}{elapsed:>9.2f} s{iterations / elapsed:>14,.0f} iterations/s")
+    return result
+
+def _forward_pass(scheduler: CriticalPathScheduler, estimates, iterations: int):
+    """The pre-flattening path: a full finish_for_durations pass per sample."""
+    rng = random.Random(0)
+    samplers = [(scheduler.index[estimate.key], _sampler(estimate)) for estimate in estimates]
+    finishes = []
+    for _ in range(iterations):
+        durations = list(scheduler.duration)
+        for node, sampler in samplers:
+            durations[node] = _draw(rng, sampler)
+        finishes.append(scheduler.finish_for_durations(durations))
+    return finishes
+
+def main(tasks: int = 1_000, iterations: int = 100_000, sampled: int = 200) -> None:
+    scheduler = sample_schedule(tasks)
+    estimates = duration_estimates(scheduler, min(sampled, tasks))
+    print(f"{tasks:,} tasks, {sum(map(len, scheduler.predecessors)):,} links, {len(estimates):,} sampled durations, "
+          f"{os.cpu_count()} cpus")
+    probe = max(1, iterations // 100)
+    _timed(f"full forward pass x {probe:,}", probe, _forward_pass, scheduler, estimates, probe)
+    simulator = RiskSimulator("p1", [ThreePointEstimate("cost", 90.0, 100.0, 150.0)], Decimal("0"),
+                              scheduler, estimates)
+    _timed(f"flattened, 1 worker x {probe:,}", probe, simulator.run, probe, 0, 1)
+    result = _timed(f"flattened, all workers x {iterations:,}", iterations, simulator.run, iterations, 0)
+    print({rank: finish.date().isoformat() for rank, finish in result.finish_date.items()})
+
+if __name__ == "__main__":
+    arguments = [int(value) for value in sys.argv[1:4]]
+    main(*arguments)
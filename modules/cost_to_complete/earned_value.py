@@ -0,0 +1,244 @@
+import uuid
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from dataclasses import dataclass
+
+from modules.cost_to_complete.models import EarnedValueMetrics
+from modules.costing.cube import SPENT
+from modules.costing.models import ActualCost
+from modules.progress.models import ProgressMeasurement
+from modules.wbs.rollup import WBSTree
+
+CENT = Decimal("0.01")
+INDEX = Decimal("0.0001")
+ONE = Decimal("1.0000")
+INDEX_SCALE = 10000
+# Progress percentages are carried in millionths of a percent; finer digits are rounded
+# half-up to PROGRESS_QUANTUM in both the batch and the Decimal reference path.
+PROGRESS_SCALE = 1_000_000
+PROGRESS_QUANTUM = Decimal("0.000001")
+
+def to_cents(amount: Decimal) -> int:
+    return int(amount.quantize(CENT, rounding=ROUND_HALF_UP).scaleb(2))
+
+def to_progress_units(percentage: Decimal) -> int:
+    return int(percentage.quantize(PROGRESS_QUANTUM, rounding=ROUND_HALF_UP).scaleb(6))
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+def _div_half_up(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(abs(numerator), abs(denominator))
+    if 2 * remainder >= abs(denominator):
+        quotient += 1
+    return -quotient if (numerator < 0) != (denominator < 0) else quotient
+
+def _ratio(numerator: int, denominator: int) -> int:
+    if denominator == 0:
+        return INDEX_SCALE
+    return _div_half_up(numerator * INDEX_SCALE, denominator)
+
+def decimal_metrics(budget_at_completion: Decimal, planned_progress: Decimal,
+                    actual_progress: Decimal, actual_cost: Decimal) -> Dict[str, Decimal]:
+    """Reference single-record calculation; the batch engine reproduces it exactly."""
+    bac, ac = budget_at_completion, actual_cost
+    planned_progress = planned_progress.quantize(PROGRESS_QUANTUM, rounding=ROUND_HALF_UP)
+    actual_progress = actual_progress.quantize(PROGRESS_QUANTUM, rounding=ROUND_HALF_UP)
+    pv = (bac * planned_progress / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+    ev = (bac * actual_progress / 100).quantize(CENT, rounding=ROUND_HALF_UP)
+    eac = ac + bac - ev if ev == 0 else (bac * ac / ev).quantize(CENT, rounding=ROUND_HALF_UP)
+    return {
+        "planned_value": pv,
+        "earned_value": ev,
+        "actual_cost": ac,
+        "budget_at_completion": bac,
+        "cost_performance_index": (ev / ac).quantize(INDEX, rounding=ROUND_HALF_UP) if ac else ONE,
+        "schedule_performance_index": (ev / pv).quantize(INDEX, rounding=ROUND_HALF_UP) if pv else ONE,
+        "cost_variance": ev - ac,
+        "schedule_variance": ev - pv,
+        "estimate_at_completion": eac,
+        "estimate_to_complete": eac - ac,
+        "to_complete_performance_index": ((bac - ev) / (bac - ac)).quantize(INDEX, rounding=ROUND_HALF_UP)
+                                         if bac != ac else ONE,
+    }
+
+@dataclass
+class BudgetColumns:
+    node_ids: List[str]
+    project_ids: List[str]
+    budget_cents: array
+
+    @classmethod
+    def from_tree(cls, tree: WBSTree) -> "BudgetColumns":
+        return cls(
+            node_ids=list(tree.ids),
+            project_ids=[node.project_id for node in tree.nodes],
+            budget_cents=array('q', (to_cents(Decimal(str(node.budget_allocation))) for node in tree.nodes)),
+        )
+
+@dataclass
+class CostColumns:
+    node: array
+    day: array
+    amount_cents: array
+
+    @classmethod
+    def from_records(cls, costs: Iterable[ActualCost], index: Dict[str, int]) -> "CostColumns":
+        """Actual and accrued costs only; planned and committed rows are not actual cost."""
+        columns = cls(array('l'), array('l'), array('q'))
+        for cost in costs:
+            position = index.get(cost.wbs_node_id)
+            if position is None or cost.cost_status not in SPENT:
+                continue
+            columns.node.append(position)
+            columns.day.append(cost.cost_date.toordinal())
+            columns.amount_cents.append(to_cents(cost.amount))
+        return columns
+
+@dataclass
+class ProgressColumns:
+    node: array
+    day: array
+    planned: array
+    actual: array
+
+    @classmethod
+    def from_records(cls, measurements: Iterable[ProgressMeasurement],
+                     index: Dict[str, int]) -> "ProgressColumns":
+        columns = cls(array('l'), array('l'), array('l'), array('l'))
+        for measurement in measurements:
+            position = index.get(measurement.wbs_node_id)
+            if position is None:
+                continue
+            columns.node.append(position)
+            columns.day.append(measurement.measurement_date.toordinal())
+            columns.planned.append(to_progress_units(measurement.planned_progress))
+            columns.actual.append(to_progress_units(measurement.actual_progress))
+        return columns
+
+class EarnedValueBatch:
+    """PV/EV/AC and derived indices for every node x period, held as int64
+    columns (cents, and indices scaled by 10^4) laid out node-major."""
+
+    MONEY = ("planned_value", "earned_value", "actual_cost", "budget_at_completion",
+             "cost_variance", "schedule_variance", "estimate_at_completion", "estimate_to_complete")
+    INDICES = ("cost_performance_index", "schedule_performance_index", "to_complete_performance_index")
+
+    def __init__(self, budgets: BudgetColumns, costs: CostColumns, progress: ProgressColumns,
+                 periods: Sequence[datetime], tree: Optional[WBSTree] = None):
+        self.budgets = budgets
+        self.periods = list(periods)
+        self.index = {node_id: position for position, node_id in enumerate(budgets.node_ids)}
+        node_count, period_count = len(budgets.node_ids), len(self.periods)
+        cells = node_count * period_count
+        period_days = [period.toordinal() for period in self.periods]
+        if period_days != sorted(period_days):
+            raise ValueError("periods must be in ascending order")
+
+        ac = array('q', bytes(8 * cells))
+        for node, day, cents in zip(costs.node, costs.day, costs.amount_cents):
+            period = bisect_left(period_days, day)
+            if period < period_count:
+                ac[node * period_count + period] += cents
+
+        seen_day = array('l', [-1]) * cells
+        planned = array('q', bytes(8 * cells))
+        actual = array('q', bytes(8 * cells))
+        for node, day, plan, done in zip(progress.node, progress.day, progress.planned, progress.actual):
+            period = bisect_left(period_days, day)
+            if period < period_count:
+                cell = node * period_count + period
+                if day >= seen_day[cell]:
+                    seen_day[cell] = day
+                    planned[cell] = plan
+                    actual[cell] = done
+
+        pv = array('q', bytes(8 * cells))
+        ev = array('q', bytes(8 * cells))
+        bac = array('q', bytes(8 * cells))
+        for node in range(node_count):
+            budget = budgets.budget_cents[node]
+            base = node * period_count
+            running_ac = plan = done = 0
+            for cell in range(base, base + period_count):
+                running_ac += ac[cell]
+                ac[cell] = running_ac
+                if seen_day[cell] >= 0:
+                    plan, done = planned[cell], actual[cell]
+                pv[cell] = _div_half_up(budget * plan, 100 * PROGRESS_SCALE)
+                ev[cell] = _div_half_up(budget * done, 100 * PROGRESS_SCALE)
+                bac[cell] = budget
+
+        if tree is not None:
+            if tree.ids != budgets.node_ids:
+                raise ValueError("budget columns must be in WBS tree order to roll up")
+            # Costs booked against summary nodes stay with them; budget-derived
+            # values on summary nodes are replaced by the sum of their children.
+            for column in (pv, ev, bac):
+                self._rollup(tree, column, period_count, keep_own=False)
+            self._rollup(tree, ac, period_count, keep_own=True)
+
+        self.columns: Dict[str, array] = {
+            "planned_value": pv,
+            "earned_value": ev,
+            "actual_cost": ac,
+            "budget_at_completion": bac,
+        }
+        self.columns["cost_variance"] = array('q', (e - a for e, a in zip(ev, ac)))
+        self.columns["schedule_variance"] = array('q', (e - p for e, p in zip(ev, pv)))
+        self.columns["cost_performance_index"] = array('q', map(_ratio, ev, ac))
+        self.columns["schedule_performance_index"] = array('q', map(_ratio, ev, pv))
+        self.columns["estimate_at_completion"] = eac = array('q', (
+            a + b - e if e == 0 else _div_half_up(b * a, e) for b, a, e in zip(bac, ac, ev)))
+        self.columns["estimate_to_complete"] = array('q', (x - a for x, a in zip(eac, ac)))
+        self.columns["to_complete_performance_index"] = array('q', (
+            _ratio(b - e, b - a) for b, e, a in zip(bac, ev, ac)))
+
+    @staticmethod
+    def _rollup(tree: WBSTree, column: array, period_count: int, keep_own: bool) -> None:
+        if not keep_own:
+            for position in range(len(tree)):
+                if not tree.is_leaf(position):
+                    base = position * period_count
+                    column[base:base + period_count] = array('q', bytes(8 * period_count))
+        for depth in range(tree.depth - 1, 0, -1):
+            for position in range(tree.level_offsets[depth], tree.level_offsets[depth + 1]):
+                source = position * period_count
+                target = tree.parent[position] * period_count
+                for offset in range(period_count):
+                    column[target + offset] += column[source + offset]
+
+    def value(self, field: str, node_id: str, period: int) -> Decimal:
+        cell = self.index[node_id] * len(self.periods) + period
+        raw = self.columns[field][cell]
+        return Decimal(raw).scaleb(-4) if field in self.INDICES else from_cents(raw)
+
+    def metrics(self, id_factory: Callable[[], str] = lambda: str(uuid.uuid4())) -> Iterator[EarnedValueMetrics]:
+        period_count = len(self.periods)
+        money = [(field, self.columns[field]) for field in self.MONEY]
+        indices = [(field, self.columns[field]) for field in self.INDICES]
+        for node, (node_id, project_id) in enumerate(zip(self.budgets.node_ids, self.budgets.project_ids)):
+            for period, measurement_date in enumerate(self.periods):
+                cell = node * period_count + period
+                values = {field: from_cents(column[cell]) for field, column in money}
+                values.update((field, Decimal(column[cell]).scaleb(-4)) for field, column in indices)
+                yield EarnedValueMetrics(
+                    id=id_factory(),
+                    project_id=project_id,
+                    wbs_node_id=node_id,
+                    measurement_date=measurement_date,
+                    **values,
+                )
+
+def month_ends(start: datetime, end: datetime) -> List[datetime]:
+    periods = []
+    year, month = start.year, start.month
+    while True:
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        period_end = datetime(year, month, 1) - timedelta(days=1)
+        periods.append(period_end)
+        if period_end >= end:
+            return periods
@@ -0,0 +1,246 @@
+import os
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from enum import Enum
+from typing import Dict, List, Optional, Sequence, Tuple
+from dataclasses import dataclass, field
+
+from modules.cost_to_complete.models import CostForecast, CostScenario, ForecastMethod
+from modules.tasks.scheduling import (
+    FINISH_TO_FINISH, FINISH_TO_START, START_TO_START, CriticalPathScheduler,
+)
+
+CENT = Decimal("0.01")
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+class Distribution(Enum):
+    PERT = "pert"
+    TRIANGULAR = "triangular"
+
+@dataclass
+class ThreePointEstimate:
+    key: str  # WBS node id for costs, task id for durations
+    optimistic: float
+    most_likely: float
+    pessimistic: float
+    distribution: Distribution = Distribution.PERT
+
+    def __post_init__(self):
+        if not self.optimistic <= self.most_likely <= self.pessimistic:
+            raise ValueError(f"three-point estimate for {self.key} must satisfy optimistic <= most_likely <= pessimistic")
+
+@dataclass
+class RiskSimulationResult:
+    project_id: str
+    iterations: int
+    seed: int
+    estimate_at_completion: Dict[int, Decimal]
+    finish_date: Dict[int, datetime]
+    mean_estimate_at_completion: Decimal
+    mean_finish_date: Optional[datetime]
+    cost_samples: List[float] = field(default_factory=list, repr=False)
+    finish_samples: List[float] = field(default_factory=list, repr=False)
+
+    def to_cost_scenarios(self, base_forecast: CostForecast, created_by: str) -> List[CostScenario]:
+        base = base_forecast.estimate_at_completion
+        scenarios = []
+        for rank, estimate in sorted(self.estimate_at_completion.items()):
+            difference = estimate - base
+            contingency = (difference / base * 100).quantize(CENT, rounding=ROUND_HALF_UP) if base else Decimal("0.00")
+            scenarios.append(CostScenario(
+                id=str(uuid.uuid4()),
+                project_id=self.project_id,
+                scenario_name=f"P{rank}",
+                description=f"{ForecastMethod.THREE_POINT.value} simulation, {self.iterations} iterations, seed {self.seed}",
+                base_forecast_id=base_forecast.id,
+                risk_adjustment=max(difference, Decimal("0.00")),
+                opportunity_adjustment=max(-difference, Decimal("0.00")),
+                contingency_percentage=contingency,
+                adjusted_estimate_at_completion=estimate,
+                probability=rank / 100,
+                created_by=created_by,
+                created_at=datetime.now(),
+            ))
+        return scenarios
+
+def _sampler(estimate: ThreePointEstimate) -> Tuple[float, float, float, float, float]:
+    low, mode, high = estimate.optimistic, estimate.most_likely, estimate.pessimistic
+    if high == low or estimate.distribution is Distribution.TRIANGULAR:
+        return (0.0, low, mode, high, 0.0)
+    spread = high - low
+    return (1.0, low, spread, 1 + 4 * (mode - low) / spread, 1 + 4 * (high - mode) / spread)
+
+def _draw(rng: random.Random, sampler: Tuple[float, float, float, float, float]) -> float:
+    kind, low, a, b, c = sampler
+    if kind:
+        return low + a * rng.betavariate(b, c)
+    return low if a == b == low else rng.triangular(low, b, a)
+
+def _max_lines(target: str, floor: float, terms: Sequence[str]) -> List[str]:
+    """``target = max(floor, *terms)`` as compares; a builtin max() call costs several times more per node."""
+    if not terms:
+        return [f"    {target} = {floor!r}"]
+    lines = [f"    {target} = {terms[0]}"]
+    for term in terms[1:]:
+        lines += [f"    x = {term}", f"    if x > {target}: {target} = x"]
+    lines.append(f"    if {target} < {floor!r}: {target} = {floor!r}")
+    return lines
+
+def _finish_source(scheduler: CriticalPathScheduler, varying: Sequence[int]) -> str:
+    """Source of ``finish(d)``: the forward pass unrolled in topological order for sampled durations ``d``.
+
+    Starts and finishes that no sampled duration can reach are folded to
+    constants once, so each sample only evaluates the max/add chain downstream
+    of the sampled tasks; the result matches finish_for_durations.
+    """
+    slot = {node: i for i, node in enumerate(varying)}
+    known: Dict[int, Tuple[float, float]] = {}  # node -> constant (start, finish)
+    lines = ["def finish(d):"]
+    if varying:
+        lines.append("    " + "".join(f"d{i}, " for i in range(len(varying))) + "= d")
+    floor, sinks = 0.0, []  # sinks: finishes the project finish can come from
+    for node in scheduler.order:
+        duration = f"d{slot[node]}" if node in slot else None
+        fixed = float(scheduler.duration[node])
+        start, terms = 0.0, []
+        for pred, code, lag, _ in scheduler.predecessors[node]:
+            from_finish = code in (FINISH_TO_START, FINISH_TO_FINISH)
+            to_finish = code not in (FINISH_TO_START, START_TO_START)
+            if pred in known and not (to_finish and duration):
+                bound = known[pred][1 if from_finish else 0] + lag - (fixed if to_finish else 0.0)
+                start = max(start, bound)
+                continue
+            if pred in known:
+                term = repr(known[pred][1 if from_finish else 0])
+            else:
+                term = f"{'f' if from_finish else 's'}{pred}"
+            if lag:
+                term += f" + {float(lag)!r}"
+            if to_finish:
+                term += f" - {duration or repr(fixed)}"
+            terms.append(term)
+        if not terms and duration is None:
+            known[node] = (start, start + fixed)
+        else:
+            lines += _max_lines(f"s{node}", start, terms)
+            lines.append(f"    f{node} = s{node} + {duration or repr(fixed)}")
+        # A finish-to-start or finish-to-finish successor with non-negative lag finishes no earlier.
+        if not any(code in (FINISH_TO_START, FINISH_TO_FINISH) and lag >= 0
+                   for _, code, lag, _ in scheduler.successors[node]):
+            if node in known:
+                floor = max(floor, known[node][1])
+            else:
+                sinks.append(f"f{node}")
+    lines += _max_lines("r", floor, sinks)
+    lines.append("    return r")
+    return "\n".join(lines)
+
+def _compile_finish(source: str):
+    namespace: Dict[str, object] = {}
+    exec(compile(source, "<risk finish>", "exec"), namespace)
+    return namespace["finish"]
+
+_MODEL = None
+
+def _install_model(model) -> None:
+    global _MODEL
+    if model is not None and model[2] is not None:
+        model = model[:2] + (_compile_finish(model[2]),) + model[3:]
+    _MODEL = model
+
+def _run_chunk(iterations: int, seed: str) -> Tuple[List[float], List[float]]:
+    cost_samplers, base_cost, finish, duration_samplers = _MODEL
+    rng = random.Random(seed)
+    costs, finishes = [], []
+    for _ in range(iterations):
+        total = base_cost
+        for sampler in cost_samplers:
+            total += _draw(rng, sampler)
+        costs.append(total)
+        if finish is not None:
+            finishes.append(finish([_draw(rng, sampler) for sampler in duration_samplers]))
+    return costs, finishes
+
+def percentile(ordered: Sequence[float], rank: float) -> float:
+    if not ordered:
+        raise ValueError("no samples")
+    position = (len(ordered) - 1) * rank / 100
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+class RiskSimulator:
+    """Monte Carlo over three-point cost and duration estimates.
+
+    Iterations are split into a fixed number of chunks, each with its own seed
+    derived from the run seed, so results do not depend on how many worker
+    processes pick them up.
+    """
+
+    def __init__(self, project_id: str, cost_estimates: Sequence[ThreePointEstimate],
+                 actual_cost_to_date: Decimal = Decimal("0"),
+                 scheduler: Optional[CriticalPathScheduler] = None,
+                 duration_estimates: Sequence[ThreePointEstimate] = ()):
+        self.project_id = project_id
+        self.cost_samplers = [_sampler(estimate) for estimate in cost_estimates]
+        self.base_cost = float(actual_cost_to_date)
+        self.scheduler = scheduler
+        if duration_estimates and scheduler is None:
+            raise ValueError("duration estimates need a scheduler to compute finish dates")
+        samplers = {scheduler.index[estimate.key]: _sampler(estimate) for estimate in duration_estimates}
+        self.duration_samplers = list(samplers.values())
+        # The network is flattened once here; workers compile it and each sample only walks the varying part.
+        self.finish_source = _finish_source(scheduler, list(samplers)) if scheduler is not None else None
+
+    def _model(self):
+        return (self.cost_samplers, self.base_cost, self.finish_source, self.duration_samplers)
+
+    def run(self, iterations: int = 100_000, seed: int = 0, workers: Optional[int] = None,
+            chunks: int = 64, percentiles: Sequence[int] = DEFAULT_PERCENTILES) -> RiskSimulationResult:
+        chunks = max(1, min(chunks, iterations))
+        sizes = [iterations // chunks + (1 if i < iterations % chunks else 0) for i in range(chunks)]
+        seeds = [f"{seed}:{i}" for i in range(chunks)]
+        workers = (os.cpu_count() or 1) if workers is None else workers
+
+        if workers <= 1:
+            _install_model(self._model())
+            try:
+                parts = [_run_chunk(size, chunk_seed) for size, chunk_seed in zip(sizes, seeds)]
+            finally:
+                _install_model(None)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers, chunks), initializer=_install_model,
+                                     initargs=(self._model(),)) as pool:
+                parts = list(pool.map(_run_chunk, sizes, seeds))
+
+        costs = [value for part, _ in parts for value in part]
+        finishes = [value for _, part in parts for value in part]
+        return self._summarise(iterations, seed, costs, finishes, percentiles)
+
+    def _summarise(self, iterations: int, seed: int, costs: List[float], finishes: List[float],
+                   percentiles: Sequence[int]) -> RiskSimulationResult:
+        def money(value: float) -> Decimal:
+            return Decimal(repr(value)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+        ordered_costs = sorted(costs)
+        finish_dates: Dict[int, datetime] = {}
+        mean_finish = None
+        if finishes:
+            start = self.scheduler.project_start
+            ordered_finishes = sorted(finishes)
+            finish_dates = {p: start + timedelta(days=percentile(ordered_finishes, p)) for p in percentiles}
+            mean_finish = start + timedelta(days=sum(finishes) / len(finishes))
+        return RiskSimulationResult(
+            project_id=self.project_id,
+            iterations=iterations,
+            seed=seed,
+            estimate_at_completion={p: money(percentile(ordered_costs, p)) for p in percentiles},
+            finish_date=finish_dates,
+            mean_estimate_at_completion=money(sum(costs) / len(costs)),
+            mean_finish_date=mean_finish,
+            cost_samples=costs,
+            finish_samples=finishes,
+        )
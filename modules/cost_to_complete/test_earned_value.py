@@ -0,0 +1,62 @@
+import random
+from array import array
+from datetime import datetime
+from decimal import Decimal
+
+from modules.cost_to_complete.earned_value import (
+    BudgetColumns, CostColumns, EarnedValueBatch, ProgressColumns, decimal_metrics, from_cents, to_progress_units,
+)
+from modules.costing.models import ActualCost, CostStatus, CostType
+
+PERIOD = datetime(2025, 1, 31)
+
+def _batch(cases):
+    day = PERIOD.toordinal()
+    budgets = BudgetColumns([f"n{i}" for i in range(len(cases))], ["p1"] * len(cases),
+                            array('q', (cents for cents, _, _, _ in cases)))
+    costs = CostColumns(array('l', range(len(cases))), array('l', [day]) * len(cases),
+                        array('q', (cents for _, _, _, cents in cases)))
+    progress = ProgressColumns(array('l', range(len(cases))), array('l', [day]) * len(cases),
+                               array('l', (to_progress_units(plan) for _, plan, _, _ in cases)),
+                               array('l', (to_progress_units(done) for _, _, done, _ in cases)))
+    return EarnedValueBatch(budgets, costs, progress, [PERIOD])
+
+def _assert_matches_decimal_path(cases):
+    batch = _batch(cases)
+    for node, (budget, plan, done, cost) in enumerate(cases):
+        expected = decimal_metrics(from_cents(budget), plan, done, from_cents(cost))
+        for field, value in expected.items():
+            assert batch.value(field, f"n{node}", 0) == value, (field, budget, plan, done, cost)
+
+def test_progress_below_a_hundredth_of_a_percent():
+    _assert_matches_decimal_path([
+        (100_000_000_00, Decimal("0.004"), Decimal("0.001"), 5_00),
+        (1_234_567_89, Decimal("0.0049"), Decimal("0.0051"), 12_34),
+        (999_99, Decimal("0.009"), Decimal("0"), 0),
+    ])
+
+def test_three_decimal_progress_matches_decimal_path():
+    rng = random.Random(3)
+    cases = []
+    for _ in range(3000):
+        cases.append((rng.randint(0, 10 ** 12), Decimal(rng.randint(0, 100_000)).scaleb(-3),
+                      Decimal(rng.randint(0, 100_000)).scaleb(-3), rng.randint(0, 10 ** 12)))
+    _assert_matches_decimal_path(cases)
+
+def test_only_actual_and_accrued_costs_count_as_actual_cost():
+    costs = [
+        ActualCost(f"c-{status.value}", "p1", "cc", "code", "n0", None, CostType.MATERIAL, status, Decimal(amount),
+                   datetime(2025, 1, 15), None, None, None, "u", PERIOD)
+        for status, amount in ((CostStatus.PLANNED, "1000.00"), (CostStatus.COMMITTED, "500.00"),
+                               (CostStatus.ACTUAL, "300.00"), (CostStatus.ACCRUED, "20.00"))
+    ]
+    columns = CostColumns.from_records(costs, {"n0": 0})
+    assert list(columns.amount_cents) == [300_00, 20_00]
+
+    budgets = BudgetColumns(["n0"], ["p1"], array('q', [1000_00]))
+    progress = ProgressColumns(array('l', [0]), array('l', [PERIOD.toordinal()]),
+                               array('l', [to_progress_units(Decimal("40"))]),
+                               array('l', [to_progress_units(Decimal("30"))]))
+    batch = EarnedValueBatch(budgets, columns, progress, [PERIOD])
+    assert batch.value("actual_cost", "n0", 0) == Decimal("320.00")
+    assert batch.value("cost_performance_index", "n0", 0) == Decimal("0.9375")
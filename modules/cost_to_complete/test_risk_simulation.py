@@ -0,0 +1,26 @@
+import random
+
+from modules.cost_to_complete.bench_risk_simulation import duration_estimates, sample_schedule
+from modules.cost_to_complete.risk_simulation import RiskSimulator, _compile_finish, _finish_source
+
+def test_flattened_pass_matches_full_forward_pass():
+    rng = random.Random(5)
+    for tasks in (1, 12, 300):
+        scheduler = sample_schedule(tasks, seed=tasks)
+        for sampled in (0, 1, tasks // 4, tasks):
+            varying = rng.sample(range(tasks), sampled)
+            finish = _compile_finish(_finish_source(scheduler, varying))
+            for _ in range(20):
+                values = [rng.uniform(0, 30) for _ in varying]
+                durations = [float(duration) for duration in scheduler.duration]
+                for node, value in zip(varying, values):
+                    durations[node] = value
+                assert abs(finish(values) - scheduler.finish_for_durations(durations)) < 1e-9
+
+def test_results_do_not_depend_on_worker_count():
+    scheduler = sample_schedule(60)
+    simulator = RiskSimulator("p1", [], scheduler=scheduler, duration_estimates=duration_estimates(scheduler, 20))
+    single = simulator.run(2_000, seed=3, workers=1, chunks=8)
+    pooled = simulator.run(2_000, seed=3, workers=2, chunks=8)
+    assert single.finish_samples == pooled.finish_samples
+    assert single.finish_date == pooled.finish_date
@@ -0,0 +1,203 @@
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from fractions import Fraction
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from modules.costing.models import ActualCost, CostAllocation
+
+CENT = Decimal("0.01")
+PERCENT_PLACES = Decimal("0.000001")
+HUNDRED = Decimal("100")
+
+Target = Tuple[str, Optional[str]]  # target_cost_center_id, target_wbs_node_id
+
+class AllocationError(ValueError):
+    pass
+
+@dataclass
+class AllocationRule:
+    source_cost_center_id: str
+    target_cost_center_id: str
+    percentage: Decimal
+    target_wbs_node_id: Optional[str] = None
+
+def _strongly_connected(nodes: List[str], edges: Dict[str, List[str]]) -> List[List[str]]:
+    """Tarjan's algorithm, iterative; components come out sinks first."""
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    stack: List[str] = []
+    on_stack = set()
+    components: List[List[str]] = []
+    for root in nodes:
+        if root in index:
+            continue
+        work = [(root, iter(edges.get(root, ())))]
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = low[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    work.append((successor, iter(edges.get(successor, ()))))
+                    break
+                if successor in on_stack:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+class CostAllocationEngine:
+    """Reciprocal cost allocation solved exactly instead of by repeated passes.
+
+    Every source cost center passes all of its cost (direct plus whatever other
+    centers allocate to it) to its targets. The allocation graph is condensed
+    into strongly connected components; acyclic parts resolve in one
+    topological pass and each reciprocal group is one small linear system solved
+    with exact fractions. The result is, per source center, the share of its
+    cost that finally lands on each non-source target.
+    """
+
+    def __init__(self, rules: Iterable[AllocationRule]):
+        self.rules: Dict[str, List[AllocationRule]] = {}
+        for rule in rules:
+            self.rules.setdefault(rule.source_cost_center_id, []).append(rule)
+        self._validate()
+        self.distribution: Dict[str, Dict[Target, Fraction]] = {}
+        self._solve()
+
+    def _validate(self) -> None:
+        for source, rules in self.rules.items():
+            total = sum((rule.percentage for rule in rules), Decimal("0"))
+            if total != HUNDRED:
+                raise AllocationError(f"allocation rules for cost center {source} sum to {total}%, not 100%")
+            for rule in rules:
+                if rule.percentage < 0:
+                    raise AllocationError(f"negative allocation percentage from cost center {source}")
+                if rule.target_cost_center_id == source:
+                    raise AllocationError(f"cost center {source} allocates to itself")
+                if rule.target_cost_center_id in self.rules and rule.target_wbs_node_id is not None:
+                    raise AllocationError(
+                        f"cost center {rule.target_cost_center_id} re-allocates its cost, so rules cannot "
+                        f"target a WBS node on it")
+
+    def _solve(self) -> None:
+        sources = list(self.rules)
+        edges = {
+            source: [rule.target_cost_center_id for rule in rules if rule.target_cost_center_id in self.rules]
+            for source, rules in self.rules.items()
+        }
+        for component in _strongly_connected(sources, edges):
+            self._solve_component(component)
+
+    def _solve_component(self, component: List[str]) -> None:
+        # Unknown rows X[s] satisfy X[s] - sum(p[s][j] * X[j], j in component) = B[s], where B[s]
+        # holds the shares sent straight to final targets or to components solved earlier.
+        position = {source: i for i, source in enumerate(component)}
+        size = len(component)
+        matrix: List[List[Fraction]] = []
+        constants: List[Dict[Target, Fraction]] = []
+        for source in component:
+            row = [Fraction(0)] * size
+            row[position[source]] = Fraction(1)
+            constant: Dict[Target, Fraction] = {}
+            for rule in self.rules[source]:
+                share = Fraction(rule.percentage) / 100
+                target = rule.target_cost_center_id
+                if target in position:
+                    row[position[target]] -= share
+                elif target in self.distribution:
+                    for final, fraction in self.distribution[target].items():
+                        constant[final] = constant.get(final, 0) + share * fraction
+                else:
+                    final = (target, rule.target_wbs_node_id)
+                    constant[final] = constant.get(final, 0) + share
+            matrix.append(row)
+            constants.append(constant)
+
+        for column in range(size):
+            pivot = next((r for r in range(column, size) if matrix[r][column]), None)
+            if pivot is None:
+                raise AllocationError(
+                    f"cost centers {sorted(component)} only allocate among themselves; cost never leaves the loop")
+            matrix[column], matrix[pivot] = matrix[pivot], matrix[column]
+            constants[column], constants[pivot] = constants[pivot], constants[column]
+            scale = matrix[column][column]
+            if scale != 1:
+                matrix[column] = [value / scale for value in matrix[column]]
+                constants[column] = {final: value / scale for final, value in constants[column].items()}
+            for r in range(size):
+                factor = matrix[r][column]
+                if r == column or not factor:
+                    continue
+                matrix[r] = [a - factor * b for a, b in zip(matrix[r], matrix[column])]
+                for final, value in constants[column].items():
+                    constants[r][final] = constants[r].get(final, 0) - factor * value
+
+        for i, source in enumerate(component):
+            shares = sorted((item for item in constants[i].items() if item[1]),
+                            key=lambda item: (item[0][0], item[0][1] or ""))
+            self.distribution[source] = dict(shares)
+
+    def split(self, cost_center_id: str, amount: Decimal) -> List[Tuple[Target, Fraction, Decimal]]:
+        """Split ``amount`` over final targets; the cent amounts always add back up to ``amount``."""
+        shares = list(self.distribution[cost_center_id].items())
+        cents = int((amount / CENT).to_integral_value(rounding=ROUND_HALF_UP))
+        sign, cents = (-1 if cents < 0 else 1), abs(cents)
+        exact = [share * cents for _, share in shares]
+        floors = [int(value) for value in exact]
+        # Largest remainder: leftover cents go to the targets that lost the most to truncation.
+        leftover = cents - sum(floors)
+        by_remainder = sorted(range(len(shares)), key=lambda i: exact[i] - floors[i], reverse=True)
+        for i in by_remainder[:leftover]:
+            floors[i] += 1
+        return [(target, share, Decimal(sign * floors[i]) * CENT) for i, (target, share) in enumerate(shares)]
+
+    def allocate(self, costs: Iterable[ActualCost], created_by: str,
+                 period_start: Optional[datetime] = None, period_end: Optional[datetime] = None,
+                 reason: str = "Overhead allocation") -> List[CostAllocation]:
+        """CostAllocation rows for every cost posted to a source center within [period_start, period_end)."""
+        created_at = datetime.now()
+        percentages: Dict[Fraction, Decimal] = {}
+        allocations = []
+        for cost in costs:
+            if cost.cost_center_id not in self.distribution:
+                continue
+            if period_start is not None and cost.cost_date < period_start:
+                continue
+            if period_end is not None and cost.cost_date >= period_end:
+                continue
+            for (center, wbs_node), share, amount in self.split(cost.cost_center_id, cost.amount):
+                percentage = percentages.get(share)
+                if percentage is None:
+                    percentage = percentages[share] = (
+                        Decimal(share.numerator * 100) / Decimal(share.denominator)).quantize(PERCENT_PLACES)
+                allocations.append(CostAllocation(
+                    id=str(uuid.uuid4()),
+                    actual_cost_id=cost.id,
+                    allocation_percentage=percentage,
+                    allocated_amount=amount,
+                    target_cost_center_id=center,
+                    target_wbs_node_id=wbs_node,
+                    allocation_reason=reason,
+                    created_by=created_by,
+                    created_at=created_at,
+                ))
+        return allocations
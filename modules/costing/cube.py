@@ -0,0 +1,190 @@
+from bisect import bisect_right, insort
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from modules.costing.models import ActualCost, BudgetRevision, CostCenter, CostStatus, CostType
+
+ZERO = Decimal("0")
+CENT = Decimal("0.01")
+SPENT = (CostStatus.ACTUAL, CostStatus.ACCRUED)
+
+# cost center, cost code id, cost type value, cost status value, month; None in any slot but the first
+# means "all". Enum values rather than members keep key hashing in C (Enum.__hash__ is Python code).
+CellKey = Tuple[str, Optional[str], Optional[str], Optional[str], Optional[int]]
+
+def month_key(moment: datetime) -> int:
+    return moment.year * 12 + moment.month - 1
+
+@dataclass
+class BudgetVsActual:
+    cost_center_id: str
+    budget: Decimal
+    planned: Decimal
+    committed: Decimal
+    actual: Decimal
+    variance: Decimal
+    available: Decimal
+
+class CostCube:
+    """Budget-vs-actual cube over cost center x cost code x cost type x status x month.
+
+    Every posting is added to all 16 "all"-subsets of its coordinates, once for
+    the cost center itself and once for each ancestor, so any slice or rollup
+    is a single dictionary lookup. Cells hold integer cents. Budgets are
+    effective-dated from BudgetRevision rows, with subtree totals cached per
+    as-of date.
+    """
+
+    def __init__(self, cost_centers: Iterable[CostCenter], revisions: Iterable[BudgetRevision] = (),
+                 costs: Iterable[ActualCost] = ()):
+        self.centers: Dict[str, CostCenter] = {center.id: center for center in cost_centers}
+        self.children: Dict[str, List[str]] = {center_id: [] for center_id in self.centers}
+        self.roots: List[str] = []
+        for center in self.centers.values():
+            parent = center.parent_cost_center_id
+            if parent is None or parent not in self.centers:
+                self.roots.append(center.id)
+            else:
+                self.children[parent].append(center.id)
+        self.ancestors: Dict[str, Tuple[str, ...]] = {}
+        self.order: List[str] = []  # parents before children
+        for root in self.roots:
+            stack = [(root, (root,))]
+            while stack:
+                center_id, lineage = stack.pop()
+                self.ancestors[center_id] = lineage
+                self.order.append(center_id)
+                stack.extend((child, lineage + (child,)) for child in self.children[center_id])
+        if len(self.order) != len(self.centers):
+            looped = sorted(set(self.centers) - set(self.order))
+            raise ValueError(f"cost center hierarchy has a cycle through {looped}")
+
+        self.direct: Dict[CellKey, int] = {}
+        self.rollup: Dict[CellKey, int] = {}
+        self.codes: Dict[str, Set[str]] = {center_id: set() for center_id in self.centers}
+        self.first_month: Optional[int] = None
+        self.revisions: Dict[str, List[Tuple[datetime, int, Decimal]]] = {}
+        self._budgets: Dict[Optional[datetime], Dict[str, Decimal]] = {}
+        for revision in revisions:
+            self.add_revision(revision)
+        self.post_all(costs)
+
+    def post(self, cost: ActualCost) -> None:
+        lineage = self.ancestors.get(cost.cost_center_id)
+        if lineage is None:
+            raise ValueError(f"unknown cost center {cost.cost_center_id}")
+        month = month_key(cost.cost_date)
+        if self.first_month is None or month < self.first_month:
+            self.first_month = month
+        cents = int(cost.amount.quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+        slices = list(product((cost.cost_code_id, None), (cost.cost_type.value, None), (cost.cost_status.value, None),
+                              (month, None)))
+        direct, rollup = self.direct, self.rollup
+        for coordinates in slices:
+            key = (cost.cost_center_id, *coordinates)
+            direct[key] = direct.get(key, 0) + cents
+        for center_id in lineage:
+            self.codes[center_id].add(cost.cost_code_id)
+            for coordinates in slices:
+                key = (center_id, *coordinates)
+                rollup[key] = rollup.get(key, 0) + cents
+
+    def post_all(self, costs: Iterable[ActualCost]) -> int:
+        count = 0
+        for cost in costs:
+            self.post(cost)
+            count += 1
+        return count
+
+    def amount(self, cost_center_id: str, cost_code_id: Optional[str] = None, cost_type: Optional[CostType] = None,
+               cost_status: Optional[CostStatus] = None, month: Optional[int] = None,
+               include_children: bool = True) -> Decimal:
+        cells = self.rollup if include_children else self.direct
+        key = (cost_center_id, cost_code_id, cost_type and cost_type.value, cost_status and cost_status.value, month)
+        return cells.get(key, 0) * CENT
+
+    def amount_through(self, cost_center_id: str, last_month: int, cost_code_id: Optional[str] = None,
+                       cost_type: Optional[CostType] = None, cost_status: Optional[CostStatus] = None,
+                       include_children: bool = True) -> Decimal:
+        """Cumulative amount for every month up to and including ``last_month``."""
+        if self.first_month is None or last_month < self.first_month:
+            return ZERO
+        cells = self.rollup if include_children else self.direct
+        type_value, status_value = cost_type and cost_type.value, cost_status and cost_status.value
+        total = 0
+        for month in range(self.first_month, last_month + 1):
+            total += cells.get((cost_center_id, cost_code_id, type_value, status_value, month), 0)
+        return total * CENT
+
+    def add_revision(self, revision: BudgetRevision) -> None:
+        insort(self.revisions.setdefault(revision.cost_center_id, []),
+               (revision.effective_date, revision.revision_number, revision.revised_budget))
+        self._budgets.clear()
+
+    def _own_budget(self, cost_center_id: str, as_of: Optional[datetime]) -> Decimal:
+        history = self.revisions.get(cost_center_id)
+        if history:
+            if as_of is None:
+                return history[-1][2]
+            position = bisect_right(history, (as_of, float("inf")))
+            if position:
+                return history[position - 1][2]
+        return self.centers[cost_center_id].budget_amount
+
+    def _subtree_budgets(self, as_of: Optional[datetime]) -> Dict[str, Decimal]:
+        budgets = self._budgets.get(as_of)
+        if budgets is None:
+            budgets = {center_id: self._own_budget(center_id, as_of) for center_id in self.order}
+            for center_id in reversed(self.order):
+                parent = self.ancestors[center_id][-2] if len(self.ancestors[center_id]) > 1 else None
+                if parent is not None:
+                    budgets[parent] += budgets[center_id]
+            if len(self._budgets) >= 64:
+                self._budgets.clear()
+            self._budgets[as_of] = budgets
+        return budgets
+
+    def budget(self, cost_center_id: str, as_of: Optional[datetime] = None, include_children: bool = True) -> Decimal:
+        if not include_children:
+            return self._own_budget(cost_center_id, as_of)
+        return self._subtree_budgets(as_of)[cost_center_id]
+
+    def budget_vs_actual(self, cost_center_id: str, as_of: Optional[datetime] = None,
+                         cost_code_id: Optional[str] = None, cost_type: Optional[CostType] = None,
+                         include_children: bool = True) -> BudgetVsActual:
+        if as_of is None:
+            def total(status):
+                return self.amount(cost_center_id, cost_code_id, cost_type, status, None, include_children)
+        else:
+            last_month = month_key(as_of)
+
+            def total(status):
+                return self.amount_through(cost_center_id, last_month, cost_code_id, cost_type, status,
+                                           include_children)
+        budget = self.budget(cost_center_id, as_of, include_children)
+        actual = sum((total(status) for status in SPENT), ZERO)
+        committed = total(CostStatus.COMMITTED)
+        return BudgetVsActual(
+            cost_center_id=cost_center_id,
+            budget=budget,
+            planned=total(CostStatus.PLANNED),
+            committed=committed,
+            actual=actual,
+            variance=budget - actual,
+            available=budget - actual - committed,
+        )
+
+    def drill_down(self, cost_center_id: str, as_of: Optional[datetime] = None) -> List[BudgetVsActual]:
+        return [self.budget_vs_actual(child, as_of) for child in self.children[cost_center_id]]
+
+    def by_cost_type(self, cost_center_id: str, month: Optional[int] = None,
+                     cost_status: Optional[CostStatus] = None) -> Dict[CostType, Decimal]:
+        return {cost_type: self.amount(cost_center_id, None, cost_type, cost_status, month) for cost_type in CostType}
+
+    def by_cost_code(self, cost_center_id: str, month: Optional[int] = None,
+                     cost_status: Optional[CostStatus] = None) -> Dict[str, Decimal]:
+        return {code: self.amount(cost_center_id, code, None, cost_status, month)
+                for code in sorted(self.codes[cost_center_id])}
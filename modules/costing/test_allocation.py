@@ -0,0 +1,59 @@
+from datetime import datetime
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from modules.costing.allocation import AllocationError, AllocationRule, CostAllocationEngine
+from modules.costing.models import ActualCost, CostStatus, CostType
+
+NOW = datetime(2025, 1, 15)
+
+def _rule(source: str, target: str, percentage: str, wbs_node=None) -> AllocationRule:
+    return AllocationRule(source, target, Decimal(percentage), wbs_node)
+
+def _cost(cost_id: str, center_id: str, amount: str, when: datetime = NOW) -> ActualCost:
+    return ActualCost(cost_id, "p1", center_id, "code", None, None, CostType.OVERHEAD, CostStatus.ACTUAL,
+                      Decimal(amount), when, None, None, None, "u", NOW)
+
+def test_chained_allocation_lands_on_final_targets():
+    engine = CostAllocationEngine([_rule("a", "b", "60"), _rule("a", "x", "40"),
+                                   _rule("b", "y", "75", "w1"), _rule("b", "z", "25")])
+    assert engine.distribution["a"] == {("x", None): Fraction(2, 5), ("y", "w1"): Fraction(9, 20),
+                                        ("z", None): Fraction(3, 20)}
+
+def test_reciprocal_allocation_is_solved_exactly():
+    engine = CostAllocationEngine([_rule("a", "b", "50"), _rule("a", "x", "50"),
+                                   _rule("b", "a", "20"), _rule("b", "y", "80")])
+    assert engine.distribution["a"] == {("x", None): Fraction(5, 9), ("y", None): Fraction(4, 9)}
+    assert engine.distribution["b"] == {("x", None): Fraction(1, 9), ("y", None): Fraction(8, 9)}
+
+def test_closed_loop_is_rejected():
+    with pytest.raises(AllocationError, match="only allocate among themselves"):
+        CostAllocationEngine([_rule("a", "b", "100"), _rule("b", "a", "100")])
+
+@pytest.mark.parametrize("rules, message", [
+    ([_rule("a", "x", "60"), _rule("a", "y", "30")], "sum to 90%"),
+    ([_rule("a", "a", "10"), _rule("a", "x", "90")], "allocates to itself"),
+    ([_rule("a", "x", "110"), _rule("a", "y", "-10")], "negative"),
+    ([_rule("a", "b", "100", "w1"), _rule("b", "x", "100")], "cannot target a WBS node"),
+], ids=["total", "self", "negative", "wbs-on-source"])
+def test_invalid_rules_are_rejected(rules, message):
+    with pytest.raises(AllocationError, match=message):
+        CostAllocationEngine(rules)
+
+def test_split_cents_add_back_up():
+    engine = CostAllocationEngine([_rule("a", "x", "33.333333"), _rule("a", "y", "33.333333"),
+                                   _rule("a", "z", "33.333334")])
+    for amount in ("100.00", "0.01", "-10.00", "999.99"):
+        parts = [part for _, _, part in engine.split("a", Decimal(amount))]
+        assert sum(parts) == Decimal(amount)
+
+def test_allocate_filters_by_center_and_period():
+    engine = CostAllocationEngine([_rule("a", "x", "25"), _rule("a", "y", "75")])
+    costs = [_cost("c1", "a", "10.00"), _cost("c2", "other", "5.00"),
+             _cost("c3", "a", "8.00", datetime(2025, 2, 1)), _cost("c4", "a", "8.00", datetime(2024, 12, 31))]
+    allocations = engine.allocate(costs, "u", period_start=datetime(2025, 1, 1), period_end=datetime(2025, 2, 1))
+    assert [(a.actual_cost_id, a.target_cost_center_id, a.allocated_amount, a.allocation_percentage)
+            for a in allocations] == [("c1", "x", Decimal("2.50"), Decimal("25.000000")),
+                                      ("c1", "y", Decimal("7.50"), Decimal("75.000000"))]
@@ -0,0 +1,29 @@
+from datetime import datetime
+from decimal import Decimal
+
+from modules.costing.cube import CostCube
+from modules.costing.models import ActualCost, CostCenter, CostStatus, CostType
+
+NOW = datetime(2025, 1, 15)
+
+def _center(center_id: str, parent=None, budget: str = "0") -> CostCenter:
+    return CostCenter(center_id, "p1", center_id, center_id, None, parent, Decimal(budget), True, NOW)
+
+def _cost(cost_id: str, center_id: str, amount: str, status: CostStatus = CostStatus.ACTUAL) -> ActualCost:
+    return ActualCost(cost_id, "p1", center_id, "code", None, None, CostType.LABOR, status, Decimal(amount), NOW,
+                      None, None, None, "u", NOW)
+
+def test_half_cent_amounts_round_half_up():
+    cube = CostCube([_center("root")], costs=[_cost("c1", "root", "0.125"), _cost("c2", "root", "0.005")])
+    assert cube.amount("root") == Decimal("0.14")
+
+def test_budget_vs_actual_rolls_up_children_by_status():
+    cube = CostCube([_center("root", budget="100"), _center("child", "root", budget="50")], costs=[
+        _cost("c1", "child", "30.00"), _cost("c2", "child", "5.00", CostStatus.ACCRUED),
+        _cost("c3", "child", "10.00", CostStatus.COMMITTED), _cost("c4", "root", "7.00", CostStatus.PLANNED),
+    ])
+    result = cube.budget_vs_actual("root")
+    assert (result.budget, result.actual, result.committed, result.planned) == (
+        Decimal("150"), Decimal("35.00"), Decimal("10.00"), Decimal("7.00"))
+    assert result.available == Decimal("105.00")
+    assert cube.amount("root", include_children=False) == Decimal("7.00")
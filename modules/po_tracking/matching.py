@@ -0,0 +1,231 @@
+from decimal import Decimal
+from enum import Enum
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from dataclasses import dataclass
+
+from modules.goods_receipt.models import GoodsReceipt, ReceiptLine, ReceiptStatus
+from modules.po_tracking.models import POLine, POStatus, PurchaseOrder
+
+ZERO = Decimal("0")
+HUNDRED = Decimal("100")
+
+RECEIVABLE = {
+    POStatus.APPROVED, POStatus.SENT, POStatus.ACKNOWLEDGED,
+    POStatus.PARTIALLY_RECEIVED, POStatus.FULLY_RECEIVED,
+}
+EXCLUDED_RECEIPTS = {ReceiptStatus.REJECTED, ReceiptStatus.RETURNED}
+RECEIVED_STATUSES = {POStatus.PARTIALLY_RECEIVED, POStatus.FULLY_RECEIVED}
+
+class MatchStatus(Enum):
+    MATCHED = "matched"
+    AWAITING_RECEIPT = "awaiting_receipt"
+    AWAITING_INVOICE = "awaiting_invoice"
+    OVER_RECEIVED = "over_received"
+    QUANTITY_VARIANCE = "quantity_variance"
+    PRICE_VARIANCE = "price_variance"
+
+@dataclass
+class InvoiceLineRef:
+    invoice_id: str
+    po_line_id: str
+    quantity: Decimal
+    unit_rate: Decimal
+
+@dataclass
+class MatchTolerance:
+    quantity_percentage: Decimal = ZERO
+    price_percentage: Decimal = ZERO
+    amount: Decimal = ZERO
+
+    def quantity_limit(self, quantity: Decimal) -> Decimal:
+        return quantity * (HUNDRED + self.quantity_percentage) / HUNDRED
+
+    def quantity_floor(self, quantity: Decimal) -> Decimal:
+        return quantity * (HUNDRED - self.quantity_percentage) / HUNDRED
+
+    def price_within(self, expected_rate: Decimal, quantity: Decimal, amount: Decimal) -> bool:
+        difference = abs(amount - expected_rate * quantity)
+        if difference <= self.amount:
+            return True
+        return difference * HUNDRED <= expected_rate * quantity * self.price_percentage
+
+@dataclass
+class LineMatch:
+    po_line_id: str
+    po_id: str
+    ordered_quantity: Decimal
+    received_quantity: Decimal
+    accepted_quantity: Decimal
+    invoiced_quantity: Decimal
+    invoiced_amount: Decimal
+    status: MatchStatus
+
+class ThreeWayMatcher:
+    """Hash-joins PO lines, goods receipt lines and invoice lines on po_line_id.
+
+    Receipt and invoice quantities are aggregated per PO line, so a full match is
+    one pass over each input and an incremental receipt only re-matches the PO
+    lines (and purchase orders) it touches. Counted receipt lines are kept by
+    id, and invoice lines by (invoice_id, po_line_id), so a line seen again
+    replaces its earlier quantities instead of adding to them, and a receipt
+    can be retracted (or rejected) after the fact.
+    """
+
+    def __init__(self, po_lines: Iterable[POLine], tolerance: Optional[MatchTolerance] = None):
+        self.tolerance = tolerance or MatchTolerance()
+        self.lines: Dict[str, POLine] = {}
+        self.lines_by_po: Dict[str, List[str]] = {}
+        for line in po_lines:
+            self.lines[line.id] = line
+            self.lines_by_po.setdefault(line.po_id, []).append(line.id)
+        self.received: Dict[str, List[Decimal]] = {}  # po_line_id -> [received, accepted]
+        self.invoiced: Dict[str, List[Decimal]] = {}  # po_line_id -> [quantity, amount]
+        self.unmatched_receipt_lines: List[ReceiptLine] = []
+        self.unmatched_invoice_lines: List[InvoiceLineRef] = []
+        self.counted: Dict[str, ReceiptLine] = {}  # receipt line id -> line included in ``received``
+        self.invoice_lines: Dict[Tuple[str, str], InvoiceLineRef] = {}  # lines included in ``invoiced``
+        self.lines_by_receipt: Dict[str, Set[str]] = {}
+        self._status_before_receipt: Dict[str, POStatus] = {}
+
+    def _uncount(self, line_id: str) -> Optional[str]:
+        line = self.counted.pop(line_id, None)
+        if line is None:
+            return None
+        self.lines_by_receipt[line.receipt_id].discard(line_id)
+        totals = self.received[line.po_line_id]
+        totals[0] -= line.received_quantity
+        totals[1] -= line.accepted_quantity
+        return line.po_line_id
+
+    def _retract(self, receipt_id: str, keep: Iterable[str] = ()) -> Set[str]:
+        keep = set(keep)
+        touched = set()
+        for line_id in list(self.lines_by_receipt.get(receipt_id, ())):
+            if line_id not in keep:
+                touched.add(self._uncount(line_id))
+        self.unmatched_receipt_lines = [line for line in self.unmatched_receipt_lines
+                                        if line.receipt_id != receipt_id or line.id in keep]
+        return touched
+
+    def add_receipt_lines(self, lines: Iterable[ReceiptLine],
+                          receipts: Optional[Dict[str, GoodsReceipt]] = None) -> Set[str]:
+        touched = set()
+        unmatched = {line.id for line in self.unmatched_receipt_lines}
+        for line in lines:
+            previous = self._uncount(line.id)
+            if previous is not None:
+                touched.add(previous)
+            if receipts is not None:
+                receipt = receipts.get(line.receipt_id)
+                if receipt is not None and receipt.status in EXCLUDED_RECEIPTS:
+                    continue
+            if line.po_line_id not in self.lines:
+                if line.id not in unmatched:
+                    unmatched.add(line.id)
+                    self.unmatched_receipt_lines.append(line)
+                continue
+            totals = self.received.setdefault(line.po_line_id, [ZERO, ZERO])
+            totals[0] += line.received_quantity
+            totals[1] += line.accepted_quantity
+            self.counted[line.id] = line
+            self.lines_by_receipt.setdefault(line.receipt_id, set()).add(line.id)
+            touched.add(line.po_line_id)
+        return touched
+
+    def add_invoice_lines(self, lines: Iterable[InvoiceLineRef]) -> Set[str]:
+        """Count invoice lines; resubmitting an invoice replaces its earlier lines rather than adding to them."""
+        touched = set()
+        for line in lines:
+            key = (line.invoice_id, line.po_line_id)
+            if line.po_line_id not in self.lines:
+                self.unmatched_invoice_lines = [existing for existing in self.unmatched_invoice_lines
+                                                if (existing.invoice_id, existing.po_line_id) != key]
+                self.unmatched_invoice_lines.append(line)
+                continue
+            totals = self.invoiced.setdefault(line.po_line_id, [ZERO, ZERO])
+            previous = self.invoice_lines.get(key)
+            if previous is not None:
+                totals[0] -= previous.quantity
+                totals[1] -= previous.quantity * previous.unit_rate
+            self.invoice_lines[key] = line
+            totals[0] += line.quantity
+            totals[1] += line.quantity * line.unit_rate
+            touched.add(line.po_line_id)
+        return touched
+
+    def _match_line(self, line: POLine) -> LineMatch:
+        received, accepted = self.received.get(line.id, (ZERO, ZERO))
+        invoiced_quantity, invoiced_amount = self.invoiced.get(line.id, (ZERO, ZERO))
+        tolerance = self.tolerance
+
+        line.received_quantity = accepted
+        line.pending_quantity = max(line.quantity - accepted, ZERO)
+
+        if accepted > tolerance.quantity_limit(line.quantity):
+            status = MatchStatus.OVER_RECEIVED
+        elif not invoiced_quantity:
+            status = MatchStatus.AWAITING_INVOICE if accepted else MatchStatus.AWAITING_RECEIPT
+        elif invoiced_quantity > tolerance.quantity_limit(accepted):
+            status = MatchStatus.QUANTITY_VARIANCE
+        elif not tolerance.price_within(line.unit_rate, invoiced_quantity, invoiced_amount):
+            status = MatchStatus.PRICE_VARIANCE
+        else:
+            status = MatchStatus.MATCHED
+        return LineMatch(line.id, line.po_id, line.quantity, received, accepted,
+                         invoiced_quantity, invoiced_amount, status)
+
+    def match(self, po_line_ids: Optional[Iterable[str]] = None) -> List[LineMatch]:
+        ids = self.lines if po_line_ids is None else po_line_ids
+        return [self._match_line(self.lines[line_id]) for line_id in ids]
+
+    def receipt_status(self, po_id: str) -> Optional[POStatus]:
+        lines = [self.lines[line_id] for line_id in self.lines_by_po.get(po_id, ())]
+        if not lines:
+            return None
+        if all(line.received_quantity >= self.tolerance.quantity_floor(line.quantity) for line in lines):
+            return POStatus.FULLY_RECEIVED
+        if any(line.received_quantity for line in lines):
+            return POStatus.PARTIALLY_RECEIVED
+        return None
+
+    def update_orders(self, orders: Iterable[PurchaseOrder]) -> List[PurchaseOrder]:
+        changed = []
+        for order in orders:
+            if order.status not in RECEIVABLE:
+                continue
+            status = self.receipt_status(order.id)
+            if status is None and order.status in RECEIVED_STATUSES:
+                # Everything received was retracted: go back to the status before the first receipt.
+                status = self._status_before_receipt.pop(order.id, None)
+            elif status is not None and order.status not in RECEIVED_STATUSES:
+                self._status_before_receipt[order.id] = order.status
+            if status is not None and status is not order.status:
+                order.status = status
+                changed.append(order)
+        return changed
+
+    def apply_receipt(self, receipt: GoodsReceipt, lines: Iterable[ReceiptLine],
+                      orders: Dict[str, PurchaseOrder]) -> List[LineMatch]:
+        """Incremental mode: fold in one goods receipt and re-derive only what it touches.
+
+        Applying a receipt again replaces what it contributed before, so repeats
+        change nothing, lines dropped from it are removed, and a receipt now
+        REJECTED or RETURNED is retracted entirely.
+        """
+        lines = list(lines)
+        if receipt.status in EXCLUDED_RECEIPTS:
+            touched = self._retract(receipt.id)
+        else:
+            touched = self._retract(receipt.id, keep={line.id for line in lines})
+            touched |= self.add_receipt_lines(lines, {receipt.id: receipt})
+        return self._rematch(touched, orders)
+
+    def retract_receipt(self, receipt_id: str, orders: Dict[str, PurchaseOrder]) -> List[LineMatch]:
+        """Remove everything a receipt contributed, e.g. after it was rejected or cancelled."""
+        return self._rematch(self._retract(receipt_id), orders)
+
+    def _rematch(self, touched: Set[str], orders: Dict[str, PurchaseOrder]) -> List[LineMatch]:
+        matches = self.match(sorted(touched))
+        affected = {match.po_id for match in matches}
+        self.update_orders(orders[po_id] for po_id in affected if po_id in orders)
+        return matches
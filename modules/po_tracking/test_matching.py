@@ -0,0 +1,51 @@
+from datetime import datetime
+from decimal import Decimal
+
+from modules.goods_receipt.models import GoodsReceipt, QualityStatus, ReceiptLine, ReceiptStatus
+from modules.po_tracking.matching import InvoiceLineRef, MatchStatus, ThreeWayMatcher
+from modules.po_tracking.models import POLine
+
+NOW = datetime(2025, 1, 1)
+
+def _matcher() -> ThreeWayMatcher:
+    line = POLine("l1", "po1", 1, None, "Rebar", None, Decimal("10"), "t", Decimal("100.00"), Decimal("1000.00"),
+                  Decimal("0"), Decimal("10"), NOW)
+    return ThreeWayMatcher([line])
+
+def _receipt(status: ReceiptStatus) -> GoodsReceipt:
+    return GoodsReceipt("g1", "p1", "po1", "GRN-1", "v1", NOW, "u", status, None, None, None, Decimal("0"), None,
+                        NOW, NOW)
+
+def _receipt_line(accepted: str) -> ReceiptLine:
+    return ReceiptLine("gl1", "g1", "l1", Decimal("10"), Decimal(accepted), Decimal(accepted), Decimal("0"),
+                       Decimal("100.00"), Decimal("0"), QualityStatus.PASSED, None, None, None, None)
+
+def test_resubmitted_invoice_replaces_its_earlier_lines():
+    matcher = _matcher()
+    matcher.add_receipt_lines([_receipt_line("10")])
+    invoice = InvoiceLineRef("inv1", "l1", Decimal("10"), Decimal("100.00"))
+    matcher.add_invoice_lines([invoice])
+    matcher.add_invoice_lines([invoice])
+    match, = matcher.match()
+    assert (match.invoiced_quantity, match.invoiced_amount) == (Decimal("10"), Decimal("1000.00"))
+    assert match.status is MatchStatus.MATCHED
+
+    matcher.add_invoice_lines([InvoiceLineRef("inv1", "l1", Decimal("8"), Decimal("100.00"))])
+    matcher.add_invoice_lines([InvoiceLineRef("inv2", "l1", Decimal("2"), Decimal("100.00"))])
+    match, = matcher.match()
+    assert (match.invoiced_quantity, match.invoiced_amount) == (Decimal("10"), Decimal("1000.00"))
+
+def test_unmatched_invoice_lines_are_not_duplicated():
+    matcher = _matcher()
+    stray = InvoiceLineRef("inv1", "nope", Decimal("1"), Decimal("5"))
+    matcher.add_invoice_lines([stray])
+    matcher.add_invoice_lines([stray])
+    assert matcher.unmatched_invoice_lines == [stray]
+
+def test_reapplied_and_rejected_receipts():
+    matcher = _matcher()
+    matcher.apply_receipt(_receipt(ReceiptStatus.RECEIVED), [_receipt_line("6")], {})
+    match, = matcher.apply_receipt(_receipt(ReceiptStatus.RECEIVED), [_receipt_line("6")], {})
+    assert match.accepted_quantity == Decimal("6")
+    match, = matcher.apply_receipt(_receipt(ReceiptStatus.REJECTED), [_receipt_line("6")], {})
+    assert match.accepted_quantity == Decimal("0")
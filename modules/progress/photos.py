@@ -0,0 +1,274 @@
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import tempfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from modules.progress.models import ProgressPhoto
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are skipped without Pillow
+    Image = None
+
+THUMBNAIL_SIZES = (256, 1024)
+GRID_DEGREES = 0.001  # roughly 110 m of latitude per cell
+_COORDINATES = re.compile(r"^\s*\(?\s*(-?\d+(?:\.\d+)?)\s*[, ]\s*(-?\d+(?:\.\d+)?)\s*\)?\s*$")
+_SIGNATURES = ((b"\xff\xd8\xff", ".jpg"), (b"\x89PNG\r\n\x1a\n", ".png"), (b"GIF8", ".gif"),
+               (b"RIFF", ".webp"), (b"II*\x00", ".tif"), (b"MM\x00*", ".tif"))
+
+Cell = Tuple[int, int]
+
+def parse_coordinates(text: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(latitude, longitude) from "lat,lng", "lat lng", "(lat, lng)" or {"lat": .., "lng": ..} JSON."""
+    if not text:
+        return None
+    match = _COORDINATES.match(text)
+    if match:
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+    else:
+        try:
+            value = json.loads(text)
+            latitude = float(value.get("lat", value.get("latitude")))
+            longitude = float(value.get("lng", value.get("lon", value.get("longitude"))))
+        except (ValueError, TypeError, AttributeError):
+            return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+def _extension(content: bytes) -> str:
+    for signature, extension in _SIGNATURES:
+        if content.startswith(signature):
+            return extension
+    return ".bin"
+
+def make_thumbnails(source: str, destination_prefix: str, sizes: Sequence[int] = THUMBNAIL_SIZES) -> List[str]:
+    """Runs in a worker process; writes one JPEG per size and returns their paths."""
+    if Image is None:
+        return []
+    paths = []
+    with Image.open(source) as image:
+        image = image.convert("RGB")
+        for size in sizes:
+            path = f"{destination_prefix}_{size}.jpg"
+            if not os.path.exists(path):
+                thumbnail = image.copy()
+                thumbnail.thumbnail((size, size))
+                thumbnail.save(path, "JPEG", quality=85)
+            paths.append(path)
+    return paths
+
+class PhotoStore:
+    """Content-addressed photo files under a local directory: objects/ab/<sha256>.<ext>."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.thumbnails = os.path.join(root, "thumbnails")
+
+    def path_for(self, digest: str, extension: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest + extension)
+
+    def thumbnail_prefix(self, digest: str) -> str:
+        return os.path.join(self.thumbnails, digest[:2], digest)
+
+    def write(self, digest: str, content: bytes) -> Tuple[str, bool]:
+        """Path of the stored content, and whether this call created it (False when it was already on disk)."""
+        path = self.path_for(digest, _extension(content))
+        if os.path.exists(path):
+            return path, False
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        os.makedirs(os.path.dirname(self.thumbnail_prefix(digest)), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(content)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        return path, True
+
+    def discard(self, path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+class PhotoIndex:
+    """Spatial grid, tag and WBS inverted indexes over ProgressPhoto ids."""
+
+    def __init__(self, grid_degrees: float = GRID_DEGREES):
+        self.grid_degrees = grid_degrees
+        self.photos: Dict[str, ProgressPhoto] = {}
+        self.by_cell: Dict[Cell, Set[str]] = {}
+        self.by_tag: Dict[str, Set[str]] = {}
+        self.by_wbs: Dict[Optional[str], Set[str]] = {}
+        self.by_project: Dict[str, Set[str]] = {}
+        self.cells: Dict[str, Cell] = {}
+
+    def __len__(self) -> int:
+        return len(self.photos)
+
+    def cell(self, latitude: float, longitude: float) -> Cell:
+        return math.floor(latitude / self.grid_degrees), math.floor(longitude / self.grid_degrees)
+
+    def add(self, photo: ProgressPhoto) -> None:
+        if photo.id in self.photos:
+            self.remove(photo.id)
+        self.photos[photo.id] = photo
+        coordinates = parse_coordinates(photo.location_coordinates)
+        if coordinates is not None:
+            cell = self.cells[photo.id] = self.cell(*coordinates)
+            self.by_cell.setdefault(cell, set()).add(photo.id)
+        for tag in {tag.strip().lower() for tag in photo.tags if tag.strip()}:
+            self.by_tag.setdefault(tag, set()).add(photo.id)
+        self.by_wbs.setdefault(photo.wbs_node_id, set()).add(photo.id)
+        self.by_project.setdefault(photo.project_id, set()).add(photo.id)
+
+    def remove(self, photo_id: str) -> None:
+        photo = self.photos.pop(photo_id, None)
+        if photo is None:
+            return
+        cell = self.cells.pop(photo_id, None)
+        if cell is not None:
+            self.by_cell[cell].discard(photo_id)
+        for tag in photo.tags:
+            self.by_tag.get(tag.strip().lower(), set()).discard(photo_id)
+        self.by_wbs[photo.wbs_node_id].discard(photo_id)
+        self.by_project[photo.project_id].discard(photo_id)
+
+    def near(self, latitude: float, longitude: float, radius_cells: int = 1) -> Set[str]:
+        row, column = self.cell(latitude, longitude)
+        found: Set[str] = set()
+        for d_row in range(-radius_cells, radius_cells + 1):
+            for d_column in range(-radius_cells, radius_cells + 1):
+                found |= self.by_cell.get((row + d_row, column + d_column), set())
+        return found
+
+    def query(self, near: Optional[Tuple[float, float]] = None, radius_cells: int = 1,
+              tags: Iterable[str] = (), wbs_node_id: Optional[str] = None,
+              project_id: Optional[str] = None) -> List[ProgressPhoto]:
+        """Photos matching every given criterion; intersects the smallest candidate sets first."""
+        candidates: List[Set[str]] = [self.by_tag.get(tag.strip().lower(), set()) for tag in tags]
+        if wbs_node_id is not None:
+            candidates.append(self.by_wbs.get(wbs_node_id, set()))
+        if project_id is not None:
+            candidates.append(self.by_project.get(project_id, set()))
+        if near is not None:
+            candidates.append(self.near(near[0], near[1], radius_cells))
+        if not candidates:
+            matches: Set[str] = set(self.photos)
+        else:
+            candidates.sort(key=len)
+            matches = set(candidates[0])
+            for candidate in candidates[1:]:
+                if not matches:
+                    break
+                matches &= candidate
+        return sorted((self.photos[photo_id] for photo_id in matches), key=lambda photo: photo.taken_date)
+
+@dataclass
+class IngestResult:
+    photo: ProgressPhoto
+    digest: str
+    duplicate: bool
+    thumbnails: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+class PhotoIngestor:
+    """Async photo ingestion: hash, dedupe, store, thumbnail and index.
+
+    Hashing and file writes run in the default thread pool; thumbnails run in a
+    process pool (when Pillow is installed), either the one passed in or one
+    created on the first thumbnail and released by close(). Content already
+    ingested under the same sha256 is not written, thumbnailed or indexed
+    again; the caller's photo gets the stored file's photo_url and the result
+    points at the photo that first brought it in. Content found in the PhotoStore but
+    unknown to this ingestor (e.g. after a restart) is not rewritten, but the
+    photo is indexed against the stored file. An upload that fails leaves no
+    file behind.
+    """
+
+    def __init__(self, store: PhotoStore, index: Optional[PhotoIndex] = None,
+                 thumbnail_executor: Optional[Executor] = None, concurrency: int = 16,
+                 sizes: Sequence[int] = THUMBNAIL_SIZES):
+        self.store = store
+        self.index = PhotoIndex() if index is None else index
+        self.thumbnail_executor = thumbnail_executor
+        self._owns_executor = False
+        self.sizes = tuple(sizes)
+        self.concurrency = concurrency
+        self.digests: Dict[str, str] = {}  # sha256 -> photo id
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def _thumbnail_executor(self) -> Optional[Executor]:
+        if Image is None:
+            return None
+        if self.thumbnail_executor is None:
+            self.thumbnail_executor = ProcessPoolExecutor()
+            self._owns_executor = True
+        return self.thumbnail_executor
+
+    def close(self) -> None:
+        if self._owns_executor and self.thumbnail_executor is not None:
+            self.thumbnail_executor.shutdown()
+            self.thumbnail_executor = None
+            self._owns_executor = False
+
+    async def ingest(self, photo: ProgressPhoto, content: bytes) -> IngestResult:
+        loop = asyncio.get_running_loop()
+        digest = await loop.run_in_executor(None, lambda: hashlib.sha256(content).hexdigest())
+        existing = self.digests.get(digest)
+        if existing is None and digest in self._pending:
+            # The same bytes are being ingested concurrently; wait for that upload instead.
+            existing = await asyncio.shield(self._pending[digest])
+        if existing is not None:
+            photo.photo_url = self.store.path_for(digest, _extension(content))
+            return IngestResult(self.index.photos.get(existing, photo), digest, True)
+
+        pending = self._pending[digest] = loop.create_future()
+        path, created = None, False
+        try:
+            path, created = await loop.run_in_executor(None, self.store.write, digest, content)
+            thumbnails: List[str] = []
+            executor = self._thumbnail_executor()
+            if executor is not None:
+                thumbnails = await loop.run_in_executor(executor, make_thumbnails, path,
+                                                        self.store.thumbnail_prefix(digest), self.sizes)
+            photo.photo_url = path
+            self.digests[digest] = photo.id
+            self.index.add(photo)
+            pending.set_result(photo.id)
+        except BaseException as error:
+            if created:
+                self.store.discard(path)
+            if isinstance(error, asyncio.CancelledError):
+                pending.cancel()
+            else:
+                pending.set_exception(error)
+                pending.exception()
+            raise
+        finally:
+            del self._pending[digest]
+        return IngestResult(photo, digest, not created, thumbnails)
+
+    async def ingest_many(self, uploads: Iterable[Tuple[ProgressPhoto, bytes]]) -> List[IngestResult]:
+        """One result per upload, in order; a failed upload carries its error instead of failing the batch."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(photo: ProgressPhoto, content: bytes) -> IngestResult:
+            async with semaphore:
+                try:
+                    return await self.ingest(photo, content)
+                except Exception as error:
+                    return IngestResult(photo, "", False, error=f"{type(error).__name__}: {error}")
+
+        return await asyncio.gather(*(bounded(photo, content) for photo, content in uploads))
@@ -0,0 +1,41 @@
+import asyncio
+from datetime import datetime
+
+from modules.progress.models import ProgressPhoto
+from modules.progress.photos import PhotoIngestor, PhotoStore, parse_coordinates
+
+NOW = datetime(2025, 1, 1)
+JPEG = b"\xff\xd8\xff" + b"site photo"
+
+def _photo(photo_id: str, tags=("slab",), coordinates="51.5007, -0.1246") -> ProgressPhoto:
+    return ProgressPhoto(photo_id, "p1", "w1", None, "", "", NOW, "u", coordinates, list(tags), NOW)
+
+def test_duplicate_upload_gets_the_stored_url(tmp_path):
+    ingestor = PhotoIngestor(PhotoStore(str(tmp_path)))
+    first, second = _photo("a"), _photo("b")
+    results = asyncio.run(ingestor.ingest_many([(first, JPEG), (second, JPEG)]))
+    ingestor.close()
+    assert [result.duplicate for result in results] == [False, True]
+    assert results[1].photo is first
+    assert first.photo_url.endswith(".jpg")
+    assert second.photo_url == first.photo_url
+    assert len(ingestor.index) == 1
+
+def test_thumbnail_pool_is_not_created_up_front(tmp_path):
+    ingestor = PhotoIngestor(PhotoStore(str(tmp_path)))
+    assert ingestor.thumbnail_executor is None
+    ingestor.close()
+
+def test_failed_upload_is_isolated(tmp_path):
+    ingestor = PhotoIngestor(PhotoStore(str(tmp_path)))
+    results = asyncio.run(ingestor.ingest_many([(_photo("a"), JPEG), (_photo("b"), None)]))
+    assert results[0].error is None
+    assert results[1].error.startswith("TypeError")
+
+def test_index_queries_and_coordinates(tmp_path):
+    ingestor = PhotoIngestor(PhotoStore(str(tmp_path)))
+    asyncio.run(ingestor.ingest_many([(_photo("a"), JPEG + b"1"), (_photo("b", ("roof",), None), JPEG + b"2")]))
+    assert [photo.id for photo in ingestor.index.query(near=(51.5007, -0.1246))] == ["a"]
+    assert [photo.id for photo in ingestor.index.query(tags=["ROOF "])] == ["b"]
+    assert parse_coordinates('{"lat": 1.5, "lng": 2}') == (1.5, 2.0)
+    assert parse_coordinates("91, 0") is None
@@ -0,0 +1,74 @@
+import random
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from modules.progress import timeseries
+from modules.progress.timeseries import MONTH, WEEK, Bucket, TimeSeriesStore, _decode, _encode
+
+START = datetime(2025, 1, 6)  # a Monday
+
+def test_chunk_codec_round_trips_negative_and_large_deltas():
+    timestamps = [-5, 0, 1, 86_400, 2 ** 40, 2 ** 40 + 1]
+    values = [0, -1, 63, -64, 2 ** 50, -(2 ** 50)]
+    decoded_timestamps, decoded_values = _decode(_encode(timestamps, values))
+    assert (list(decoded_timestamps), list(decoded_values)) == (timestamps, values)
+    assert [list(column) for column in _decode(_encode([], []))] == [[], []]
+
+def test_range_and_as_of_span_sealed_chunks(monkeypatch):
+    monkeypatch.setattr(timeseries, "CHUNK_POINTS", 8)
+    store = TimeSeriesStore()
+    points = [(START + timedelta(hours=3 * i), round(i * 0.1234, 4)) for i in range(30)]
+    for moment, value in points:
+        store.add("s", moment, value)
+    assert len(store.series["s"].chunks) == 3
+    assert store.range("s") == points
+    assert store.range("s", points[5][0], points[20][0]) == points[5:21]
+    assert store.as_of("s", START - timedelta(seconds=1)) is None
+    assert store.as_of("s", points[7][0] + timedelta(hours=1)) == points[7][1]
+    assert store.as_of("s", points[8][0]) == points[8][1]
+    assert store.as_of("s", points[-1][0] + timedelta(days=9)) == points[-1][1]
+    assert store.range("missing") == [] and store.as_of("missing", START) is None
+
+def test_aware_datetimes_are_stored_as_utc():
+    store = TimeSeriesStore()
+    store.add("s", datetime(2025, 1, 6, 12, tzinfo=timezone(timedelta(hours=2))), 1.0)
+    assert store.range("s") == [(datetime(2025, 1, 6, 10), 1.0)]
+
+def test_late_and_replaced_points_match_in_order_ingest(monkeypatch):
+    monkeypatch.setattr(timeseries, "CHUNK_POINTS", 16)
+    rng = random.Random(3)
+    moments = [START + timedelta(hours=rng.randrange(24 * 70)) for _ in range(400)]
+    shuffled, latest = TimeSeriesStore(), {}
+    for moment in moments:
+        value = round(rng.uniform(-50, 50), 4)
+        shuffled.add("s", moment, value)
+        latest[moment] = value
+    ordered = TimeSeriesStore()
+    for moment in sorted(latest):
+        ordered.add("s", moment, latest[moment])
+    assert shuffled.range("s") == ordered.range("s")
+    for period in (WEEK, MONTH):
+        expected = ordered.aggregate("s", period)
+        actual = shuffled.aggregate("s", period)
+        assert [(b.start, b.count, b.minimum, b.maximum, b.last) for b in actual] == [
+            (b.start, b.count, b.minimum, b.maximum, b.last) for b in expected]
+        assert [b.total for b in actual] == pytest.approx([b.total for b in expected])
+
+def test_weekly_and_monthly_buckets():
+    store = TimeSeriesStore()
+    for day, value in [(0, 10.0), (2, 30.0), (8, 5.0), (26, 50.0)]:
+        store.add("s", START + timedelta(days=day), value)
+    assert store.aggregate("s", WEEK, end=START + timedelta(days=13)) == [
+        Bucket(START, 2, 40.0, 10.0, 30.0, 30.0), Bucket(START + timedelta(days=7), 1, 5.0, 5.0, 5.0, 5.0)]
+    assert [(bucket.start, bucket.count, bucket.last) for bucket in store.aggregate("s", MONTH)] == [
+        (datetime(2025, 1, 1), 3, 5.0), (datetime(2025, 2, 1), 1, 50.0)]
+
+def test_s_curve_carries_values_forward_and_weights_series():
+    store = TimeSeriesStore()
+    store.add("a", START - timedelta(days=7), 10.0)
+    store.add("a", START + timedelta(days=14), 40.0)
+    store.add("b", START + timedelta(days=7), 100.0)
+    curve = store.s_curve(["a", "b", "missing"], START, START + timedelta(days=21), weights=[2.0, 1.0, 1.0])
+    assert curve == [(START, 5.0), (START + timedelta(days=7), 30.0), (START + timedelta(days=14), 45.0),
+                     (START + timedelta(days=21), 45.0)]
@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from modules.progress.models import Milestone, MilestoneStatus, ProgressMeasurement, ProgressMethod
+from modules.progress.weighted import ProgressRollup, decode_child_progress, encode_child_progress
+from modules.wbs.models import WBSNode, WBSNodeType
+
+NOW = datetime(2025, 1, 1)
+
+def _node(node_id: str, parent_id=None, budget: float = 0.0) -> WBSNode:
+    return WBSNode(node_id, "p1", parent_id, node_id, node_id, None, WBSNodeType.WORK_PACKAGE, 0, 0, budget, 0.0,
+                   None, None, None, True, NOW, NOW)
+
+def _measurement(node_id: str, progress: str, method: ProgressMethod = ProgressMethod.PERCENTAGE_COMPLETE,
+                 days: int = 0, units=None) -> ProgressMeasurement:
+    planned, completed = units or (None, None)
+    return ProgressMeasurement(f"m-{node_id}-{days}", "p1", node_id, None, NOW + timedelta(days=days), method,
+                               Decimal("0"), Decimal(progress), Decimal("0"), planned, completed, "u", None, None,
+                               NOW + timedelta(days=days))
+
+def _milestone(milestone_id: str, node_id: str, weight: str, done: bool) -> Milestone:
+    status = MilestoneStatus.COMPLETED if done else MilestoneStatus.IN_PROGRESS
+    return Milestone(milestone_id, "p1", node_id, milestone_id, None, NOW, None, status, Decimal(weight), False, "u",
+                     NOW, NOW)
+
+NODES = [_node("root"), _node("a", "root", 300.0), _node("b", "root", 100.0), _node("a1", "a"), _node("a2", "a")]
+
+def test_parents_weight_children_by_budget_or_equally():
+    rollup = ProgressRollup(NODES, [
+        _measurement("a1", "50"),
+        _measurement("b", "0", ProgressMethod.UNITS_COMPLETE, units=(Decimal("4"), Decimal("3"))),
+        _measurement("root", "99"),
+    ])
+    assert [rollup.progress_of(node) for node in ("a1", "a2", "a", "b", "root")] == [50.0, 0.0, 25.0, 75.0, 37.5]
+
+def test_incremental_updates_match_a_full_recompute():
+    measurements = [_measurement("a1", "50")]
+    rollup = ProgressRollup(NODES, measurements)
+    later = _measurement("a2", "100", days=1)
+    assert rollup.apply_measurement(later) == ["a2", "a", "root"]
+    assert rollup.apply_measurement(_measurement("a1", "90", days=-1)) == []
+    assert rollup.apply_measurement(_measurement("a", "10", days=2)) == []
+    fresh = ProgressRollup(NODES, measurements + [later])
+    assert list(rollup.progress) == pytest.approx(list(fresh.progress))
+    assert rollup.progress_of("root") == pytest.approx(56.25)
+
+def test_milestones_and_cost_ratio_feed_leaf_progress():
+    rollup = ProgressRollup(NODES, [_measurement("b", "0", ProgressMethod.COST_RATIO)],
+                            [_milestone("x", "a1", "1", False), _milestone("y", "a1", "3", True)],
+                            actual_costs={"b": 25.0})
+    assert (rollup.progress_of("a1"), rollup.progress_of("b")) == (75.0, 25.0)
+    assert rollup.apply_milestone(_milestone("x", "a1", "1", True)) == ["a1", "a", "root"]
+    assert rollup.progress_of("a1") == 100.0
+    rollup.set_actual_cost("b", 250.0)
+    assert rollup.progress_of("b") == 100.0
+
+def test_snapshots_store_child_progress():
+    rollup = ProgressRollup(NODES, [_measurement("a1", "50")])
+    snapshots = {snapshot.wbs_node_id: snapshot for snapshot in rollup.snapshots("p1", "u", NOW)}
+    assert set(snapshots) == {"root", "a"}
+    root = snapshots["root"]
+    assert (root.total_weight, root.completed_weight, root.weighted_progress_percentage) == (
+        Decimal("400.0000"), Decimal("75.0000"), Decimal("18.75"))
+    assert decode_child_progress(root.child_progress_data) == [("a", 300.0, 25.0), ("b", 100.0, 0.0)]
+
+def test_child_progress_codec_reads_binary_and_legacy_json():
+    children = [("a", 1.5, 40.0), ("ü-node", 0.0, 100.0)]
+    assert decode_child_progress(encode_child_progress(children)) == children
+    assert decode_child_progress(encode_child_progress([])) == []
+    assert decode_child_progress("") == []
+    assert decode_child_progress('[{"wbs_node_id": "a", "weight": 2, "progress": 10}]') == [("a", 2.0, 10.0)]
+    assert decode_child_progress('{"a": 10, "b": {"weight": 3, "progress": 5}}') == [("a", 1.0, 10.0),
+                                                                                     ("b", 3.0, 5.0)]
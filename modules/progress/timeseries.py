@@ -0,0 +1,319 @@
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from modules.progress.models import ProgressMeasurement
+from modules.reporting.models import KPIValue
+
+VALUE_SCALE = 10_000  # values are kept to four decimal places
+CHUNK_POINTS = 1024
+EPOCH = datetime(1970, 1, 1)
+WEEK = "week"
+MONTH = "month"
+
+def _timestamp(moment: datetime) -> int:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - EPOCH) // timedelta(seconds=1)
+
+def _moment(timestamp: int) -> datetime:
+    return EPOCH + timedelta(seconds=timestamp)
+
+def week_key(moment: datetime) -> int:
+    return (moment.toordinal() - 1) // 7  # date.fromordinal(1) is a Monday
+
+def month_key(moment: datetime) -> int:
+    return moment.year * 12 + moment.month - 1
+
+def bucket_start(period: str, key: int) -> datetime:
+    if period == WEEK:
+        return datetime.combine(date.fromordinal(key * 7 + 1), datetime.min.time())
+    return datetime(key // 12, key % 12 + 1, 1)
+
+def _bucket_key(period: str, timestamp: int) -> int:
+    return (week_key if period == WEEK else month_key)(_moment(timestamp))
+
+def _encode(timestamps: Sequence[int], values: Sequence[int]) -> bytes:
+    """Delta + zigzag varint encoding of both columns, then zlib."""
+    out = bytearray()
+    previous_timestamp = previous_value = 0
+    for timestamp, value in zip(timestamps, values):
+        for delta in (timestamp - previous_timestamp, value - previous_value):
+            zigzag = delta << 1 if delta >= 0 else (-delta << 1) - 1
+            while zigzag > 0x7F:
+                out.append(zigzag & 0x7F | 0x80)
+                zigzag >>= 7
+            out.append(zigzag)
+        previous_timestamp, previous_value = timestamp, value
+    return zlib.compress(bytes(out))
+
+def _decode(blob: bytes) -> Tuple[array, array]:
+    data = zlib.decompress(blob)
+    timestamps, values = array('q'), array('q')
+    numbers = []
+    shift = current = 0
+    for byte in data:
+        current |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        numbers.append((current >> 1) ^ -(current & 1))
+        shift = current = 0
+    timestamp = value = 0
+    for position in range(0, len(numbers), 2):
+        timestamp += numbers[position]
+        value += numbers[position + 1]
+        timestamps.append(timestamp)
+        values.append(value)
+    return timestamps, values
+
+@dataclass
+class Bucket:
+    start: datetime
+    count: int
+    total: float
+    minimum: float
+    maximum: float
+    last: float
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+class _Series:
+    __slots__ = ("starts", "ends", "chunks", "head_timestamps", "head_values", "aggregates", "bucket_keys")
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.chunks: List[bytes] = []
+        self.head_timestamps = array('q')
+        self.head_values = array('q')
+        # period -> bucket key -> [count, sum, min, max, last timestamp, last value], all scaled ints
+        self.aggregates: Dict[str, Dict[int, List[int]]] = {WEEK: {}, MONTH: {}}
+        self.bucket_keys: Dict[str, List[int]] = {WEEK: [], MONTH: []}
+
+    def last_timestamp(self) -> Optional[int]:
+        if self.head_timestamps:
+            return self.head_timestamps[-1]
+        return self.ends[-1] if self.ends else None
+
+    def points(self, start: Optional[int] = None, end: Optional[int] = None) -> Tuple[array, array]:
+        """Points with start <= timestamp <= end, decoding only the chunks that overlap."""
+        timestamps, values = array('q'), array('q')
+        first = 0 if start is None else bisect_left(self.ends, start)
+        for index in range(first, len(self.chunks)):
+            if end is not None and self.starts[index] > end:
+                break
+            chunk_timestamps, chunk_values = _decode(self.chunks[index])
+            timestamps.extend(chunk_timestamps)
+            values.extend(chunk_values)
+        timestamps.extend(self.head_timestamps)
+        values.extend(self.head_values)
+        low = 0 if start is None else bisect_left(timestamps, start)
+        high = len(timestamps) if end is None else bisect_right(timestamps, end)
+        return timestamps[low:high], values[low:high]
+
+class TimeSeriesStore:
+    """Per-series compressed chunks with weekly and monthly rollups.
+
+    Points are appended to an uncompressed head that is sealed into a
+    delta/zigzag/varint + zlib chunk every CHUNK_POINTS points. As-of lookups
+    bisect chunk start times and decode at most one chunk. Week and month
+    buckets (count, sum, min, max, last) are maintained as points arrive, so
+    S-curves read the buckets rather than the raw points. A second point at
+    the same timestamp replaces the first.
+    """
+
+    def __init__(self):
+        self.series: Dict[str, _Series] = {}
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.series
+
+    def add(self, key: str, moment: datetime, value: float) -> None:
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = _Series()
+        timestamp, scaled = _timestamp(moment), round(value * VALUE_SCALE)
+        last = series.last_timestamp()
+        if last is None or timestamp > last:
+            series.head_timestamps.append(timestamp)
+            series.head_values.append(scaled)
+            if len(series.head_timestamps) >= CHUNK_POINTS:
+                self._seal(series)
+            for period in (WEEK, MONTH):
+                self._fold(series, period, timestamp, scaled)
+            return
+        replaced = self._insert(series, timestamp, scaled)
+        for period in (WEEK, MONTH):
+            key = _bucket_key(period, timestamp)
+            bucket = series.aggregates[period].get(key)
+            if bucket is None or replaced is not None and replaced in (bucket[2], bucket[3]):
+                self._rebuild_bucket(series, period, key)
+                continue
+            # Late point, or a replacement that cannot move min/max: adjust the bucket in place.
+            if replaced is None:
+                bucket[0] += 1
+                bucket[1] += scaled
+            else:
+                bucket[1] += scaled - replaced
+            bucket[2] = min(bucket[2], scaled)
+            bucket[3] = max(bucket[3], scaled)
+            if timestamp >= bucket[4]:
+                bucket[4], bucket[5] = timestamp, scaled
+
+    def _seal(self, series: _Series) -> None:
+        series.starts.append(series.head_timestamps[0])
+        series.ends.append(series.head_timestamps[-1])
+        series.chunks.append(_encode(series.head_timestamps, series.head_values))
+        series.head_timestamps, series.head_values = array('q'), array('q')
+
+    def _insert(self, series: _Series, timestamp: int, scaled: int) -> Optional[int]:
+        """Place an out-of-order point; returns the value it replaced, if any."""
+        if not series.chunks or series.head_timestamps and timestamp >= series.head_timestamps[0]:
+            timestamps, values = series.head_timestamps, series.head_values
+            chunk = None
+        else:
+            chunk = max(bisect_right(series.starts, timestamp) - 1, 0)
+            timestamps, values = _decode(series.chunks[chunk])
+        position = bisect_left(timestamps, timestamp)
+        replaced = None
+        if position < len(timestamps) and timestamps[position] == timestamp:
+            replaced = values[position]
+            values[position] = scaled
+        else:
+            timestamps.insert(position, timestamp)
+            values.insert(position, scaled)
+        if chunk is not None:
+            series.starts[chunk], series.ends[chunk] = timestamps[0], timestamps[-1]
+            series.chunks[chunk] = _encode(timestamps, values)
+        return replaced
+
+    def _fold(self, series: _Series, period: str, timestamp: int, scaled: int) -> None:
+        key = _bucket_key(period, timestamp)
+        buckets = series.aggregates[period]
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [1, scaled, scaled, scaled, timestamp, scaled]
+            insort(series.bucket_keys[period], key)
+            return
+        bucket[0] += 1
+        bucket[1] += scaled
+        bucket[2] = min(bucket[2], scaled)
+        bucket[3] = max(bucket[3], scaled)
+        bucket[4], bucket[5] = timestamp, scaled
+
+    def _rebuild_bucket(self, series: _Series, period: str, key: int) -> None:
+        start = _timestamp(bucket_start(period, key))
+        end = _timestamp(bucket_start(period, key + 1)) - 1
+        timestamps, values = series.points(start, end)
+        buckets = series.aggregates[period]
+        if key not in buckets:
+            insort(series.bucket_keys[period], key)
+        buckets[key] = [len(values), sum(values), min(values), max(values), timestamps[-1], values[-1]]
+
+    def add_measurement(self, measurement: ProgressMeasurement) -> None:
+        node = measurement.wbs_node_id or measurement.task_id or ""
+        self.add(progress_key(measurement.project_id, node, "actual"),
+                 measurement.measurement_date, float(measurement.actual_progress))
+        self.add(progress_key(measurement.project_id, node, "planned"),
+                 measurement.measurement_date, float(measurement.planned_progress))
+
+    def add_kpi_value(self, kpi_value: KPIValue) -> None:
+        self.add(kpi_key(kpi_value.kpi_id, kpi_value.project_id), kpi_value.measurement_date, kpi_value.actual_value)
+
+    def ingest(self, rows: Iterable) -> int:
+        count = 0
+        for row in rows:
+            if isinstance(row, ProgressMeasurement):
+                self.add_measurement(row)
+            else:
+                self.add_kpi_value(row)
+            count += 1
+        return count
+
+    def range(self, key: str, start: Optional[datetime] = None,
+              end: Optional[datetime] = None) -> List[Tuple[datetime, float]]:
+        series = self.series.get(key)
+        if series is None:
+            return []
+        timestamps, values = series.points(None if start is None else _timestamp(start),
+                                           None if end is None else _timestamp(end))
+        return [(_moment(timestamp), value / VALUE_SCALE) for timestamp, value in zip(timestamps, values)]
+
+    def as_of(self, key: str, moment: datetime) -> Optional[float]:
+        """Latest value recorded at or before ``moment``."""
+        series = self.series.get(key)
+        if series is None:
+            return None
+        timestamp = _timestamp(moment)
+        if series.head_timestamps and timestamp >= series.head_timestamps[0]:
+            position = bisect_right(series.head_timestamps, timestamp) - 1
+            return series.head_values[position] / VALUE_SCALE
+        chunk = bisect_right(series.starts, timestamp) - 1
+        if chunk < 0:
+            return None
+        timestamps, values = _decode(series.chunks[chunk])
+        return values[bisect_right(timestamps, timestamp) - 1] / VALUE_SCALE
+
+    def aggregate(self, key: str, period: str = WEEK, start: Optional[datetime] = None,
+                  end: Optional[datetime] = None) -> List[Bucket]:
+        series = self.series.get(key)
+        if series is None:
+            return []
+        keys = series.bucket_keys[period]
+        to_key = week_key if period == WEEK else month_key
+        low = 0 if start is None else bisect_left(keys, to_key(start))
+        high = len(keys) if end is None else bisect_right(keys, to_key(end))
+        buckets = series.aggregates[period]
+        return [Bucket(bucket_start(period, bucket_key), count, total / VALUE_SCALE, low_value / VALUE_SCALE,
+                       high_value / VALUE_SCALE, last / VALUE_SCALE)
+                for bucket_key in keys[low:high]
+                for count, total, low_value, high_value, _, last in (buckets[bucket_key],)]
+
+    def s_curve(self, keys: Sequence[str], start: datetime, end: datetime, period: str = WEEK,
+                weights: Optional[Sequence[float]] = None) -> List[Tuple[datetime, float]]:
+        """Weighted average of the series' last value per period, carried forward between measurements.
+
+        Each series contributes one delta per period it has data in, and a
+        prefix sum turns the deltas into the curve, so cost scales with the
+        number of populated buckets rather than series x periods.
+        """
+        to_key = week_key if period == WEEK else month_key
+        first, last = to_key(start), to_key(end)
+        periods = last - first + 1
+        deltas = [0.0] * (periods + 1)
+        total_weight = 0.0
+        for index, key in enumerate(keys):
+            weight = 1.0 if weights is None else weights[index]
+            total_weight += weight
+            series = self.series.get(key)
+            if series is None or not weight:
+                continue
+            bucket_keys, buckets = series.bucket_keys[period], series.aggregates[period]
+            position = bisect_left(bucket_keys, first)
+            previous = buckets[bucket_keys[position - 1]][5] if position else 0
+            deltas[0] += weight * previous
+            for bucket_key in bucket_keys[position:bisect_right(bucket_keys, last)]:
+                value = buckets[bucket_key][5]
+                deltas[bucket_key - first] += weight * (value - previous)
+                previous = value
+        curve, running = [], 0.0
+        scale = VALUE_SCALE * (total_weight or 1.0)
+        for offset in range(periods):
+            running += deltas[offset]
+            curve.append((bucket_start(period, first + offset), running / scale))
+        return curve
+
+def progress_key(project_id: str, node_id: str, kind: str = "actual") -> str:
+    return f"progress:{kind}:{project_id}:{node_id}"
+
+def kpi_key(kpi_id: str, project_id: str) -> str:
+    return f"kpi:{kpi_id}:{project_id}"
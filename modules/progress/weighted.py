@@ -0,0 +1,220 @@
+import base64
+import json
+import struct
+import uuid
+from array import array
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from modules.progress.models import Milestone, MilestoneStatus, ProgressMeasurement, ProgressMethod, WeightedProgress
+from modules.wbs.models import WBSNode
+from modules.wbs.rollup import WBSTree, WBSTreeError
+
+SNAPSHOT_PREFIX = "wp1:"
+_COUNT = struct.Struct("<I")
+_CHILD = struct.Struct("<Hdd")  # id length, weight, progress percentage
+PERCENT = Decimal("0.01")
+WEIGHT = Decimal("0.0001")
+
+ChildProgress = Tuple[str, float, float]  # wbs_node_id, weight, progress percentage
+
+def encode_child_progress(children: Sequence[ChildProgress]) -> str:
+    """Compact replacement for the JSON in WeightedProgress.child_progress_data."""
+    parts = [_COUNT.pack(len(children))]
+    for node_id, weight, progress in children:
+        encoded = node_id.encode()
+        parts.append(_CHILD.pack(len(encoded), weight, progress))
+        parts.append(encoded)
+    return SNAPSHOT_PREFIX + base64.b64encode(b"".join(parts)).decode("ascii")
+
+def decode_child_progress(data: str) -> List[ChildProgress]:
+    """Reads both the binary snapshot and the older JSON child progress blobs."""
+    if not data:
+        return []
+    if not data.startswith(SNAPSHOT_PREFIX):
+        items = json.loads(data)
+        if isinstance(items, dict):
+            items = [{"wbs_node_id": key, **value} if isinstance(value, dict) else
+                     {"wbs_node_id": key, "progress": value} for key, value in items.items()]
+        return [(str(item.get("wbs_node_id") or item.get("id")), float(item.get("weight", 1)),
+                 float(item.get("progress", item.get("weighted_progress_percentage", 0)))) for item in items]
+    raw = base64.b64decode(data[len(SNAPSHOT_PREFIX):])
+    count, = _COUNT.unpack_from(raw, 0)
+    offset, children = _COUNT.size, []
+    for _ in range(count):
+        length, weight, progress = _CHILD.unpack_from(raw, offset)
+        offset += _CHILD.size
+        children.append((raw[offset:offset + length].decode(), weight, progress))
+        offset += length
+    return children
+
+def measured_progress(measurement: ProgressMeasurement) -> float:
+    """Percentage complete recorded by one measurement, for every method except MILESTONE_WEIGHTED."""
+    if measurement.progress_method is ProgressMethod.UNITS_COMPLETE and measurement.units_planned:
+        return float(measurement.units_completed or 0) / float(measurement.units_planned) * 100
+    return float(measurement.actual_progress)
+
+class ProgressRollup:
+    """Weighted progress over a WBS, held in flat arrays in WBSTree order.
+
+    Leaf progress comes from the latest ProgressMeasurement on the node, read
+    according to its ProgressMethod; MILESTONE_WEIGHTED nodes (and nodes with
+    milestones but no measurement) use completed Milestone.weight over total
+    weight. COST_RATIO uses ``actual_costs`` against the node budget when
+    given. A parent's progress is its children's progress weighted by their
+    ``weight_field``, or equally when those weights are all zero. Measurements
+    on summary nodes are ignored, since their progress is derived.
+    """
+
+    def __init__(self, nodes: Sequence[WBSNode], measurements: Iterable[ProgressMeasurement] = (),
+                 milestones: Iterable[Milestone] = (), actual_costs: Optional[Mapping[str, float]] = None,
+                 weight_field: str = "budget_allocation"):
+        self.tree = WBSTree(nodes)
+        self.actual_costs = dict(actual_costs or {})
+        size = len(self.tree)
+        parent = self.tree.parent
+        self.progress = array('d', [0.0]) * size
+        self.weight = array('d', (max(float(getattr(node, weight_field)), 0.0) for node in self.tree.nodes))
+        self.child_weight = array('d', [0.0]) * size
+        for position in range(size):
+            if parent[position] >= 0:
+                self.child_weight[parent[position]] += self.weight[position]
+        for position in range(size):
+            if parent[position] >= 0 and self.child_weight[parent[position]] == 0:
+                self.weight[position] = 1.0
+        for position in range(size):
+            if self.tree.child_count[position] and self.child_weight[position] == 0:
+                self.child_weight[position] = float(self.tree.child_count[position])
+        # Children of a node are contiguous in breadth-first order.
+        self.first_child = array('l', [-1]) * size
+        for position in range(size - 1, -1, -1):
+            if parent[position] >= 0:
+                self.first_child[parent[position]] = position
+
+        self.latest: Dict[int, ProgressMeasurement] = {}
+        self.milestones: Dict[int, Dict[str, Milestone]] = {}
+        for measurement in measurements:
+            self._record_measurement(measurement)
+        for milestone in milestones:
+            self._record_milestone(milestone)
+        self.recompute()
+
+    def _position(self, wbs_node_id: Optional[str]) -> Optional[int]:
+        position = self.tree.index.get(wbs_node_id) if wbs_node_id is not None else None
+        if position is None or not self.tree.is_leaf(position):
+            return None
+        return position
+
+    def _record_measurement(self, measurement: ProgressMeasurement) -> Optional[int]:
+        position = self._position(measurement.wbs_node_id)
+        if position is None:
+            return None
+        current = self.latest.get(position)
+        if current is not None and (current.measurement_date, current.created_at) > (
+                measurement.measurement_date, measurement.created_at):
+            return None
+        self.latest[position] = measurement
+        return position
+
+    def _record_milestone(self, milestone: Milestone) -> Optional[int]:
+        position = self._position(milestone.wbs_node_id)
+        if position is not None:
+            self.milestones.setdefault(position, {})[milestone.id] = milestone
+        return position
+
+    def _milestone_progress(self, position: int) -> float:
+        milestones = self.milestones.get(position)
+        if not milestones:
+            return 0.0
+        total = sum(float(milestone.weight) for milestone in milestones.values())
+        if total <= 0:
+            return 0.0
+        completed = sum(float(milestone.weight) for milestone in milestones.values()
+                        if milestone.status is MilestoneStatus.COMPLETED)
+        return completed / total * 100
+
+    def leaf_progress(self, position: int) -> float:
+        measurement = self.latest.get(position)
+        if measurement is None or measurement.progress_method is ProgressMethod.MILESTONE_WEIGHTED:
+            value = self._milestone_progress(position)
+        elif measurement.progress_method is ProgressMethod.COST_RATIO and self.tree.ids[position] in self.actual_costs:
+            budget = float(self.tree.nodes[position].budget_allocation)
+            value = self.actual_costs[self.tree.ids[position]] / budget * 100 if budget else 0.0
+        else:
+            value = measured_progress(measurement)
+        return min(max(value, 0.0), 100.0)
+
+    def recompute(self) -> None:
+        """Full bottom-up pass; parents always follow their children in reverse tree order."""
+        progress, weight, parent, child_count = self.progress, self.weight, self.tree.parent, self.tree.child_count
+        weighted = array('d', [0.0]) * len(progress)
+        for position in range(len(progress) - 1, -1, -1):
+            if child_count[position]:
+                progress[position] = weighted[position] / self.child_weight[position]
+            else:
+                progress[position] = self.leaf_progress(position)
+            if parent[position] >= 0:
+                weighted[parent[position]] += weight[position] * progress[position]
+
+    def _propagate(self, position: int) -> List[str]:
+        delta = self.leaf_progress(position) - self.progress[position]
+        changed = []
+        while delta:
+            self.progress[position] += delta
+            changed.append(self.tree.ids[position])
+            parent = self.tree.parent[position]
+            if parent < 0:
+                break
+            delta = self.weight[position] * delta / self.child_weight[parent]
+            position = parent
+        return changed
+
+    def apply_measurement(self, measurement: ProgressMeasurement) -> List[str]:
+        """Fold in one new measurement; returns the ids of the nodes whose progress changed."""
+        position = self._record_measurement(measurement)
+        return [] if position is None else self._propagate(position)
+
+    def apply_milestone(self, milestone: Milestone) -> List[str]:
+        position = self._record_milestone(milestone)
+        return [] if position is None else self._propagate(position)
+
+    def set_actual_cost(self, wbs_node_id: str, amount: float) -> List[str]:
+        self.actual_costs[wbs_node_id] = amount
+        position = self._position(wbs_node_id)
+        return [] if position is None else self._propagate(position)
+
+    def progress_of(self, wbs_node_id: str) -> float:
+        return self.progress[self.tree.index[wbs_node_id]]
+
+    def children_of(self, position: int) -> range:
+        first = self.first_child[position]
+        return range(first, first + self.tree.child_count[position]) if first >= 0 else range(0)
+
+    def weighted_progress(self, wbs_node_id: str, project_id: str, calculated_by: str,
+                          calculation_date: Optional[datetime] = None) -> WeightedProgress:
+        position = self.tree.index.get(wbs_node_id)
+        if position is None:
+            raise WBSTreeError(f"unknown WBS node {wbs_node_id}")
+        children = self.children_of(position)
+        total = self.child_weight[position] if children else self.weight[position]
+        progress = self.progress[position]
+        now = datetime.now()
+        return WeightedProgress(
+            id=str(uuid.uuid4()),
+            project_id=project_id,
+            wbs_node_id=wbs_node_id,
+            calculation_date=calculation_date or now,
+            total_weight=Decimal(repr(total)).quantize(WEIGHT),
+            completed_weight=Decimal(repr(total * progress / 100)).quantize(WEIGHT),
+            weighted_progress_percentage=Decimal(repr(progress)).quantize(PERCENT),
+            child_progress_data=encode_child_progress(
+                [(self.tree.ids[child], self.weight[child], self.progress[child]) for child in children]),
+            calculated_by=calculated_by,
+            created_at=now,
+        )
+
+    def snapshots(self, project_id: str, calculated_by: str,
+                  calculation_date: Optional[datetime] = None) -> List[WeightedProgress]:
+        return [self.weighted_progress(node_id, project_id, calculated_by, calculation_date)
+                for position, node_id in enumerate(self.tree.ids) if not self.tree.is_leaf(position)]
@@ -0,0 +1,136 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional, Sequence, Tuple, Union
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from modules.projects.models import ProjectSettings
+
+DEFAULT_DAY_START = time(8)
+
+DateLike = Union[date, datetime]
+
+class CalendarError(ValueError):
+    pass
+
+def _ordinal(day: DateLike) -> int:
+    return day.toordinal()
+
+class WorkingCalendar:
+    """Working-day arithmetic over a weekly pattern minus holidays.
+
+    Every date has a workday rank: the number of working days before it since
+    0001-01-01 (a Monday). The weekly pattern makes the rank a closed form
+    (whole weeks plus a prefix within the week), and holidays are a sorted
+    array subtracted by bisection, so ranks, "add N working days" and "working
+    days between" are O(log holidays) with no day-by-day loop.
+
+    A working day runs from ``day_start`` for ``hours_per_day`` hours. Aware
+    datetimes are converted to the calendar's timezone; naive ones are taken
+    as already local.
+    """
+
+    def __init__(self, working_days: Iterable[int], hours_per_day: float, timezone: str = "UTC",
+                 holidays: Iterable[date] = (), day_start: time = DEFAULT_DAY_START):
+        pattern = sorted({int(weekday) for weekday in working_days})
+        if not pattern or pattern[0] < 0 or pattern[-1] > 6:
+            raise CalendarError(f"working days must be a non-empty subset of 0-6, not {pattern}")
+        if not 0 < hours_per_day <= 24:
+            raise CalendarError(f"working hours per day must be within (0, 24], not {hours_per_day}")
+        try:
+            self.tz = ZoneInfo(timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise CalendarError(f"unknown timezone {timezone!r}") from None
+        self.timezone = timezone
+        self.working_days: Tuple[int, ...] = tuple(pattern)
+        self.hours_per_day = float(hours_per_day)
+        self.day_start = day_start
+        self.per_week = len(pattern)
+        self.is_working_weekday = tuple(weekday in pattern for weekday in range(7))
+        # prefix[w]: working weekdays before weekday w in the same week.
+        self.prefix = array('l', [0] * 8)
+        for weekday in range(7):
+            self.prefix[weekday + 1] = self.prefix[weekday] + self.is_working_weekday[weekday]
+        self.holidays = array('l', sorted({_ordinal(day) for day in holidays
+                                           if self.is_working_weekday[day.weekday()]}))
+        # Pattern rank of the i-th holiday minus i; the rank -> date inverse bisects this.
+        self._shifted = array('l', (self._pattern_rank(ordinal) - i for i, ordinal in enumerate(self.holidays)))
+        self._start_seconds = (day_start.hour * 60 + day_start.minute) * 60 + day_start.second
+        self._day_seconds = round(self.hours_per_day * 3600)
+
+    def _pattern_rank(self, ordinal: int) -> int:
+        weeks, weekday = divmod(ordinal - 1, 7)
+        return weeks * self.per_week + self.prefix[weekday]
+
+    def rank(self, day: DateLike) -> int:
+        """Working days before ``day``; equal ranks mean no working day in between."""
+        ordinal = _ordinal(day)
+        return self._pattern_rank(ordinal) - bisect_left(self.holidays, ordinal)
+
+    def workday(self, rank: int) -> date:
+        """The working day with the given rank."""
+        pattern_rank = rank + bisect_right(self._shifted, rank)
+        weeks, position = divmod(pattern_rank, self.per_week)
+        return date.fromordinal(1 + weeks * 7 + self.working_days[position])
+
+    def is_working_day(self, day: DateLike) -> bool:
+        ordinal = _ordinal(day)
+        if not self.is_working_weekday[(ordinal - 1) % 7]:
+            return False
+        position = bisect_left(self.holidays, ordinal)
+        return position == len(self.holidays) or self.holidays[position] != ordinal
+
+    def add_working_days(self, day: DateLike, days: int) -> date:
+        """The working day ``days`` working days after ``day`` (before, when negative).
+
+        A non-working ``day`` counts as the next working day, so adding 0 rolls forward.
+        """
+        return self.workday(self.rank(day) + days)
+
+    def working_days_between(self, start: DateLike, end: DateLike) -> int:
+        """Working days in [start, end); negative when end is before start."""
+        return self.rank(end) - self.rank(start)
+
+    def _local(self, moment: datetime) -> datetime:
+        if moment.tzinfo is not None:
+            return moment.astimezone(self.tz).replace(tzinfo=None)
+        return moment
+
+    def _working_seconds(self, moment: datetime) -> int:
+        """Working seconds before ``moment`` since the epoch of the rank scale."""
+        moment = self._local(moment)
+        seconds = self.rank(moment) * self._day_seconds
+        if self.is_working_day(moment):
+            into_day = moment.hour * 3600 + moment.minute * 60 + moment.second - self._start_seconds
+            seconds += min(max(into_day, 0), self._day_seconds)
+        return seconds
+
+    def working_hours_between(self, start: datetime, end: datetime) -> float:
+        return (self._working_seconds(end) - self._working_seconds(start)) / 3600
+
+    def add_working_days_many(self, days: Sequence[DateLike], offsets: Union[int, Sequence[int]]) -> List[date]:
+        """add_working_days over a column of dates, with one offset or one per date."""
+        if isinstance(offsets, int):
+            offsets = [offsets] * len(days)
+        rank, workday = self.rank, self.workday
+        return [workday(rank(day) + offset) for day, offset in zip(days, offsets)]
+
+    def working_days_between_many(self, starts: Sequence[DateLike], ends: Sequence[DateLike]) -> array:
+        rank = self.rank
+        return array('l', (rank(end) - rank(start) for start, end in zip(starts, ends)))
+
+    def working_hours_between_many(self, starts: Sequence[datetime], ends: Sequence[datetime]) -> array:
+        seconds = self._working_seconds
+        return array('d', ((seconds(end) - seconds(start)) / 3600 for start, end in zip(starts, ends)))
+
+@lru_cache(maxsize=256)
+def _cached_calendar(working_days: Tuple[int, ...], hours_per_day: float, timezone: str,
+                     holidays: FrozenSet[date], day_start: time) -> WorkingCalendar:
+    return WorkingCalendar(working_days, hours_per_day, timezone, holidays, day_start)
+
+def calendar_for(settings: ProjectSettings, holidays: Iterable[date] = (),
+                 day_start: Optional[time] = None) -> WorkingCalendar:
+    """Shared calendar for a project's settings; projects with the same calendar get the same instance."""
+    return _cached_calendar(tuple(sorted(set(settings.working_days))), float(settings.working_hours_per_day),
+                            settings.timezone or "UTC", frozenset(holidays), day_start or DEFAULT_DAY_START)
@@ -0,0 +1,92 @@
+import random
+from datetime import date, datetime, time, timedelta, timezone
+
+import pytest
+
+from modules.projects.calendar import CalendarError, WorkingCalendar, calendar_for
+from modules.projects.models import ProjectSettings
+
+MONDAY = date(2025, 1, 6)
+
+def _brute_between(calendar: WorkingCalendar, start: date, end: date, holidays) -> int:
+    days = [start + timedelta(days=i) for i in range((end - start).days)]
+    return sum(day.weekday() in calendar.working_days and day not in holidays for day in days)
+
+def _brute_add(calendar: WorkingCalendar, day: date, count: int, holidays) -> date:
+    def working(candidate):
+        return candidate.weekday() in calendar.working_days and candidate not in holidays
+    while not working(day):
+        day += timedelta(days=1)
+    step = 1 if count >= 0 else -1
+    for _ in range(abs(count)):
+        day += timedelta(days=step)
+        while not working(day):
+            day += timedelta(days=step)
+    return day
+
+@pytest.mark.parametrize("pattern", [(0, 1, 2, 3, 4), (0, 2, 4, 5), (6,), tuple(range(7))])
+def test_rank_arithmetic_matches_a_day_by_day_walk(pattern):
+    rng = random.Random(sum(pattern))
+    holidays = {MONDAY + timedelta(days=rng.randrange(400)) for _ in range(40)}
+    calendar = WorkingCalendar(pattern, 8, holidays=holidays)
+    for _ in range(200):
+        start = MONDAY + timedelta(days=rng.randrange(-30, 300))
+        end = start + timedelta(days=rng.randrange(0, 90))
+        assert calendar.working_days_between(start, end) == _brute_between(calendar, start, end, holidays)
+        assert calendar.working_days_between(end, start) == -calendar.working_days_between(start, end)
+        count = rng.randrange(-40, 40)
+        assert calendar.add_working_days(start, count) == _brute_add(calendar, start, count, holidays)
+        assert calendar.is_working_day(start) == (start.weekday() in pattern and start not in holidays)
+
+def test_workday_inverts_rank_on_working_days():
+    calendar = WorkingCalendar(range(5), 8, holidays=[date(2025, 1, 8), date(2025, 1, 11)])
+    for offset in range(21):
+        day = MONDAY + timedelta(days=offset)
+        if calendar.is_working_day(day):
+            assert calendar.workday(calendar.rank(day)) == day
+
+def test_non_working_day_rolls_forward():
+    calendar = WorkingCalendar(range(5), 8, holidays=[date(2025, 1, 13)])
+    saturday = date(2025, 1, 11)
+    assert calendar.add_working_days(saturday, 0) == date(2025, 1, 14)
+    assert calendar.add_working_days(saturday, 1) == date(2025, 1, 15)
+    assert calendar.add_working_days(saturday, -1) == date(2025, 1, 10)
+    assert calendar.add_working_days(datetime(2025, 1, 10, 17), 1) == date(2025, 1, 14)
+
+def test_working_hours_clip_to_the_working_day():
+    calendar = WorkingCalendar(range(5), 8, "Europe/Berlin", day_start=time(9))
+    assert calendar.working_hours_between(datetime(2025, 1, 6, 7), datetime(2025, 1, 6, 12, 30)) == 3.5
+    assert calendar.working_hours_between(datetime(2025, 1, 10, 16), datetime(2025, 1, 13, 10)) == 2.0
+    assert calendar.working_hours_between(datetime(2025, 1, 6, 20), datetime(2025, 1, 11, 12)) == 32.0
+    # 08:00 UTC is 09:00 in Berlin in winter.
+    aware = datetime(2025, 1, 6, 8, tzinfo=timezone.utc)
+    assert calendar.working_hours_between(aware, aware + timedelta(hours=2)) == 2.0
+
+def test_column_variants_match_scalar_calls():
+    calendar = WorkingCalendar(range(5), 7.5, holidays=[date(2025, 1, 9)])
+    starts = [MONDAY + timedelta(days=i) for i in range(10)]
+    ends = [start + timedelta(days=i * 3) for i, start in enumerate(starts)]
+    assert calendar.add_working_days_many(starts, 3) == [calendar.add_working_days(day, 3) for day in starts]
+    assert calendar.add_working_days_many(starts, list(range(10))) == [
+        calendar.add_working_days(day, i) for i, day in enumerate(starts)]
+    assert list(calendar.working_days_between_many(starts, ends)) == [
+        calendar.working_days_between(start, end) for start, end in zip(starts, ends)]
+    moments = [datetime.combine(day, time(11)) for day in starts]
+    assert list(calendar.working_hours_between_many(moments, moments[1:])) == [
+        calendar.working_hours_between(start, end) for start, end in zip(moments, moments[1:])]
+
+@pytest.mark.parametrize("arguments, message", [
+    (((), 8), "non-empty subset"),
+    (((0, 7), 8), "non-empty subset"),
+    (((0,), 0), "within \\(0, 24\\]"),
+    (((0,), 8, "Mars/Olympus"), "unknown timezone"),
+])
+def test_invalid_calendars_are_rejected(arguments, message):
+    with pytest.raises(CalendarError, match=message):
+        WorkingCalendar(*arguments)
+
+def test_calendar_for_shares_instances_between_projects():
+    first = ProjectSettings("s1", "p1", "USD", "UTC", [4, 0, 1, 2, 3], 8, False, False)
+    second = ProjectSettings("s2", "p2", "EUR", "UTC", [0, 1, 2, 3, 4, 4], 8.0, True, True)
+    assert calendar_for(first) is calendar_for(second)
+    assert calendar_for(first, [date(2025, 1, 1)]) is not calendar_for(first)
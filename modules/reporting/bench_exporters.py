@@ -0,0 +1,47 @@
+"""Streaming exporter throughput and peak memory on generated ActualCost rows.
+
+Run with ``python -m modules.reporting.bench_exporters [rows]``.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from modules.costing.models import ActualCost, CostStatus, CostType
+from modules.reporting.exporters import EXPORTERS
+
+def _costs(rows: int):
+    start = datetime(2026, 1, 1)
+    types, statuses = list(CostType), list(CostStatus)
+    for i in range(rows):
+        yield ActualCost(
+            id=f"cost-{i:09d}", project_id=f"project-{i % 40}", cost_center_id=f"cc-{i % 300}",
+            cost_code_id=f"code-{i % 900}", wbs_node_id=f"wbs-{i % 5000}", task_id=None,
+            cost_type=types[i % len(types)], cost_status=statuses[i % len(statuses)],
+            amount=Decimal(i % 100_000) / 100, cost_date=start + timedelta(minutes=i),
+            reference_number=f"INV-{i // 20}", reference_type="Invoice", description=f"line {i}",
+            created_by=f"user-{i % 120}", created_at=start + timedelta(seconds=i),
+        )
+
+def main(rows: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        for output_format, exporter in EXPORTERS.items():
+            path = os.path.join(directory, f"report.{output_format.value}")
+            started = time.perf_counter()
+            exporter(_costs(rows), path)
+            elapsed = time.perf_counter() - started
+            # Peak memory on a tenth of the rows and on all of them; a streaming exporter keeps both flat.
+            peaks = []
+            for sample in (rows // 10, rows):
+                tracemalloc.start()
+                exporter(_costs(sample), path)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1e6)
+                tracemalloc.stop()
+            print(f"{output_format.value:>6}: {rows / elapsed:>10,.0f} rows/s  {os.path.getsize(path) / 1e6:8.1f} MB  "
+                  f"peak {peaks[0]:.1f} MB at {rows // 10:,} rows, {peaks[1]:.1f} MB at {rows:,} rows")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
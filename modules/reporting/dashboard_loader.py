@@ -0,0 +1,150 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Sequence, Tuple
+
+from modules.reporting.models import Dashboard
+
+Row = Dict[str, Any]
+Filters = FrozenSet[Tuple[str, str]]
+Fetcher = Callable[[str, Dict[str, str], Tuple[str, ...]], Awaitable[List[Row]]]
+
+@dataclass(frozen=True)
+class WidgetQuery:
+    widget_id: str
+    source: str
+    filters: Filters
+    fields: Tuple[str, ...] = ()  # empty means every field
+
+@dataclass
+class PlannedQuery:
+    source: str
+    filters: Filters
+    fields: set = field(default_factory=set)
+    all_fields: bool = False
+    widgets: List[WidgetQuery] = field(default_factory=list)
+
+    def key(self) -> Tuple[str, Filters, Tuple[str, ...]]:
+        return self.source, self.filters, () if self.all_fields else tuple(sorted(self.fields))
+
+@dataclass
+class DashboardData:
+    results: Dict[str, List[Row]]
+    errors: Dict[str, str]
+    round_trips: int
+
+def widget_queries(dashboard: Dashboard) -> List[WidgetQuery]:
+    """Widget queries from ``layout_config``.
+
+    Expects {"widgets": {widget_id: {"source", "filters", "fields"}}}, or a list
+    of such objects carrying an "id".
+    """
+    config = json.loads(dashboard.layout_config or "{}")
+    definitions = config.get("widgets", {}) if isinstance(config, dict) else {}
+    if isinstance(definitions, list):
+        definitions = {definition.get("id"): definition for definition in definitions
+                       if isinstance(definition, dict)}
+    queries = []
+    for widget_id in dashboard.widgets:
+        definition = definitions.get(widget_id)
+        if not definition or "source" not in definition:
+            continue
+        filters = frozenset((str(key), str(value)) for key, value in (definition.get("filters") or {}).items())
+        queries.append(WidgetQuery(widget_id, definition["source"], filters, tuple(definition.get("fields") or ())))
+    return queries
+
+def plan_queries(queries: Sequence[WidgetQuery]) -> List[PlannedQuery]:
+    """Merge widget queries into as few backend queries as possible.
+
+    Widgets on the same source and filters share one query over the union of
+    their fields. A widget whose filters are a superset of another planned
+    query's filters is answered from that query's rows and filtered locally.
+    """
+    exact: Dict[Tuple[str, Filters], PlannedQuery] = {}
+    for query in queries:
+        planned = exact.setdefault((query.source, query.filters), PlannedQuery(query.source, query.filters))
+        planned.widgets.append(query)
+    by_source: Dict[str, List[PlannedQuery]] = {}
+    for planned in sorted(exact.values(), key=lambda planned: len(planned.filters)):
+        # Broadest filters first, so narrower queries fold into an existing broader one.
+        host = next((candidate for candidate in by_source.get(planned.source, ())
+                     if candidate.filters <= planned.filters), None)
+        if host is None:
+            by_source.setdefault(planned.source, []).append(planned)
+        else:
+            host.widgets.extend(planned.widgets)
+    plan = [planned for planned_queries in by_source.values() for planned in planned_queries]
+    for planned in plan:
+        for query in planned.widgets:
+            if not query.fields:
+                planned.all_fields = True
+            planned.fields.update(query.fields)
+            planned.fields.update(key for key, _ in query.filters - planned.filters)
+    return plan
+
+def _widget_rows(rows: List[Row], planned: PlannedQuery, query: WidgetQuery) -> List[Row]:
+    extra = query.filters - planned.filters
+    if extra:
+        rows = [row for row in rows if all(str(row.get(key)) == value for key, value in extra)]
+    if query.fields and (planned.all_fields or set(query.fields) != planned.fields):
+        rows = [{name: row.get(name) for name in query.fields} for row in rows]
+    return rows
+
+class DashboardLoader:
+    """Loads all widget data for a dashboard with merged, concurrent and shared backend queries.
+
+    Identical queries already in flight (from another dashboard load on the same
+    loader) are awaited rather than issued again.
+    """
+
+    def __init__(self, fetch: Fetcher, max_concurrency: int = 8):
+        self.fetch = fetch
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._in_flight: Dict[Tuple[str, Filters, Tuple[str, ...]], asyncio.Future] = {}
+        self.round_trips = 0
+
+    async def _run(self, planned: PlannedQuery) -> Tuple[List[Row], bool]:
+        """Rows for a planned query, and whether this call issued the backend query."""
+        key = planned.key()
+        shared = self._in_flight.get(key)
+        if shared is not None:
+            return await asyncio.shield(shared), False
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            async with self._semaphore:
+                self.round_trips += 1
+                rows = await self.fetch(planned.source, dict(planned.filters), key[2])
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as error:
+            future.set_exception(error)
+            future.exception()  # waiters re-raise it; don't warn when there are none
+            raise
+        else:
+            future.set_result(rows)
+            return rows, True
+        finally:
+            del self._in_flight[key]
+
+    async def load_queries(self, queries: Sequence[WidgetQuery]) -> DashboardData:
+        plan = plan_queries(queries)
+        outcomes = await asyncio.gather(*(self._run(planned) for planned in plan), return_exceptions=True)
+        results: Dict[str, List[Row]] = {}
+        errors: Dict[str, str] = {}
+        round_trips = 0
+        for planned, outcome in zip(plan, outcomes):
+            if isinstance(outcome, BaseException):
+                for query in planned.widgets:
+                    errors[query.widget_id] = f"{type(outcome).__name__}: {outcome}"
+                continue
+            rows, fetched = outcome
+            round_trips += fetched
+            for query in planned.widgets:
+                results[query.widget_id] = _widget_rows(rows, planned, query)
+        return DashboardData(results, errors, round_trips)
+
+    async def load(self, dashboard: Dashboard) -> DashboardData:
+        return await self.load_queries(widget_queries(dashboard))
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import pickle
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from modules.reporting.models import Report, ReportExecution
+
+ALL_TABLES = "*"
+
+def report_tables(report: Report) -> Tuple[str, ...]:
+    """Tables a report reads, from the "tables" or "source" entry of its query definition."""
+    try:
+        query = json.loads(report.query_definition)
+    except ValueError:
+        return (ALL_TABLES,)
+    if isinstance(query, dict):
+        tables = query.get("tables") or ([query["source"]] if query.get("source") else None)
+        if tables:
+            return tuple(sorted(set(tables)))
+    return (ALL_TABLES,)
+
+def canonical_query(query_definition: str) -> str:
+    """Whitespace and key order in the stored JSON should not change the cache key."""
+    try:
+        return json.dumps(json.loads(query_definition), sort_keys=True, separators=(",", ":"))
+    except ValueError:
+        return query_definition.strip()
+
+def cache_key(report_id: str, query_definition: str, parameters: Dict[str, str], version: Tuple[int, ...]) -> str:
+    payload = json.dumps([report_id, canonical_query(query_definition), sorted(parameters.items()), version],
+                         separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class DataVersionTracker:
+    """Change counters per module table; bumping a table invalidates the results built on it."""
+
+    def __init__(self):
+        self.versions: Dict[str, int] = {}
+        self.listeners: List[Callable[[str], None]] = []
+
+    def version(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        tables = list(tables)
+        if ALL_TABLES in tables:
+            tables = sorted(self.versions)
+        return tuple(self.versions.get(table, 0) for table in tables) + (self.versions.get(ALL_TABLES, 0),)
+
+    def bump(self, *tables: str) -> None:
+        for table in tables:
+            self.versions[table] = self.versions.get(table, 0) + 1
+            for listener in self.listeners:
+                listener(table)
+
+    def subscribe(self, listener: Callable[[str], None]) -> None:
+        self.listeners.append(listener)
+
+def pickled_size(result: Any) -> int:
+    return len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+
+class ResultCache:
+    """LRU cache bounded by entry count and by the approximate size of the cached results."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 256 * 1024 * 1024,
+                 size_of: Callable[[Any], int] = pickled_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size_of = size_of
+        self.entries: "OrderedDict[str, Tuple[Any, int, Tuple[str, ...]]]" = OrderedDict()
+        self.by_table: Dict[str, Set[str]] = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[0]
+
+    def put(self, key: str, result: Any, tables: Tuple[str, ...]) -> None:
+        size = self.size_of(result)
+        if size > self.max_bytes:
+            return
+        self.discard(key)
+        self.entries[key] = (result, size, tables)
+        self.nbytes += size
+        for table in tables:
+            self.by_table.setdefault(table, set()).add(key)
+        while len(self.entries) > self.max_entries or self.nbytes > self.max_bytes:
+            self.discard(next(iter(self.entries)))
+
+    def discard(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        self.nbytes -= entry[1]
+        for table in entry[2]:
+            keys = self.by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+    def invalidate(self, table: str) -> int:
+        if table == ALL_TABLES:
+            stale = list(self.entries)
+        else:
+            stale = list(self.by_table.pop(table, ())) + list(self.by_table.get(ALL_TABLES, ()))
+        for key in stale:
+            self.discard(key)
+        return len(stale)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.by_table.clear()
+        self.nbytes = 0
+
+@dataclass
+class ExecutionResult:
+    result: Any
+    execution: ReportExecution
+
+class ReportExecutor:
+    """Runs reports through ``runner`` and reuses results for identical queries on unchanged data.
+
+    ``runner(report, parameters)`` does the actual query. Results are cached
+    under a hash of the report id, canonical query definition, parameters and
+    the data version of the tables the report reads, and dropped as soon as one
+    of those tables changes.
+    """
+
+    def __init__(self, runner: Callable[[Report, Dict[str, str]], Any],
+                 versions: Optional[DataVersionTracker] = None, cache: Optional[ResultCache] = None,
+                 tables_for: Callable[[Report], Tuple[str, ...]] = report_tables):
+        self.runner = runner
+        self.versions = DataVersionTracker() if versions is None else versions
+        self.cache = ResultCache() if cache is None else cache
+        self.tables_for = tables_for
+        self.versions.subscribe(self.cache.invalidate)
+
+    def key_for(self, report: Report, parameters: Optional[Dict[str, str]] = None) -> str:
+        merged = {**report.parameters, **(parameters or {})}
+        version = self.versions.version(self.tables_for(report))
+        return cache_key(report.id, report.query_definition, merged, version)
+
+    def execute(self, report: Report, parameters: Optional[Dict[str, str]] = None, executed_by: str = "system",
+                schedule_id: Optional[str] = None, use_cache: bool = True) -> ExecutionResult:
+        merged = {**report.parameters, **(parameters or {})}
+        tables = self.tables_for(report)
+        key = cache_key(report.id, report.query_definition, merged, self.versions.version(tables))
+        started = datetime.now()
+        clock = time.perf_counter()
+        execution = ReportExecution(
+            id=str(uuid.uuid4()),
+            report_id=report.id,
+            schedule_id=schedule_id,
+            execution_date=started,
+            parameters_used=merged,
+            execution_time_seconds=0.0,
+            output_file_path=None,
+            status="In Progress",
+            error_message=None,
+            executed_by=executed_by,
+        )
+        hit, result = self.cache.get(key) if use_cache else (False, None)
+        if not hit:
+            try:
+                result = self.runner(report, merged)
+            except Exception as error:
+                execution.status = "Failed"
+                execution.error_message = f"{type(error).__name__}: {error}"
+                execution.execution_time_seconds = time.perf_counter() - clock
+                return ExecutionResult(None, execution)
+            self.cache.put(key, result, tables)
+        execution.status = "Success"
+        execution.cache_hit = hit
+        execution.execution_time_seconds = time.perf_counter() - clock
+        return ExecutionResult(result, execution)
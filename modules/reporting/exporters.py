@@ -0,0 +1,277 @@
+import csv
+import dataclasses
+import html
+import json
+import math
+import re
+import zipfile
+from datetime import date, datetime, time
+from decimal import Decimal
+from enum import Enum
+from itertools import chain
+from operator import attrgetter
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from modules.core.codecs import codec_for
+from modules.reporting.models import ReportExecution, ReportFormat
+
+Target = Union[str, IO]
+CHUNK_ROWS = 5_000
+EXCEL_EPOCH = datetime(1899, 12, 30)
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+class ExportError(ValueError):
+    pass
+
+def _peek(rows: Iterable[Any]) -> Tuple[Any, Iterator[Any]]:
+    iterator = iter(rows)
+    first = next(iterator, None)
+    return first, (chain((first,), iterator) if first is not None else iterator)
+
+def _columns(first: Any, columns: Optional[Sequence[str]]) -> List[str]:
+    if columns is not None:
+        return list(columns)
+    if first is None:
+        return []
+    if dataclasses.is_dataclass(first):
+        return list(codec_for(type(first)).columns)
+    if isinstance(first, dict):
+        return list(first)
+    raise ExportError("columns are required for sequence rows")
+
+def _values(first: Any, rows: Iterator[Any], names: List[str]) -> Iterator[Sequence[Any]]:
+    """Rows as value sequences in column order; dataclass, dict and sequence rows are accepted."""
+    if first is None or not names:
+        return iter(())
+    if dataclasses.is_dataclass(first):
+        getter = attrgetter(*names)
+        return (getter(row) for row in rows) if len(names) > 1 else ((getter(row),) for row in rows)
+    if isinstance(first, dict):
+        return ([row.get(name) for name in names] for row in rows)
+    return rows
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, Enum):
+        return str(value.value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, default=_json_value)
+    return str(value)
+
+class _Opened:
+    """Opens ``target`` when it is a path and leaves caller-owned file objects open."""
+
+    def __init__(self, target: Target, mode: str, **kwargs):
+        self.target, self.mode, self.kwargs = target, mode, kwargs
+        self.owned = isinstance(target, str)
+
+    def __enter__(self) -> IO:
+        self.file = open(self.target, self.mode, **self.kwargs) if self.owned else self.target
+        return self.file
+
+    def __exit__(self, *exc) -> None:
+        if self.owned:
+            self.file.close()
+
+def export_csv(rows: Iterable[Any], target: Target, columns: Optional[Sequence[str]] = None,
+               chunk_rows: int = CHUNK_ROWS) -> int:
+    first, rows = _peek(rows)
+    names = _columns(first, columns)
+    count = 0
+    with _Opened(target, "w", newline="", encoding="utf-8", buffering=1 << 20) as file:
+        writer = csv.writer(file)
+        writer.writerow(names)
+        chunk = []
+        for row in _values(first, rows, names):
+            chunk.append([_text(value) for value in row])
+            if len(chunk) >= chunk_rows:
+                writer.writerows(chunk)
+                count += len(chunk)
+                chunk = []
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+def export_json(rows: Iterable[Any], target: Target, columns: Optional[Sequence[str]] = None,
+                chunk_rows: int = CHUNK_ROWS) -> int:
+    """One JSON array, written a chunk of objects at a time."""
+    first, rows = _peek(rows)
+    names = _columns(first, columns)
+    if dataclasses.is_dataclass(first) and columns is None:
+        items: Iterator[Dict[str, Any]] = map(codec_for(type(first)).to_dict, rows)
+    else:
+        items = (dict(zip(names, row)) for row in _values(first, rows, names))
+    encode = json.JSONEncoder(default=_json_value, separators=(",", ":")).encode
+    count = 0
+    with _Opened(target, "w", encoding="utf-8", buffering=1 << 20) as file:
+        file.write("[")
+        chunk = []
+        for item in items:
+            chunk.append(encode(item))
+            if len(chunk) >= chunk_rows:
+                file.write(("," if count else "") + ",".join(chunk))
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            file.write(("," if count else "") + ",".join(chunk))
+            count += len(chunk)
+        file.write("]")
+    return count
+
+def export_html(rows: Iterable[Any], target: Target, columns: Optional[Sequence[str]] = None,
+                title: str = "Report", chunk_rows: int = CHUNK_ROWS) -> int:
+    first, rows = _peek(rows)
+    names = _columns(first, columns)
+    escape = html.escape
+    count = 0
+    with _Opened(target, "w", encoding="utf-8", buffering=1 << 20) as file:
+        file.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{escape(title)}</title></head>"
+                   f"<body><table>\n<thead><tr>{''.join(f'<th>{escape(name)}</th>' for name in names)}</tr></thead>"
+                   "\n<tbody>\n")
+        chunk = []
+        for row in _values(first, rows, names):
+            chunk.append("<tr>" + "".join(f"<td>{escape(_text(value))}</td>" for value in row) + "</tr>\n")
+            if len(chunk) >= chunk_rows:
+                file.write("".join(chunk))
+                count += len(chunk)
+                chunk = []
+        file.write("".join(chunk))
+        count += len(chunk)
+        file.write("</tbody>\n</table></body></html>\n")
+    return count
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/></Relationships>'
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/></Relationships>'
+    ),
+    # Cell style 1 is a date (built-in format 14), style 2 a date and time (built-in format 22).
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '</styleSheet>'
+    ),
+}
+
+def _xlsx_workbook(sheet_name: str) -> str:
+    name = html.escape(_XML_ILLEGAL.sub("", sheet_name)[:31] or "Sheet1")
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        f'<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    )
+
+def _xlsx_cell(value: Any) -> str:
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, int) or isinstance(value, (float, Decimal)) and math.isfinite(value):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.replace(tzinfo=None)
+        return f'<c s="2"><v>{(value - EXCEL_EPOCH).total_seconds() / 86400}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="1"><v>{(datetime.combine(value, time()) - EXCEL_EPOCH).days}</v></c>'
+    text = html.escape(_XML_ILLEGAL.sub("", _text(value)), quote=False)
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+def export_xlsx(rows: Iterable[Any], target: Target, columns: Optional[Sequence[str]] = None,
+                sheet_name: str = "Report", chunk_rows: int = CHUNK_ROWS) -> int:
+    """Write-only single-sheet workbook; the sheet XML is streamed into the zip as rows arrive.
+
+    Strings are written inline rather than through a shared-strings table, so
+    nothing has to be held back until the end of the sheet.
+    """
+    first, rows = _peek(rows)
+    names = _columns(first, columns)
+    cell = _xlsx_cell
+    count = 0
+    with zipfile.ZipFile(target, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        for part, content in _XLSX_STATIC.items():
+            archive.writestr(part, content)
+        archive.writestr("xl/workbook.xml", _xlsx_workbook(sheet_name))
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+                + ("<row>" + "".join(cell(name) for name in names) + "</row>").encode()
+            )
+            chunk = []
+            for row in _values(first, rows, names):
+                chunk.append("<row>" + "".join([cell(value) for value in row]) + "</row>")
+                if len(chunk) >= chunk_rows:
+                    sheet.write("".join(chunk).encode())
+                    count += len(chunk)
+                    chunk = []
+            sheet.write("".join(chunk).encode())
+            count += len(chunk)
+            sheet.write(b"</sheetData></worksheet>")
+    return count
+
+EXPORTERS: Dict[ReportFormat, Callable[..., int]] = {
+    ReportFormat.CSV: export_csv,
+    ReportFormat.JSON: export_json,
+    ReportFormat.EXCEL: export_xlsx,
+    ReportFormat.HTML: export_html,
+}
+
+def export(rows: Iterable[Any], output_format: ReportFormat, path: str, columns: Optional[Sequence[str]] = None,
+           execution: Optional[ReportExecution] = None) -> int:
+    """Stream ``rows`` to ``path`` in ``output_format``; records the file on ``execution`` when given."""
+    exporter = EXPORTERS.get(output_format)
+    if exporter is None:
+        raise ExportError(f"{output_format.value} export is not supported by the streaming exporters")
+    count = exporter(rows, path, columns)
+    if execution is not None:
+        execution.output_file_path = path
+    return count
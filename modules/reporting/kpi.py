@@ -0,0 +1,218 @@
+import ast
+import math
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from modules.reporting.models import KPI, KPIValue
+
+GREEN = "Green"
+YELLOW = "Yellow"
+RED = "Red"
+NAN = float("nan")
+
+class KPIFormulaError(ValueError):
+    pass
+
+def _div(a: float, b: float) -> float:
+    return a / b if b else NAN
+
+def _floordiv(a: float, b: float) -> float:
+    return a // b if b else NAN
+
+def _mod(a: float, b: float) -> float:
+    return a % b if b else NAN
+
+def _pow(a: float, b: float) -> float:
+    try:
+        result = float(a) ** b
+    except (OverflowError, ZeroDivisionError):
+        return NAN
+    return NAN if isinstance(result, complex) else result
+
+def _sqrt(a: float) -> float:
+    return math.sqrt(a) if a >= 0 else NAN
+
+def _log(a: float) -> float:
+    return math.log(a) if a > 0 else NAN
+
+def _round(a: float, digits: int = 0) -> float:
+    return round(a, int(digits)) if math.isfinite(a) else a
+
+def _if(condition, when_true: float, when_false: float) -> float:
+    return when_true if condition else when_false
+
+FUNCTIONS: Dict[str, Callable] = {
+    "abs": abs, "min": min, "max": max, "round": _round, "sqrt": _sqrt, "log": _log, "if_": _if,
+}
+# (minimum, maximum) positional arguments; None means no upper bound. Arguments are scalars, so min/max need two.
+ARITY: Dict[str, Tuple[int, Optional[int]]] = {
+    "abs": (1, 1), "min": (2, None), "max": (2, None), "round": (1, 2), "sqrt": (1, 1), "log": (1, 1), "if_": (3, 3),
+}
+_HELPERS = {"zip": zip, "_div": _div, "_floordiv": _floordiv, "_mod": _mod, "_pow": _pow, "_nan": NAN, **FUNCTIONS}
+_SAFE_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+                   ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE)
+_GUARDED = {ast.Div: "_div", ast.FloorDiv: "_floordiv", ast.Mod: "_mod", ast.Pow: "_pow"}
+
+class _Rewriter(ast.NodeTransformer):
+    """Checks every node against the whitelist and renames metrics to loop variables."""
+
+    def __init__(self):
+        self.names: Dict[str, str] = {}
+
+    def generic_visit(self, node):
+        allowed = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+                   ast.Constant, ast.Name, ast.Load) + _SAFE_OPERATORS + tuple(_GUARDED)
+        if not isinstance(node, allowed):
+            raise KPIFormulaError(f"{type(node).__name__} is not allowed in a KPI formula")
+        return super().generic_visit(node)
+
+    def visit_Constant(self, node):
+        if isinstance(node.value, bool) or not isinstance(node.value, (int, float)):
+            raise KPIFormulaError(f"only numeric constants are allowed, not {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id in FUNCTIONS:
+            raise KPIFormulaError(f"{node.id} can only be called")
+        variable = self.names.setdefault(node.id, f"v{len(self.names)}")
+        return ast.copy_location(ast.Name(id=variable, ctx=ast.Load()), node)
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+            raise KPIFormulaError(f"unsupported call in KPI formula: {ast.unparse(node)}")
+        least, most = ARITY[node.func.id]
+        if len(node.args) < least or (most is not None and len(node.args) > most):
+            expected = str(least) if least == most else f"at least {least}" if most is None else f"{least}-{most}"
+            raise KPIFormulaError(f"{node.func.id} takes {expected} arguments: {ast.unparse(node)}")
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_BinOp(self, node):
+        node = self.generic_visit(node)
+        helper = _GUARDED.get(type(node.op))
+        if helper is None:
+            return node
+        return ast.copy_location(ast.Call(func=ast.Name(id=helper, ctx=ast.Load()),
+                                          args=[node.left, node.right], keywords=[]), node)
+
+@dataclass(frozen=True)
+class CompiledFormula:
+    formula: str
+    names: Tuple[str, ...]
+    evaluate: Callable[[Mapping[str, Sequence[Optional[float]]], int], List[float]]
+
+    def __call__(self, columns: Mapping[str, Sequence[Optional[float]]], rows: int) -> List[float]:
+        return self.evaluate(columns, rows)
+
+@lru_cache(maxsize=4096)
+def compile_formula(formula: str) -> CompiledFormula:
+    """Compile a KPI formula into one list comprehension over its input columns.
+
+    Formulas are arithmetic expressions over metric names with comparisons,
+    ``x if cond else y`` and the functions in FUNCTIONS. Division by zero and
+    math domain errors give NaN rather than raising, and missing (None) inputs
+    are NaN.
+    """
+    try:
+        tree = ast.parse(formula.strip(), mode="eval")
+    except SyntaxError as error:
+        raise KPIFormulaError(f"invalid KPI formula {formula!r}: {error.msg}") from None
+    rewriter = _Rewriter()
+    expression = ast.unparse(ast.fix_missing_locations(rewriter.visit(tree)).body)
+    names = tuple(rewriter.names)
+    lines = ["def evaluate(columns, rows):"]
+    for name, variable in rewriter.names.items():
+        lines.append(f"    c{variable[1:]} = [_nan if value is None else value for value in columns[{name!r}]]")
+    if names:
+        variables = ", ".join(rewriter.names.values())
+        sources = ", ".join(f"c{variable[1:]}" for variable in rewriter.names.values())
+        loop = f"for {variables} in {sources}" if len(names) == 1 else f"for {variables} in zip({sources})"
+        lines.append(f"    return [{expression} {loop}]")
+    else:
+        lines.append(f"    return [{expression}] * rows")
+    namespace = dict(_HELPERS)
+    exec(compile("\n".join(lines), f"<kpi {formula!r}>", "exec"), {"__builtins__": {}, **namespace}, namespace)
+    return CompiledFormula(formula, names, namespace["evaluate"])
+
+def higher_is_better(kpi: KPI) -> bool:
+    warning, critical = kpi.warning_threshold, kpi.critical_threshold
+    if warning is not None and critical is not None and warning != critical:
+        return critical < warning
+    threshold = warning if warning is not None else critical
+    if threshold is not None and kpi.target_value is not None:
+        return kpi.target_value >= threshold
+    return True
+
+def classify(value: float, kpi: KPI, higher: Optional[bool] = None) -> str:
+    if higher is None:
+        higher = higher_is_better(kpi)
+    warning, critical = kpi.warning_threshold, kpi.critical_threshold
+    if critical is not None and (value < critical if higher else value > critical):
+        return RED
+    if warning is not None and (value < warning if higher else value > warning):
+        return YELLOW
+    return GREEN
+
+class KPIEvaluator:
+    """Evaluates every active KPI for many projects at once over columnar metric inputs.
+
+    ``columns`` maps each metric name to one value per project, in the order of
+    ``project_ids``. Formulas that fail to compile, or that reference a metric
+    that was not supplied, are reported in ``errors`` and skipped.
+    """
+
+    def __init__(self, kpis: Sequence[KPI]):
+        self.kpis: List[Tuple[KPI, CompiledFormula, bool]] = []
+        self.errors: Dict[str, str] = {}
+        for kpi in kpis:
+            if not kpi.is_active:
+                continue
+            try:
+                compiled = compile_formula(kpi.calculation_formula)
+            except KPIFormulaError as error:
+                self.errors[kpi.id] = str(error)
+                continue
+            self.kpis.append((kpi, compiled, higher_is_better(kpi)))
+
+    def evaluate(self, project_ids: Sequence[str], columns: Mapping[str, Sequence[Optional[float]]],
+                 measurement_date: Optional[datetime] = None,
+                 targets: Optional[Mapping[str, Sequence[Optional[float]]]] = None) -> List[KPIValue]:
+        """KPIValue rows for every (active KPI, project) pair with a finite result.
+
+        ``targets`` optionally overrides KPI.target_value per project, keyed by KPI id.
+        """
+        rows = len(project_ids)
+        calculated_at = datetime.now()
+        measurement_date = measurement_date or calculated_at
+        values: List[KPIValue] = []
+        for kpi, compiled, higher in self.kpis:
+            missing = [name for name in compiled.names if name not in columns]
+            if missing:
+                self.errors[kpi.id] = f"missing metrics {', '.join(missing)}"
+                continue
+            try:
+                results = compiled(columns, rows)
+            except Exception as error:
+                self.errors[kpi.id] = f"{type(error).__name__}: {error}"
+                continue
+            project_targets = targets.get(kpi.id) if targets else None
+            for position, actual in enumerate(results):
+                if not math.isfinite(actual):
+                    continue
+                target = project_targets[position] if project_targets is not None else kpi.target_value
+                values.append(KPIValue(
+                    id=str(uuid.uuid4()),
+                    kpi_id=kpi.id,
+                    project_id=project_ids[position],
+                    measurement_date=measurement_date,
+                    actual_value=float(actual),
+                    target_value=target,
+                    variance=None if target is None else actual - target,
+                    status=classify(actual, kpi, higher),
+                    notes=None,
+                    calculated_at=calculated_at,
+                ))
+        return values
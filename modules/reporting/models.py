@@ -105,4 +105,5 @@ class ReportExecution:
     output_file_path: Optional[str]
     status: str  # Success, Failed, In Progress
     error_message: Optional[str]
-    executed_by: str
\ No newline at end of file
+    executed_by: str
+    cache_hit: bool = False
\ No newline at end of file
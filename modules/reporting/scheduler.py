@@ -0,0 +1,199 @@
+import calendar
+import heapq
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from modules.reporting.execution import cache_key
+from modules.reporting.models import Report, ReportExecution, ReportFormat, ReportSchedule, ScheduleFrequency
+
+Renderer = Callable[[Report, Dict[str, str], ReportFormat], bytes]
+Deliverer = Callable[[ReportSchedule, bytes, ReportExecution], None]
+
+def add_months(moment: datetime, months: int) -> datetime:
+    month_index = moment.month - 1 + months
+    year, month = moment.year + month_index // 12, month_index % 12 + 1
+    return moment.replace(year=year, month=month, day=min(moment.day, calendar.monthrange(year, month)[1]))
+
+def next_run(moment: datetime, frequency: ScheduleFrequency) -> Optional[datetime]:
+    if frequency is ScheduleFrequency.DAILY:
+        return moment + timedelta(days=1)
+    if frequency is ScheduleFrequency.WEEKLY:
+        return moment + timedelta(weeks=1)
+    if frequency is ScheduleFrequency.MONTHLY:
+        return add_months(moment, 1)
+    if frequency is ScheduleFrequency.QUARTERLY:
+        return add_months(moment, 3)
+    return None
+
+def _render(render: Renderer, report: Report, parameters: Dict[str, str],
+            output_format: ReportFormat) -> Tuple[bytes, float]:
+    started = time.perf_counter()
+    output = render(report, parameters, output_format)
+    return output, time.perf_counter() - started
+
+class ScheduleRunner:
+    """Runs due ReportSchedules from a heap ordered by next_run_date.
+
+    Schedules that ask for the same report, parameters and format are rendered
+    once and delivered to every schedule's recipients. Renders go to a bounded
+    process pool; at most ``max_in_flight`` jobs are queued at a time, so a
+    large batch never piles thousands of pending futures onto the pool.
+    ``render`` must be picklable (a module-level function).
+    """
+
+    def __init__(self, reports: Iterable[Report], render: Renderer, deliver: Deliverer,
+                 workers: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 executor: Optional[Executor] = None, executed_by: str = "scheduler"):
+        self.reports: Dict[str, Report] = {report.id: report for report in reports}
+        self.render = render
+        self.deliver = deliver
+        self.workers = workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or 2 * self.workers
+        self.executor = executor
+        self.executed_by = executed_by
+        self.schedules: Dict[str, ReportSchedule] = {}
+        self.heap: List[Tuple[datetime, int, str]] = []
+        self._sequence = 0
+        # Sequence number of each schedule's live heap entry; re-adding a schedule makes older entries stale.
+        self._live: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.schedules)
+
+    def add(self, schedule: ReportSchedule) -> None:
+        """Add or re-queue a schedule; it keeps exactly one live heap entry."""
+        self.schedules[schedule.id] = schedule
+        self._live.pop(schedule.id, None)
+        if schedule.is_active:
+            self._sequence += 1
+            self._live[schedule.id] = self._sequence
+            heapq.heappush(self.heap, (schedule.next_run_date, self._sequence, schedule.id))
+
+    def add_all(self, schedules: Iterable[ReportSchedule]) -> None:
+        for schedule in schedules:
+            self.add(schedule)
+
+    def remove(self, schedule_id: str) -> None:
+        # Heap entries are dropped lazily when they surface.
+        self.schedules.pop(schedule_id, None)
+        self._live.pop(schedule_id, None)
+
+    def next_due(self) -> Optional[datetime]:
+        while self.heap:
+            run_date, sequence, schedule_id = self.heap[0]
+            schedule = self.schedules.get(schedule_id)
+            if (self._live.get(schedule_id) == sequence and schedule.is_active
+                    and schedule.next_run_date == run_date):
+                return run_date
+            heapq.heappop(self.heap)
+        return None
+
+    def due(self, now: datetime) -> List[ReportSchedule]:
+        schedules = []
+        while self.next_due() is not None and self.heap[0][0] <= now:
+            schedule_id = heapq.heappop(self.heap)[2]
+            del self._live[schedule_id]
+            schedules.append(self.schedules[schedule_id])
+        return schedules
+
+    def _groups(self, schedules: List[ReportSchedule]) -> Dict[str, List[ReportSchedule]]:
+        groups: Dict[str, List[ReportSchedule]] = {}
+        for schedule in schedules:
+            report = self.reports[schedule.report_id]
+            parameters = {**report.parameters, **schedule.parameters}
+            key = f"{cache_key(report.id, report.query_definition, parameters, ())}:{schedule.format.value}"
+            groups.setdefault(key, []).append(schedule)
+        return groups
+
+    def _reschedule(self, schedule: ReportSchedule, now: datetime) -> None:
+        following = next_run(schedule.next_run_date, schedule.frequency)
+        # A runner that was down for a while skips the missed periods instead of replaying them.
+        while following is not None and following <= now:
+            following = next_run(following, schedule.frequency)
+        if following is None:
+            schedule.is_active = False
+            return
+        schedule.next_run_date = following
+        self.add(schedule)
+
+    def _unknown_report(self, schedule: ReportSchedule, now: datetime) -> ReportExecution:
+        return ReportExecution(
+            id=str(uuid.uuid4()),
+            report_id=schedule.report_id,
+            schedule_id=schedule.id,
+            execution_date=now,
+            parameters_used=dict(schedule.parameters),
+            execution_time_seconds=0.0,
+            output_file_path=None,
+            status="Failed",
+            error_message=f"unknown report {schedule.report_id}",
+            executed_by=self.executed_by,
+        )
+
+    def _finish(self, schedules: List[ReportSchedule], future: Future, now: datetime) -> List[ReportExecution]:
+        error = future.exception()
+        output, seconds = (None, 0.0) if error is not None else future.result()
+        executions = []
+        for schedule in schedules:
+            report = self.reports[schedule.report_id]
+            execution = ReportExecution(
+                id=str(uuid.uuid4()),
+                report_id=report.id,
+                schedule_id=schedule.id,
+                execution_date=now,
+                parameters_used={**report.parameters, **schedule.parameters},
+                execution_time_seconds=seconds,
+                output_file_path=None,
+                status="Failed" if error is not None else "Success",
+                error_message=None if error is None else f"{type(error).__name__}: {error}",
+                executed_by=self.executed_by,
+                cache_hit=error is None and schedule is not schedules[0],
+            )
+            if error is None:
+                try:
+                    self.deliver(schedule, output, execution)
+                except Exception as delivery_error:
+                    execution.status = "Failed"
+                    execution.error_message = f"delivery: {type(delivery_error).__name__}: {delivery_error}"
+            executions.append(execution)
+            self._reschedule(schedule, now)
+        return executions
+
+    def run_due(self, now: Optional[datetime] = None) -> List[ReportExecution]:
+        now = now or datetime.now()
+        due: List[ReportSchedule] = []
+        executions: List[ReportExecution] = []
+        for schedule in self.due(now):
+            if schedule.report_id in self.reports:
+                due.append(schedule)
+            else:
+                executions.append(self._unknown_report(schedule, now))
+                self._reschedule(schedule, now)
+        groups = list(self._groups(due).values())
+        executor = self.executor or ProcessPoolExecutor(max_workers=self.workers)
+        in_flight: Dict[Future, List[ReportSchedule]] = {}
+
+        def drain(pending: Set[Future]) -> None:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                executions.extend(self._finish(in_flight.pop(future), future, now))
+
+        try:
+            for schedules in groups:
+                if len(in_flight) >= self.max_in_flight:
+                    drain(set(in_flight))
+                first = schedules[0]
+                report = self.reports[first.report_id]
+                future = executor.submit(_render, self.render, report, {**report.parameters, **first.parameters},
+                                         first.format)
+                in_flight[future] = schedules
+            while in_flight:
+                drain(set(in_flight))
+        finally:
+            if self.executor is None:
+                executor.shutdown()
+        return executions
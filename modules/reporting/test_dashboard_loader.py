@@ -0,0 +1,89 @@
+import asyncio
+import json
+from datetime import datetime
+
+from modules.reporting.dashboard_loader import DashboardLoader, WidgetQuery, plan_queries, widget_queries
+from modules.reporting.models import Dashboard
+
+NOW = datetime(2025, 1, 1)
+ROWS = [{"id": "t1", "status": "open", "owner": "a", "hours": 3},
+        {"id": "t2", "status": "done", "owner": "b", "hours": 5}]
+
+class _Backend:
+    def __init__(self, fail: str = ""):
+        self.fail = fail
+        self.calls = []
+        self.running = 0
+        self.peak = 0
+
+    async def fetch(self, source, filters, fields):
+        self.calls.append((source, filters, fields))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if source == self.fail:
+                raise RuntimeError(f"{source} is down")
+            return [row for row in ROWS if all(str(row.get(key)) == value for key, value in filters.items())]
+        finally:
+            self.running -= 1
+
+def _query(widget_id: str, source: str = "tasks", fields=(), **filters) -> WidgetQuery:
+    return WidgetQuery(widget_id, source, frozenset(filters.items()), tuple(fields))
+
+def test_widget_queries_read_dict_and_list_layouts():
+    layouts = [{"widgets": {"w1": {"source": "tasks", "filters": {"status": "open"}, "fields": ["id"]},
+                            "w2": {"filters": {}}}},
+               {"widgets": [{"id": "w1", "source": "tasks", "filters": {"status": "open"}, "fields": ["id"]}]}]
+    for layout in layouts:
+        dashboard = Dashboard("d1", "d", None, "p1", json.dumps(layout), ["w1", "w2", "w3"], "u", False, NOW, NOW)
+        assert widget_queries(dashboard) == [_query("w1", fields=["id"], status="open")]
+
+def test_plan_folds_narrower_filters_into_broader_queries():
+    plan = plan_queries([_query("all", fields=["id"]), _query("open", fields=["hours"], status="open"),
+                         _query("same", fields=["owner"]), _query("costs", "costs")])
+    assert [(planned.source, [query.widget_id for query in planned.widgets]) for planned in plan] == [
+        ("tasks", ["all", "same", "open"]), ("costs", ["costs"])]
+    assert plan[0].key() == ("tasks", frozenset(), ("hours", "id", "owner", "status"))
+    assert plan[1].key() == ("costs", frozenset(), ())
+
+def test_folded_widgets_are_filtered_and_projected_locally():
+    backend = _Backend()
+    data = asyncio.run(DashboardLoader(backend.fetch).load_queries([
+        _query("all", fields=["id"]), _query("open", fields=["id", "hours"], status="open")]))
+    assert data.round_trips == 1
+    assert data.results == {"all": [{"id": "t1"}, {"id": "t2"}], "open": [{"id": "t1", "hours": 3}]}
+
+def test_backend_concurrency_is_bounded():
+    backend = _Backend()
+    loader = DashboardLoader(backend.fetch, max_concurrency=2)
+    data = asyncio.run(loader.load_queries([_query(f"w{i}", f"source{i}") for i in range(6)]))
+    assert (data.round_trips, backend.peak) == (6, 2)
+
+def test_concurrent_loads_share_in_flight_queries():
+    backend = _Backend()
+    loader = DashboardLoader(backend.fetch)
+    queries = [_query("w1", status="open"), _query("w2", "costs")]
+
+    async def both():
+        return await asyncio.gather(loader.load_queries(queries), loader.load_queries(queries))
+
+    first, second = asyncio.run(both())
+    assert len(backend.calls) == 2
+    assert (first.round_trips, second.round_trips, loader.round_trips) == (2, 0, 2)
+    assert first.results == second.results
+    assert loader._in_flight == {}
+
+def test_failed_query_is_reported_per_widget_to_every_waiter():
+    backend = _Backend(fail="costs")
+    loader = DashboardLoader(backend.fetch)
+    queries = [_query("w1"), _query("w2", "costs"), _query("w3", "costs", fields=["id"])]
+
+    async def both():
+        return await asyncio.gather(loader.load_queries(queries), loader.load_queries(queries[1:]))
+
+    first, second = asyncio.run(both())
+    assert first.results == {"w1": ROWS}
+    assert first.errors == {"w2": "RuntimeError: costs is down", "w3": "RuntimeError: costs is down"}
+    assert second.errors == first.errors
+    assert len(backend.calls) == 2
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from modules.reporting.execution import ReportExecutor, ResultCache, report_tables
+from modules.reporting.models import Report, ReportType
+
+NOW = datetime(2025, 1, 1)
+
+def _report(report_id: str, query: str) -> Report:
+    return Report(report_id, report_id, None, ReportType.COST_REPORT, "p1", query, {"project": "p1"}, "u", False,
+                  NOW, NOW)
+
+def _executor(calls):
+    def runner(report, parameters):
+        calls.append(report.id)
+        if parameters.get("fail"):
+            raise RuntimeError("query failed")
+        return [report.id, sorted(parameters.items())]
+    return ReportExecutor(runner)
+
+def test_identical_queries_hit_the_cache():
+    calls = []
+    executor = _executor(calls)
+    first = executor.execute(_report("r1", '{"tables": ["costs"], "group": "wbs"}'))
+    second = executor.execute(_report("r1", '{ "group": "wbs",  "tables": ["costs"] }'))
+    assert calls == ["r1"]
+    assert (first.execution.cache_hit, second.execution.cache_hit) == (False, True)
+    assert second.result == first.result
+    assert executor.execute(_report("r1", '{"tables": ["costs"]}'), {"project": "p2"}).execution.cache_hit is False
+
+def test_changing_a_table_drops_only_the_reports_reading_it():
+    calls = []
+    executor = _executor(calls)
+    costs, tasks = _report("r1", '{"tables": ["costs"]}'), _report("r2", '{"source": "tasks"}')
+    executor.execute(costs)
+    executor.execute(tasks)
+    executor.versions.bump("costs")
+    assert len(executor.cache) == 1
+    assert executor.execute(tasks).execution.cache_hit is True
+    assert executor.execute(costs).execution.cache_hit is False
+    assert calls == ["r1", "r2", "r1"]
+
+def test_reports_without_declared_tables_are_dropped_by_any_change():
+    calls = []
+    executor = _executor(calls)
+    report = _report("r1", "SELECT 1")
+    assert report_tables(report) == ("*",)
+    executor.execute(report)
+    executor.versions.bump("anything")
+    assert len(executor.cache) == 0
+    assert executor.execute(report).execution.cache_hit is False
+
+def test_failures_are_not_cached():
+    calls = []
+    executor = _executor(calls)
+    report = _report("r1", '{"tables": ["costs"]}')
+    failed = executor.execute(report, {"fail": "yes"})
+    assert (failed.result, failed.execution.status) == (None, "Failed")
+    assert failed.execution.error_message == "RuntimeError: query failed"
+    assert executor.execute(report, {"fail": "yes"}).execution.status == "Failed"
+    assert calls == ["r1", "r1"]
+
+def test_result_cache_evicts_least_recently_used_within_its_byte_budget():
+    cache = ResultCache(max_entries=10, max_bytes=10, size_of=len)
+    cache.put("a", "xxxx", ("t",))
+    cache.put("b", "xxxx", ("t",))
+    cache.get("a")
+    cache.put("c", "xxxx", ("u",))
+    assert ("a" in cache, "b" in cache, "c" in cache) == (True, False, True)
+    assert cache.nbytes == 8
+    cache.put("huge", "x" * 11, ("t",))
+    assert "huge" not in cache
+    assert cache.invalidate("t") == 1
+    assert list(cache.entries) == ["c"]
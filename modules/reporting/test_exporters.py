@@ -0,0 +1,81 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.etree import ElementTree
+
+import pytest
+
+from modules.core.codecs import codec_for
+from modules.costing.models import ActualCost, CostStatus, CostType
+from modules.reporting.exporters import ExportError, export, export_csv, export_html, export_json, export_xlsx
+from modules.reporting.models import ReportExecution, ReportFormat
+
+NOW = datetime(2025, 1, 15, 12)
+SHEET = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+
+def _costs(count: int):
+    return [ActualCost(f"c{i}", "p1", "cc1", "code", None, None, CostType.LABOR, CostStatus.ACTUAL,
+                       Decimal(f"{i}.50"), NOW, None, None, f"line <{i}>", "u", NOW) for i in range(count)]
+
+def test_csv_writes_header_and_every_chunk():
+    rows = [{"name": "a", "amount": Decimal("1.50"), "when": date(2025, 1, 2)},
+            {"name": "b,c", "amount": None, "when": None},
+            {"name": "d", "amount": Decimal("-3"), "when": date(2025, 1, 3)}]
+    target = io.StringIO()
+    assert export_csv(rows, target, chunk_rows=2) == 3
+    assert list(csv.reader(io.StringIO(target.getvalue()))) == [
+        ["name", "amount", "when"], ["a", "1.50", "2025-01-02"], ["b,c", "", ""], ["d", "-3", "2025-01-03"]]
+
+def test_json_round_trips_dataclass_rows():
+    costs = _costs(5)
+    target = io.StringIO()
+    assert export_json(costs, target, chunk_rows=2) == 5
+    codec = codec_for(ActualCost)
+    assert [codec.from_dict(item) for item in json.loads(target.getvalue())] == costs
+
+def test_json_with_selected_columns_and_no_rows():
+    target = io.StringIO()
+    export_json(_costs(2), target, columns=["id", "cost_type", "amount"])
+    assert json.loads(target.getvalue()) == [{"id": "c0", "cost_type": "labor", "amount": "0.50"},
+                                             {"id": "c1", "cost_type": "labor", "amount": "1.50"}]
+    empty = io.StringIO()
+    assert export_json([], empty) == 0
+    assert json.loads(empty.getvalue()) == []
+
+def test_html_escapes_title_headers_and_cells():
+    target = io.StringIO()
+    assert export_html([("<b>", "x & y")], target, columns=["a<", "b"], title="Q&A") == 1
+    output = target.getvalue()
+    assert "<title>Q&amp;A</title>" in output
+    assert "<th>a&lt;</th>" in output
+    assert "<td>&lt;b&gt;</td><td>x &amp; y</td>" in output
+
+def test_sequence_rows_need_columns():
+    with pytest.raises(ExportError, match="columns are required"):
+        export_csv([("a", 1)], io.StringIO())
+
+def test_xlsx_sheet_holds_typed_cells():
+    target = io.BytesIO()
+    rows = [("text & <tag>", 3, Decimal("2.5"), True, None, date(2025, 1, 1), datetime(1900, 1, 1, 12))]
+    assert export_xlsx(rows, target, columns=list("abcdefg"), sheet_name="Costs") == 1
+    with zipfile.ZipFile(target) as archive:
+        assert 'name="Costs"' in archive.read("xl/workbook.xml").decode()
+        sheet = ElementTree.fromstring(archive.read("xl/worksheets/sheet1.xml"))
+    header, row = sheet.iter(f"{SHEET}row")
+    assert [cell.findtext(f"{SHEET}is/{SHEET}t") for cell in header] == list("abcdefg")
+    assert row[0].findtext(f"{SHEET}is/{SHEET}t") == "text & <tag>"
+    assert [cell.findtext(f"{SHEET}v") for cell in row[1:]] == ["3", "2.5", "1", None, "45658", "2.5"]
+    assert [cell.get("s") for cell in row[5:]] == ["1", "2"]
+
+def test_export_records_the_output_path(tmp_path):
+    execution = ReportExecution("e1", "r1", None, NOW, {}, 0.0, None, "In Progress", None, "u")
+    path = str(tmp_path / "costs.csv")
+    assert export(_costs(3), ReportFormat.CSV, path, execution=execution) == 3
+    assert execution.output_file_path == path
+    with open(path, encoding="utf-8") as file:
+        assert len(file.read().splitlines()) == 4
+    with pytest.raises(ExportError, match="pdf export is not supported"):
+        export(_costs(1), ReportFormat.PDF, str(tmp_path / "costs.pdf"))
@@ -0,0 +1,72 @@
+import math
+from datetime import datetime
+
+import pytest
+
+from modules.reporting.kpi import GREEN, RED, YELLOW, KPIEvaluator, KPIFormulaError, compile_formula
+from modules.reporting.models import KPI
+
+NOW = datetime(2025, 1, 1)
+
+def _kpi(kpi_id: str, formula: str, target=None, warning=None, critical=None, active: bool = True) -> KPI:
+    return KPI(kpi_id, kpi_id, "", formula, target, warning, critical, "", "cost", active, NOW)
+
+@pytest.mark.parametrize("formula", [
+    "__import__('os').system('true')",
+    "ev.__class__",
+    "[ev for ev in pv]",
+    "'text'",
+    "True",
+    "lambda: 1",
+    "open('x')",
+    "max",
+    "round(ev, ndigits=2)",
+    "ev[0]",
+])
+def test_whitelist_rejects_anything_but_arithmetic(formula):
+    with pytest.raises(KPIFormulaError):
+        compile_formula(formula)
+
+@pytest.mark.parametrize("formula, message", [
+    ("sqrt(ev, pv)", "sqrt takes 1 arguments"),
+    ("max(ev)", "max takes at least 2 arguments"),
+    ("round(ev, 1, 2)", "round takes 1-2 arguments"),
+    ("if_(ev > pv, 1)", "if_ takes 3 arguments"),
+])
+def test_function_arity_is_checked_at_compile_time(formula, message):
+    with pytest.raises(KPIFormulaError, match=message):
+        compile_formula(formula)
+
+def test_syntax_errors_are_formula_errors():
+    with pytest.raises(KPIFormulaError, match="invalid KPI formula"):
+        compile_formula("ev / ")
+
+def test_guarded_operations_give_nan():
+    compiled = compile_formula("ev / pv + sqrt(ev) + log(pv)")
+    assert compiled.names == ("ev", "pv")
+    results = compiled({"ev": [4.0, 1.0, -1.0, None], "pv": [2.0, 0.0, 1.0, 1.0]}, 4)
+    assert results[0] == pytest.approx(2 + 2 + math.log(2))
+    assert all(math.isnan(value) for value in results[1:])
+    assert compile_formula("2 ** 3 % 5")({}, 2) == [3, 3]
+
+def test_evaluator_classifies_per_project_and_reports_errors():
+    evaluator = KPIEvaluator([
+        _kpi("cpi", "ev / ac", target=1.0, warning=0.95, critical=0.85),
+        _kpi("overrun", "ac - ev", target=0.0, warning=10.0, critical=20.0),
+        _kpi("bad", "ev.real"),
+        _kpi("missing", "ev / budget"),
+        _kpi("runtime", "round(ev, digits)"),
+        _kpi("inactive", "ev.real", active=False),
+    ])
+    assert set(evaluator.errors) == {"bad"}
+    values = evaluator.evaluate(["p1", "p2", "p3"], {"ev": [100.0, 90.0, 80.0], "ac": [100.0, 100.0, 0.0],
+                                                     "digits": [None, None, None]}, NOW)
+    assert [(value.kpi_id, value.project_id, value.status) for value in values] == [
+        ("cpi", "p1", GREEN), ("cpi", "p2", YELLOW),
+        ("overrun", "p1", GREEN), ("overrun", "p2", GREEN), ("overrun", "p3", GREEN),
+    ]
+    assert values[1].variance == pytest.approx(-0.1)
+    assert evaluator.errors["missing"] == "missing metrics budget"
+    assert evaluator.errors["runtime"].startswith("ValueError")
+    lower = evaluator.evaluate(["p1"], {"ev": [50.0], "ac": [75.0], "digits": [0]}, NOW)
+    assert [(value.kpi_id, value.status) for value in lower] == [("cpi", RED), ("overrun", RED), ("runtime", GREEN)]
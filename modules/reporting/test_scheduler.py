@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from modules.reporting.models import Report, ReportFormat, ReportSchedule, ReportType, ScheduleFrequency
+from modules.reporting.scheduler import ScheduleRunner
+
+NOW = datetime(2025, 1, 1, 6)
+
+def _render(report, parameters, output_format):
+    return f"{report.id}:{output_format.value}".encode()
+
+def _runner(delivered, executor):
+    report = Report("r1", "Costs", None, ReportType.COST_REPORT, "p1", "{}", {}, "u", False, NOW, NOW)
+    return ScheduleRunner([report], _render, lambda schedule, output, execution: delivered.append(schedule.id),
+                          executor=executor)
+
+def _schedule(schedule_id: str, report_id: str = "r1") -> ReportSchedule:
+    return ReportSchedule(schedule_id, report_id, ScheduleFrequency.DAILY, ["a@example.com"], ReportFormat.CSV, {},
+                          NOW, True, "u", NOW)
+
+def test_re_adding_a_queued_schedule_runs_it_once_per_period():
+    delivered = []
+    with ThreadPoolExecutor(2) as executor:
+        runner = _runner(delivered, executor)
+        schedule = _schedule("s1")
+        runner.add(schedule)
+        runner.add(schedule)
+        runner.add_all([schedule])
+        executions = runner.run_due(NOW)
+    assert [execution.schedule_id for execution in executions] == ["s1"]
+    assert delivered == ["s1"]
+    assert schedule.next_run_date == datetime(2025, 1, 2, 6)
+    assert len(runner.heap) == 1
+
+def test_moved_schedule_only_fires_at_its_new_date():
+    delivered = []
+    with ThreadPoolExecutor(2) as executor:
+        runner = _runner(delivered, executor)
+        schedule = _schedule("s1")
+        runner.add(schedule)
+        schedule.next_run_date = datetime(2025, 1, 3, 6)
+        runner.add(schedule)
+        assert runner.run_due(NOW) == []
+        assert runner.next_due() == datetime(2025, 1, 3, 6)
+
+def test_unknown_report_fails_and_is_rescheduled():
+    with ThreadPoolExecutor(1) as executor:
+        runner = _runner([], executor)
+        schedule = _schedule("s1", report_id="missing")
+        runner.add(schedule)
+        executions = runner.run_due(NOW)
+    assert [(execution.status, execution.error_message) for execution in executions] == [
+        ("Failed", "unknown report missing")]
+    assert runner.next_due() == datetime(2025, 1, 2, 6)
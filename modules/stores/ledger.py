@@ -0,0 +1,199 @@
+import struct
+from array import array
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from modules.stores.models import StockBalance, StockMovement, StockMovementType
+from modules.stores.valuation import StockValuationEngine, ZERO
+
+QUANTITY_SCALE = 10_000  # quantities are held as integer ten-thousandths
+ENTRY = struct.Struct("<iqq")  # key id, movement timestamp (seconds), signed scaled quantity
+EPOCH = datetime(1970, 1, 1)
+
+BalanceKey = Tuple[str, str, Optional[str]]  # store_id, stock_item_id, location_id
+
+def _timestamp(moment: datetime) -> int:
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return (moment - EPOCH) // timedelta(seconds=1)
+
+def _scaled(quantity: Decimal) -> int:
+    scaled = quantity * QUANTITY_SCALE
+    if scaled != scaled.to_integral_value():
+        raise ValueError(f"quantity {quantity} has more precision than the ledger keeps")
+    return int(scaled)
+
+def _quantity(scaled: int) -> Decimal:
+    return Decimal(scaled) / QUANTITY_SCALE
+
+class StockLedger:
+    """Event-sourced stock balances.
+
+    Each movement adjusts per store/item/location balances in place and appends
+    fixed-width entries to a compact log. Periodic snapshots of the balance
+    array make historical balances a snapshot restore plus a short log replay.
+    """
+
+    def __init__(self, snapshot_every: int = 50_000, log_file: Optional[BinaryIO] = None):
+        self.snapshot_every = snapshot_every
+        self.log_file = log_file
+        self.log = bytearray()
+        self.keys: List[BalanceKey] = []
+        self.key_ids: Dict[BalanceKey, int] = {}
+        self.by_store: Dict[str, Set[int]] = {}
+        self.by_item: Dict[str, Set[int]] = {}
+        self.quantity = array('q')
+        self.reserved = array('q')
+        self.last_movement = array('q')
+        self.max_timestamp: Optional[int] = None
+        self.snapshots: List[Tuple[int, int, array]] = []  # (entry count, max timestamp, balances)
+        # Earliest timestamp in each log segment: segment i ends at snapshot i, the last one is still open.
+        self.segment_min: List[Optional[int]] = [None]
+
+    def __len__(self) -> int:
+        return len(self.log) // ENTRY.size
+
+    def _key_id(self, key: BalanceKey) -> int:
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = len(self.keys)
+            self.keys.append(key)
+            self.key_ids[key] = key_id
+            self.by_store.setdefault(key[0], set()).add(key_id)
+            self.by_item.setdefault(key[1], set()).add(key_id)
+            self.quantity.append(0)
+            self.reserved.append(0)
+            self.last_movement.append(0)
+        return key_id
+
+    def _append(self, key: BalanceKey, timestamp: int, delta: int) -> None:
+        key_id = self._key_id(key)
+        self.quantity[key_id] += delta
+        if timestamp > self.last_movement[key_id]:
+            self.last_movement[key_id] = timestamp
+        entry = ENTRY.pack(key_id, timestamp, delta)
+        self.log += entry
+        if self.log_file is not None:
+            self.log_file.write(entry)
+        if self.max_timestamp is None or timestamp > self.max_timestamp:
+            self.max_timestamp = timestamp
+        if self.segment_min[-1] is None or timestamp < self.segment_min[-1]:
+            self.segment_min[-1] = timestamp
+        if len(self) % self.snapshot_every == 0:
+            self.snapshots.append((len(self), self.max_timestamp, array('q', self.quantity)))
+            self.segment_min.append(None)
+
+    def record(self, movement: StockMovement) -> None:
+        timestamp = _timestamp(movement.movement_date)
+        quantity = _scaled(movement.quantity)
+        store, item, kind = movement.store_id, movement.stock_item_id, movement.movement_type
+        if kind in (StockMovementType.RECEIPT, StockMovementType.RETURN):
+            self._append((store, item, movement.to_location_id), timestamp, quantity)
+        elif kind in (StockMovementType.ISSUE, StockMovementType.WRITE_OFF):
+            self._append((store, item, movement.from_location_id), timestamp, -quantity)
+        elif kind is StockMovementType.TRANSFER:
+            self._append((store, item, movement.from_location_id), timestamp, -quantity)
+            self._append((store, item, movement.to_location_id), timestamp, quantity)
+        elif kind is StockMovementType.ADJUSTMENT:
+            location = movement.to_location_id if movement.to_location_id is not None else movement.from_location_id
+            self._append((store, item, location), timestamp, quantity)
+        else:
+            raise ValueError(f"unsupported movement type {kind}")
+
+    def record_all(self, movements: Iterable[StockMovement]) -> int:
+        count = 0
+        for movement in movements:
+            self.record(movement)
+            count += 1
+        return count
+
+    def reserve(self, store_id: str, stock_item_id: str, location_id: Optional[str], quantity: Decimal) -> None:
+        key_id = self._key_id((store_id, stock_item_id, location_id))
+        reserved = self.reserved[key_id] + _scaled(quantity)
+        if reserved < 0:
+            raise ValueError("cannot release more than is reserved")
+        self.reserved[key_id] = reserved
+
+    def on_hand(self, store_id: str, stock_item_id: str, location_id: Optional[str] = None) -> Decimal:
+        key_id = self.key_ids.get((store_id, stock_item_id, location_id))
+        return ZERO if key_id is None else _quantity(self.quantity[key_id])
+
+    def store_quantities(self, store_id: str) -> Dict[BalanceKey, Decimal]:
+        return {self.keys[key_id]: _quantity(self.quantity[key_id]) for key_id in self.by_store.get(store_id, ())}
+
+    def item_quantities(self, stock_item_id: str) -> Dict[BalanceKey, Decimal]:
+        return {self.keys[key_id]: _quantity(self.quantity[key_id]) for key_id in self.by_item.get(stock_item_id, ())}
+
+    def _replay_from(self, cutoff: int) -> Tuple[Optional[array], Iterator[memoryview]]:
+        """Latest snapshot usable at ``cutoff`` and the later log segments that may hold entries on or before it."""
+        # Snapshot max timestamps never decrease, so the usable snapshots form a prefix.
+        position = bisect_right([max_timestamp for _, max_timestamp, _ in self.snapshots], cutoff)
+        saved = self.snapshots[position - 1][2] if position else None
+        log = memoryview(self.log)
+
+        def segments() -> Iterator[memoryview]:
+            # Backdated movements can land in any later segment, so each one is checked, not just the next.
+            for segment in range(position, len(self.segment_min)):
+                earliest = self.segment_min[segment]
+                if earliest is None or earliest > cutoff:
+                    continue
+                start = self.snapshots[segment - 1][0] if segment else 0
+                end = self.snapshots[segment][0] if segment < len(self.snapshots) else len(self)
+                yield log[start * ENTRY.size:end * ENTRY.size]
+
+        return saved, segments()
+
+    def balances_at(self, moment: datetime) -> array:
+        """Scaled quantities per key id, counting only movements dated on or before ``moment``."""
+        cutoff = _timestamp(moment)
+        saved, segments = self._replay_from(cutoff)
+        balances = array('q') if saved is None else array('q', saved)
+        balances.extend([0] * (len(self.keys) - len(balances)))
+        for segment in segments:
+            for key_id, timestamp, delta in ENTRY.iter_unpack(segment):
+                if timestamp <= cutoff:
+                    balances[key_id] += delta
+        return balances
+
+    def quantity_at(self, moment: datetime, store_id: str, stock_item_id: str,
+                    location_id: Optional[str] = None) -> Decimal:
+        key_id = self.key_ids.get((store_id, stock_item_id, location_id))
+        if key_id is None:
+            return ZERO
+        cutoff = _timestamp(moment)
+        saved, segments = self._replay_from(cutoff)
+        quantity = saved[key_id] if saved is not None and key_id < len(saved) else 0
+        for segment in segments:
+            for entry_key, timestamp, delta in ENTRY.iter_unpack(segment):
+                if entry_key == key_id and timestamp <= cutoff:
+                    quantity += delta
+        return _quantity(quantity)
+
+    def stock_balances(self, store_id: str, valuation: Optional[StockValuationEngine] = None) -> List[StockBalance]:
+        balances = []
+        for key_id in sorted(self.by_store.get(store_id, ())):
+            store, item, location = self.keys[key_id]
+            current = _quantity(self.quantity[key_id])
+            reserved = _quantity(self.reserved[key_id])
+            balance = StockBalance(
+                id=f"{store}:{item}:{location or ''}",
+                store_id=store,
+                stock_item_id=item,
+                location_id=location,
+                current_quantity=current,
+                reserved_quantity=reserved,
+                available_quantity=current - reserved,
+                average_cost=ZERO,
+                total_value=ZERO,
+                last_movement_date=EPOCH + timedelta(seconds=self.last_movement[key_id]),
+            )
+            balances.append(balance)
+        if valuation is not None:
+            by_item: Dict[str, List[StockBalance]] = {}
+            for balance in balances:
+                by_item.setdefault(balance.stock_item_id, []).append(balance)
+            for item_balances in by_item.values():
+                valuation.apply_all(item_balances)
+        return balances
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from modules.stores.models import StockBalance, StockItem, StockMovement, StockMovementType, ValuationMethod
+from modules.stores.valuation import StockValuationEngine, StockValuationError
+
+START = datetime(2025, 1, 1)
+
+def _engine(method: ValuationMethod) -> StockValuationEngine:
+    item = StockItem("i1", "CEM", "Cement", "bulk", "bag", Decimal("0"), Decimal("0"), Decimal("0"), method, True,
+                     START, START)
+    return StockValuationEngine([item])
+
+def _movement(day: int, kind: StockMovementType, quantity: str, unit_cost: str = "0") -> StockMovement:
+    return StockMovement(f"m{day}", "s1", "i1", kind, "ref", "PO", Decimal(quantity), Decimal(unit_cost),
+                         Decimal("0"), None, None, START + timedelta(days=day), "u", None, START)
+
+def _balance(location: str, quantity: str) -> StockBalance:
+    return StockBalance(f"b-{location}", "s1", "i1", location, Decimal(quantity), Decimal("0"), Decimal(quantity),
+                        Decimal("0"), Decimal("0"), START)
+
+def test_fifo_and_average_issue_costs():
+    movements = [_movement(0, StockMovementType.RECEIPT, "10", "2.00"),
+                 _movement(1, StockMovementType.RECEIPT, "10", "3.00"),
+                 _movement(2, StockMovementType.ISSUE, "15")]
+    fifo, average = _engine(ValuationMethod.FIFO), _engine(ValuationMethod.WEIGHTED_AVERAGE)
+    fifo.run(movements)
+    average.run(movements)
+    assert fifo.valuation("s1", "i1").value == Decimal("15.00")
+    assert average.valuation("s1", "i1").value == Decimal("12.50")
+
+def test_apply_all_splits_the_layer_value_across_locations():
+    engine = _engine(ValuationMethod.FIFO)
+    engine.run([_movement(0, StockMovementType.RECEIPT, "3", "3.3333333")])
+    a, b = engine.apply_all([_balance("a", "1"), _balance("b", "2")])
+    assert (a.total_value, b.total_value) == (Decimal("3.33"), Decimal("6.67"))
+    assert engine.apply(_balance(None, "3")).total_value == Decimal("10.00")
+    assert engine.apply_all([]) == []
+    with pytest.raises(StockValuationError):
+        engine.apply_all([_balance("a", "1")])
+
+def test_backdated_movement_is_revalued_from_a_checkpoint():
+    engine = _engine(ValuationMethod.FIFO)
+    engine.checkpoint_every = 1
+    movements = [_movement(day, StockMovementType.RECEIPT, "1", str(day + 1)) for day in range(0, 10, 2)]
+    engine.run(movements)
+    backdated = _movement(5, StockMovementType.ISSUE, "2")
+    with pytest.raises(StockValuationError):
+        engine.post(backdated)
+    timeline = sorted(movements + [backdated], key=lambda movement: movement.movement_date)
+    engine.revalue(backdated, lambda as_of: [m for m in timeline if as_of is None or m.movement_date >= as_of])
+    assert engine.valuation("s1", "i1").value == Decimal("21")  # layers at 5, 7 and 9 remain
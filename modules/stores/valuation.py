@@ -0,0 +1,207 @@
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from modules.stores.models import (
+    StockBalance, StockItem, StockMovement, StockMovementType, ValuationMethod,
+)
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0")
+
+INBOUND = {StockMovementType.RECEIPT, StockMovementType.RETURN}
+OUTBOUND = {StockMovementType.ISSUE, StockMovementType.WRITE_OFF}
+
+class StockValuationError(ValueError):
+    pass
+
+class ItemValuation:
+    """Cost layers for one item in one store. FIFO/LIFO keep a deque of open
+    (quantity, unit_cost) layers; average and standard cost keep totals only."""
+
+    __slots__ = ("method", "standard_cost", "layers", "quantity", "value")
+
+    def __init__(self, method: ValuationMethod, standard_cost: Optional[Decimal] = None):
+        self.method = method
+        self.standard_cost = standard_cost
+        self.layers: deque = deque()
+        self.quantity = ZERO
+        self.value = ZERO
+
+    @property
+    def average_cost(self) -> Decimal:
+        if not self.quantity:
+            return ZERO
+        return (self.value / self.quantity).quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def receive(self, quantity: Decimal, unit_cost: Decimal) -> Decimal:
+        if self.method is ValuationMethod.STANDARD_COST:
+            if self.standard_cost is None:
+                self.standard_cost = unit_cost
+            unit_cost = self.standard_cost
+        value = quantity * unit_cost
+        if self.method in (ValuationMethod.FIFO, ValuationMethod.LIFO):
+            self.layers.append([quantity, unit_cost])
+        self.quantity += quantity
+        self.value += value
+        return value
+
+    def issue(self, quantity: Decimal) -> Decimal:
+        if quantity > self.quantity:
+            raise StockValuationError(f"cannot issue {quantity}; only {self.quantity} on hand")
+        if self.method in (ValuationMethod.FIFO, ValuationMethod.LIFO):
+            take = self.layers.popleft if self.method is ValuationMethod.FIFO else self.layers.pop
+            put_back = self.layers.appendleft if self.method is ValuationMethod.FIFO else self.layers.append
+            remaining, cost = quantity, ZERO
+            while remaining:
+                layer = take()
+                used = min(layer[0], remaining)
+                cost += used * layer[1]
+                remaining -= used
+                if used < layer[0]:
+                    put_back([layer[0] - used, layer[1]])
+        elif self.method is ValuationMethod.STANDARD_COST:
+            cost = quantity * self.standard_cost
+        else:
+            cost = self.value if quantity == self.quantity else (
+                self.value * quantity / self.quantity).quantize(CENT, rounding=ROUND_HALF_UP)
+        self.quantity -= quantity
+        self.value -= cost
+        return cost
+
+    def snapshot(self) -> Tuple:
+        return (self.standard_cost, tuple(tuple(layer) for layer in self.layers), self.quantity, self.value)
+
+    @classmethod
+    def restore(cls, method: ValuationMethod, state: Tuple) -> "ItemValuation":
+        valuation = cls(method, state[0])
+        valuation.layers.extend(list(layer) for layer in state[1])
+        valuation.quantity, valuation.value = state[2], state[3]
+        return valuation
+
+class StockValuationEngine:
+    """Streams StockMovement rows in date order through per store/item cost layers.
+
+    Every ``checkpoint_every`` movements, at the next change of date, the engine
+    snapshots its open layers. A backdated movement is handled by restoring the
+    latest snapshot taken before its date and replaying from there.
+    """
+
+    def __init__(self, items: Iterable[StockItem], standard_costs: Optional[Dict[str, Decimal]] = None,
+                 checkpoint_every: int = 10_000, max_checkpoints: int = 64):
+        self.methods: Dict[str, ValuationMethod] = {item.id: item.valuation_method for item in items}
+        self.standard_costs = dict(standard_costs or {})
+        self.checkpoint_every = checkpoint_every
+        self.max_checkpoints = max_checkpoints
+        self.valuations: Dict[Tuple[str, str], ItemValuation] = {}
+        self.last_date: Optional[datetime] = None
+        self.posted_since_checkpoint = 0
+        self.checkpoints: List[Tuple[datetime, Dict[Tuple[str, str], Tuple]]] = []
+
+    def valuation(self, store_id: str, stock_item_id: str) -> ItemValuation:
+        key = (store_id, stock_item_id)
+        valuation = self.valuations.get(key)
+        if valuation is None:
+            method = self.methods.get(stock_item_id)
+            if method is None:
+                raise StockValuationError(f"unknown stock item {stock_item_id}")
+            valuation = ItemValuation(method, self.standard_costs.get(stock_item_id))
+            self.valuations[key] = valuation
+        return valuation
+
+    def post(self, movement: StockMovement) -> Decimal:
+        if self.last_date is not None and movement.movement_date < self.last_date:
+            raise StockValuationError(
+                f"movement {movement.id} on {movement.movement_date} is backdated; use revalue()")
+        if movement.movement_date != self.last_date and self.posted_since_checkpoint >= self.checkpoint_every:
+            self.checkpoint(movement.movement_date)
+        self.last_date = movement.movement_date
+        self.posted_since_checkpoint += 1
+
+        valuation = self.valuation(movement.store_id, movement.stock_item_id)
+        kind, quantity = movement.movement_type, movement.quantity
+        if kind is StockMovementType.TRANSFER:
+            return ZERO
+        if kind is StockMovementType.ADJUSTMENT:
+            kind = StockMovementType.RECEIPT if quantity >= 0 else StockMovementType.ISSUE
+            quantity = abs(quantity)
+        if kind in INBOUND:
+            unit_cost = movement.unit_cost or valuation.average_cost
+            return valuation.receive(quantity, unit_cost)
+        if kind in OUTBOUND:
+            return valuation.issue(quantity)
+        raise StockValuationError(f"unsupported movement type {movement.movement_type}")
+
+    def run(self, movements: Iterable[StockMovement]) -> int:
+        count = 0
+        for movement in movements:
+            self.post(movement)
+            count += 1
+        return count
+
+    def checkpoint(self, as_of: datetime) -> None:
+        """Snapshot the state covering every movement dated before ``as_of``."""
+        state = {key: valuation.snapshot() for key, valuation in self.valuations.items()}
+        self.checkpoints.append((as_of, state))
+        if len(self.checkpoints) > self.max_checkpoints:
+            # Thin out older snapshots rather than dropping the oldest outright.
+            del self.checkpoints[1:len(self.checkpoints) - self.max_checkpoints // 2:2]
+        self.posted_since_checkpoint = 0
+
+    def rewind(self, before: datetime) -> Optional[datetime]:
+        position = bisect_right([as_of for as_of, _ in self.checkpoints], before)
+        del self.checkpoints[position:]
+        self.posted_since_checkpoint = 0
+        if not position:
+            self.valuations = {}
+            self.last_date = None
+            return None
+        as_of, state = self.checkpoints[-1]
+        self.valuations = {key: ItemValuation.restore(self.methods[key[1]], snapshot)
+                           for key, snapshot in state.items()}
+        self.last_date = None
+        return as_of
+
+    def revalue(self, backdated: StockMovement,
+                movements_from: Callable[[Optional[datetime]], Iterable[StockMovement]]) -> int:
+        """Re-value after ``backdated`` was recorded. ``movements_from(date)`` must
+        yield, in date order, every movement dated on or after ``date`` (all
+        movements when ``date`` is None), including the backdated one."""
+        as_of = self.rewind(backdated.movement_date)
+        return self.run(movements_from(as_of))
+
+    def apply(self, balance: StockBalance) -> StockBalance:
+        """Copy the valuation onto a store-level balance; total_value is the layer value, not quantity x average."""
+        return self.apply_all([balance])[0]
+
+    def apply_all(self, balances: List[StockBalance]) -> List[StockBalance]:
+        """Value the location balances of one store item, which must add up to the valuation's quantity.
+
+        The layer value is split across locations by quantity, with the rounding
+        remainder on the last balance, so the totals add up to the valuation.
+        An empty list is returned as is.
+        """
+        if not balances:
+            return balances
+        first = balances[0]
+        if any((balance.store_id, balance.stock_item_id) != (first.store_id, first.stock_item_id)
+               for balance in balances):
+            raise StockValuationError("apply_all expects balances of a single store item")
+        valuation = self.valuation(first.store_id, first.stock_item_id)
+        quantity = sum((balance.current_quantity for balance in balances), ZERO)
+        if quantity != valuation.quantity:
+            raise StockValuationError(
+                f"balances for {first.stock_item_id} in {first.store_id} hold {quantity}, "
+                f"but the valuation holds {valuation.quantity}")
+        remaining = valuation.value.quantize(CENT, rounding=ROUND_HALF_UP)
+        for position, balance in enumerate(balances):
+            balance.average_cost = valuation.average_cost
+            if position == len(balances) - 1:
+                balance.total_value = remaining
+            else:
+                balance.total_value = (valuation.value * balance.current_quantity / quantity).quantize(
+                    CENT, rounding=ROUND_HALF_UP) if quantity else ZERO
+                remaining -= balance.total_value
+        return balances
@@ -0,0 +1,215 @@
+import heapq
+from array import array
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from modules.projects.models import ProjectSettings
+from modules.tasks.models import Task, TaskAssignment, TaskPriority, TaskStatus
+from modules.tasks.scheduling import CriticalPathScheduler
+
+DEFAULT_WORKING_DAYS = (0, 1, 2, 3, 4)
+DEFAULT_HOURS_PER_DAY = 8.0
+# Lower ranks are moved first.
+PRIORITY_RANK = {TaskPriority.LOW: 0, TaskPriority.MEDIUM: 1, TaskPriority.HIGH: 2, TaskPriority.CRITICAL: 3}
+_LOADED = (TaskStatus.NOT_STARTED, TaskStatus.IN_PROGRESS, TaskStatus.ON_HOLD)
+_EPSILON = 1e-9
+
+@dataclass
+class Overload:
+    user_id: str
+    day: date
+    load_hours: float
+    capacity_hours: float
+    task_ids: List[str]
+
+    @property
+    def excess_hours(self) -> float:
+        return self.load_hours - self.capacity_hours
+
+@dataclass
+class TaskShift:
+    task_id: str
+    shift_days: int
+    planned_start_date: datetime
+    planned_end_date: datetime
+
+def free_floats(schedulers: Iterable[CriticalPathScheduler]) -> Dict[str, int]:
+    """Days each task can slip without moving any successor or its project's finish."""
+    floats: Dict[str, int] = {}
+    for scheduler in schedulers:
+        for node, task_id in enumerate(scheduler.ids):
+            if scheduler.total_float(node) > 0:
+                floats[task_id] = max(scheduler.free_float(node), 0)
+    return floats
+
+class ResourceLeveler:
+    """Per-user daily load histograms across projects, overload detection and float-bounded leveling.
+
+    Day ``i`` of every histogram is ``origin + i`` days. An assignment's
+    allocated_hours are spread evenly over the working days (per the task's
+    ProjectSettings) between the task's planned start and end; tasks whose span
+    holds no working day spread over every day instead. A user's daily
+    capacity is ``capacity[user_id]`` when given, otherwise the largest
+    working_hours_per_day of the projects they are assigned to.
+
+    Leveling only moves NOT_STARTED tasks, only later, and only within the free
+    float from ``floats`` (see free_floats), so critical tasks and successors
+    never move. Tasks on overloaded days come off a heap lowest TaskPriority
+    first, most float first, and take the earliest shift that fits every
+    assigned user's capacity.
+    """
+
+    def __init__(self, tasks: Sequence[Task], assignments: Iterable[TaskAssignment],
+                 settings: Iterable[ProjectSettings] = (), floats: Optional[Mapping[str, int]] = None,
+                 capacity: Optional[Mapping[str, float]] = None):
+        self.tasks: Dict[str, Task] = {task.id: task for task in tasks if task.status in _LOADED}
+        self.floats: Dict[str, int] = dict(floats or {})
+        self.calendars: Dict[str, Tuple[Tuple[bool, ...], float]] = {}
+        for setting in settings:
+            working = set(setting.working_days)
+            self.calendars[setting.project_id] = (tuple(weekday in working for weekday in range(7)),
+                                                  float(setting.working_hours_per_day))
+        self.default_calendar = (tuple(weekday in DEFAULT_WORKING_DAYS for weekday in range(7)),
+                                 DEFAULT_HOURS_PER_DAY)
+
+        self.assignments: Dict[str, List[Tuple[str, float]]] = {}
+        for assignment in assignments:
+            if assignment.is_active and assignment.allocated_hours > 0 and assignment.task_id in self.tasks:
+                self.assignments.setdefault(assignment.task_id, []).append(
+                    (assignment.user_id, float(assignment.allocated_hours)))
+
+        starts = [task.planned_start_date.date() for task in self.tasks.values()]
+        self.origin: date = min(starts, default=date.today())
+        self.start: Dict[str, int] = {}
+        self.length: Dict[str, int] = {}
+        days = 1
+        for task_id, task in self.tasks.items():
+            self.start[task_id] = (task.planned_start_date.date() - self.origin).days
+            self.length[task_id] = max((task.planned_end_date.date() - task.planned_start_date.date()).days, 1)
+            days = max(days, self.start[task_id] + self.length[task_id] + self.floats.get(task_id, 0))
+        self.days = days
+        self._weekday = self.origin.weekday()
+
+        hours: Dict[str, float] = {}
+        for task_id, users in self.assignments.items():
+            day_hours = self._calendar(task_id)[1]
+            for user_id, _ in users:
+                hours[user_id] = max(hours.get(user_id, 0.0), day_hours)
+        if capacity:
+            hours.update((user_id, float(value)) for user_id, value in capacity.items() if user_id in hours)
+        self.capacity: Dict[str, float] = hours
+
+        self.load: Dict[str, array] = {user_id: array('d', bytes(8 * days)) for user_id in self.capacity}
+        self.shifts: Dict[str, int] = {}
+        for task_id in self.assignments:
+            self._apply(task_id, self.start[task_id], 1.0)
+
+    def _calendar(self, task_id: str) -> Tuple[Tuple[bool, ...], float]:
+        return self.calendars.get(self.tasks[task_id].project_id, self.default_calendar)
+
+    def _days(self, task_id: str, start: int) -> List[int]:
+        """Day indexes a task occupies when it starts on day ``start``."""
+        working = self._calendar(task_id)[0]
+        weekday = self._weekday
+        span = range(start, start + self.length[task_id])
+        days = [day for day in span if working[(weekday + day) % 7]]
+        return days or list(span)
+
+    def _apply(self, task_id: str, start: int, sign: float) -> None:
+        days = self._days(task_id, start)
+        for user_id, allocated in self.assignments[task_id]:
+            per_day = sign * allocated / len(days)
+            load = self.load[user_id]
+            for day in days:
+                load[day] += per_day
+
+    def _overloaded(self, user_id: str, days: Iterable[int]) -> bool:
+        load, limit = self.load[user_id], self.capacity[user_id] + _EPSILON
+        return any(load[day] > limit for day in days)
+
+    def _fits(self, task_id: str, start: int, current: List[int]) -> bool:
+        """Whether moving the task to ``start`` keeps every assigned user within capacity."""
+        days = self._days(task_id, start)
+        own = set(current)
+        for user_id, allocated in self.assignments[task_id]:
+            load, limit = self.load[user_id], self.capacity[user_id] + _EPSILON
+            per_day = allocated / len(days)
+            current_per_day = allocated / len(current)
+            for day in days:
+                if load[day] - (current_per_day if day in own else 0.0) + per_day > limit:
+                    return False
+        return True
+
+    def histogram(self, user_id: str) -> array:
+        return self.load[user_id]
+
+    def day(self, index: int) -> date:
+        return self.origin + timedelta(days=index)
+
+    def overloaded_days(self, user_id: str) -> List[int]:
+        load, limit = self.load[user_id], self.capacity[user_id] + _EPSILON
+        if max(load, default=0.0) <= limit:
+            return []
+        return [day for day, hours in enumerate(load) if hours > limit]
+
+    def overloads(self) -> List[Overload]:
+        by_user: Dict[str, List[int]] = {}
+        for user_id in self.load:
+            days = self.overloaded_days(user_id)
+            if days:
+                by_user[user_id] = days
+        if not by_user:
+            return []
+        tasks_on: Dict[Tuple[str, int], List[str]] = {}
+        wanted = {user_id: set(days) for user_id, days in by_user.items()}
+        for task_id, users in self.assignments.items():
+            days = None
+            for user_id, _ in users:
+                if user_id in wanted:
+                    if days is None:
+                        days = self._days(task_id, self.start[task_id])
+                    for day in wanted[user_id].intersection(days):
+                        tasks_on.setdefault((user_id, day), []).append(task_id)
+        return [Overload(user_id, self.day(day), self.load[user_id][day], self.capacity[user_id],
+                         tasks_on.get((user_id, day), []))
+                for user_id, days in by_user.items() for day in days]
+
+    def level(self) -> List[TaskShift]:
+        """Shift movable tasks off overloaded days; returns the shifts made by this call."""
+        heap = []
+        for sequence, (task_id, users) in enumerate(self.assignments.items()):
+            room = self.floats.get(task_id, 0) - self.shifts.get(task_id, 0)
+            task = self.tasks[task_id]
+            if room <= 0 or task.status is not TaskStatus.NOT_STARTED:
+                continue
+            current = self._days(task_id, self.start[task_id])
+            if any(self._overloaded(user_id, current) for user_id, _ in users):
+                heapq.heappush(heap, (PRIORITY_RANK[task.priority], -room, self.start[task_id], sequence, task_id))
+
+        moved: List[TaskShift] = []
+        while heap:
+            _, negative_room, start, _, task_id = heapq.heappop(heap)
+            users = self.assignments[task_id]
+            current = self._days(task_id, start)
+            # Earlier shifts may already have cleared this task's days.
+            if not any(self._overloaded(user_id, current) for user_id, _ in users):
+                continue
+            for offset in range(1, -negative_room + 1):
+                if self._fits(task_id, start + offset, current):
+                    self._apply(task_id, start, -1.0)
+                    self._apply(task_id, start + offset, 1.0)
+                    self.start[task_id] = start + offset
+                    self.shifts[task_id] = self.shifts.get(task_id, 0) + offset
+                    moved.append(self._shift(task_id, self.shifts[task_id]))
+                    break
+        return moved
+
+    def _shift(self, task_id: str, offset: int) -> TaskShift:
+        task = self.tasks[task_id]
+        delta = timedelta(days=offset)
+        return TaskShift(task_id, offset, task.planned_start_date + delta, task.planned_end_date + delta)
+
+    def rescheduled(self) -> List[TaskShift]:
+        """Net shift of every task moved so far, against its original planned dates."""
+        return [self._shift(task_id, shift) for task_id, shift in self.shifts.items()]
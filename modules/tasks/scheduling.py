@@ -0,0 +1,358 @@
+import heapq
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from dataclasses import dataclass
+
+from modules.tasks.models import Task, TaskDependency, DependencyType
+
+FINISH_TO_START = 0
+START_TO_START = 1
+FINISH_TO_FINISH = 2
+START_TO_FINISH = 3
+
+DEPENDENCY_CODES = {
+    DependencyType.FINISH_TO_START: FINISH_TO_START,
+    DependencyType.START_TO_START: START_TO_START,
+    DependencyType.FINISH_TO_FINISH: FINISH_TO_FINISH,
+    DependencyType.START_TO_FINISH: START_TO_FINISH,
+}
+
+class ScheduleCycleError(ValueError):
+    def __init__(self, task_ids: Sequence[str]):
+        self.task_ids = list(task_ids)
+        super().__init__("task dependencies form a cycle: " + " -> ".join(self.task_ids))
+
+@dataclass
+class TaskSchedule:
+    task_id: str
+    duration_days: int
+    early_start: datetime
+    early_finish: datetime
+    late_start: datetime
+    late_finish: datetime
+    total_float: int
+    free_float: int
+    is_critical: bool
+
+def task_duration_days(task: Task) -> int:
+    return max(0, (task.planned_end_date - task.planned_start_date).days)
+
+class CriticalPathScheduler:
+    """Forward/backward pass CPM over FS/SS/FF/SF links with lag.
+
+    Early dates are day offsets from project_start. Late dates are kept as the
+    distance from the project finish (``tail``), which does not depend on the
+    finish itself, so edits only ever touch the graph downstream (early dates)
+    or upstream (late dates) of the change.
+    """
+
+    def __init__(self, tasks: Sequence[Task], dependencies: Iterable[TaskDependency],
+                 project_start: Optional[datetime] = None):
+        self.ids: List[str] = [task.id for task in tasks]
+        self.index: Dict[str, int] = {task_id: i for i, task_id in enumerate(self.ids)}
+        if len(self.index) != len(self.ids):
+            raise ValueError("duplicate task ids in schedule")
+        if project_start is None:
+            project_start = min((task.planned_start_date for task in tasks), default=datetime.min)
+        self.project_start = project_start
+
+        size = len(self.ids)
+        self.duration = array('l', (task_duration_days(task) for task in tasks))
+        self.early_start = array('l', bytes(array('l').itemsize * size))
+        self.early_finish = array('l', bytes(array('l').itemsize * size))
+        self.tail = array('l', bytes(array('l').itemsize * size))
+        self.predecessors: List[List[Tuple[int, int, int, str]]] = [[] for _ in range(size)]
+        self.successors: List[List[Tuple[int, int, int, str]]] = [[] for _ in range(size)]
+        self.edges: Dict[str, Tuple[int, int, int, int]] = {}
+        for dependency in dependencies:
+            self._link(dependency)
+
+        self.order: List[int] = self._topological_order()
+        self.position = array('l', bytes(array('l').itemsize * size))
+        for rank, node in enumerate(self.order):
+            self.position[node] = rank
+        self._forward_pass()
+        self._backward_pass()
+
+    def _link(self, dependency: TaskDependency) -> Tuple[int, int]:
+        if dependency.id in self.edges:
+            raise ValueError(f"dependency {dependency.id} is already scheduled")
+        try:
+            pred = self.index[dependency.predecessor_task_id]
+            succ = self.index[dependency.successor_task_id]
+        except KeyError as exc:
+            raise ValueError(f"dependency {dependency.id} references unknown task {exc.args[0]}") from None
+        self._attach(dependency.id, pred, succ, DEPENDENCY_CODES[dependency.dependency_type], dependency.lag_days)
+        return pred, succ
+
+    def _attach(self, dependency_id: str, pred: int, succ: int, code: int, lag: int) -> None:
+        self.edges[dependency_id] = (pred, succ, code, lag)
+        self.predecessors[succ].append((pred, code, lag, dependency_id))
+        self.successors[pred].append((succ, code, lag, dependency_id))
+
+    def _unlink(self, dependency_id: str) -> Tuple[int, int]:
+        pred, succ, _, _ = self.edges.pop(dependency_id)
+        self.predecessors[succ] = [edge for edge in self.predecessors[succ] if edge[3] != dependency_id]
+        self.successors[pred] = [edge for edge in self.successors[pred] if edge[3] != dependency_id]
+        return pred, succ
+
+    def _topological_order(self) -> List[int]:
+        indegree = [len(preds) for preds in self.predecessors]
+        ready = [node for node, count in enumerate(indegree) if count == 0]
+        order = []
+        while ready:
+            node = ready.pop()
+            order.append(node)
+            for succ, _, _, _ in self.successors[node]:
+                indegree[succ] -= 1
+                if indegree[succ] == 0:
+                    ready.append(succ)
+        if len(order) != len(self.ids):
+            raise ScheduleCycleError(self._find_cycle({n for n, c in enumerate(indegree) if c > 0}))
+        return order
+
+    def _find_cycle(self, candidates: Set[int]) -> List[str]:
+        node = next(iter(candidates))
+        seen: Dict[int, int] = {}
+        path: List[int] = []
+        while node not in seen:
+            seen[node] = len(path)
+            path.append(node)
+            node = next(pred for pred, _, _, _ in self.predecessors[node] if pred in candidates)
+        cycle = path[seen[node]:]
+        cycle.reverse()
+        return [self.ids[n] for n in cycle + cycle[:1]]
+
+    def _start_of(self, node: int) -> int:
+        start = 0
+        duration = self.duration[node]
+        early_start, early_finish = self.early_start, self.early_finish
+        for pred, code, lag, _ in self.predecessors[node]:
+            if code == FINISH_TO_START:
+                bound = early_finish[pred] + lag
+            elif code == START_TO_START:
+                bound = early_start[pred] + lag
+            elif code == FINISH_TO_FINISH:
+                bound = early_finish[pred] + lag - duration
+            else:
+                bound = early_start[pred] + lag - duration
+            if bound > start:
+                start = bound
+        return start
+
+    def _tail_of(self, node: int) -> int:
+        tail = 0
+        duration, tails = self.duration, self.tail
+        own = duration[node]
+        for succ, code, lag, _ in self.successors[node]:
+            if code == FINISH_TO_START:
+                bound = tails[succ] + duration[succ] + lag
+            elif code == START_TO_START:
+                bound = tails[succ] + duration[succ] + lag - own
+            elif code == FINISH_TO_FINISH:
+                bound = tails[succ] + lag
+            else:
+                bound = tails[succ] + lag - own
+            if bound > tail:
+                tail = bound
+        return tail
+
+    def _forward_pass(self) -> None:
+        for node in self.order:
+            start = self._start_of(node)
+            self.early_start[node] = start
+            self.early_finish[node] = start + self.duration[node]
+
+    def _backward_pass(self) -> None:
+        for node in reversed(self.order):
+            self.tail[node] = self._tail_of(node)
+
+    def _propagate(self, forward: Iterable[int], backward: Iterable[int]) -> Set[int]:
+        changed: Set[int] = set()
+        position = self.position
+
+        heap = list({position[node] for node in forward})
+        heapq.heapify(heap)
+        queued = set(heap)
+        while heap:
+            rank = heapq.heappop(heap)
+            node = self.order[rank]
+            start = self._start_of(node)
+            finish = start + self.duration[node]
+            if start == self.early_start[node] and finish == self.early_finish[node]:
+                continue
+            self.early_start[node] = start
+            self.early_finish[node] = finish
+            changed.add(node)
+            for succ, _, _, _ in self.successors[node]:
+                if position[succ] not in queued:
+                    queued.add(position[succ])
+                    heapq.heappush(heap, position[succ])
+
+        heap = list({-position[node] for node in backward})
+        heapq.heapify(heap)
+        queued = set(heap)
+        while heap:
+            node = self.order[-heapq.heappop(heap)]
+            tail = self._tail_of(node)
+            if tail == self.tail[node]:
+                continue
+            self.tail[node] = tail
+            changed.add(node)
+            for pred, _, _, _ in self.predecessors[node]:
+                if -position[pred] not in queued:
+                    queued.add(-position[pred])
+                    heapq.heappush(heap, -position[pred])
+        return changed
+
+    def _cycle_through(self, pred: int, last: int, reached_from: Dict[int, int]) -> List[str]:
+        """pred -> succ -> ... -> last -> pred, walking the forward search's parent links back from ``last``."""
+        path = []
+        while last != -1:
+            path.append(last)
+            last = reached_from[last]
+        path.reverse()
+        cycle = path if path[0] == pred else [pred] + path
+        return [self.ids[node] for node in cycle + cycle[:1]]
+
+    def _reorder(self, pred: int, succ: int) -> None:
+        # Pearce-Kelly: only the nodes between the two ranks are renumbered.
+        lower, upper = self.position[succ], self.position[pred]
+        if lower > upper:
+            return
+        forward, stack, reached_from = [], [succ], {succ: -1}
+        while stack:
+            node = stack.pop()
+            forward.append(node)
+            for nxt, _, _, _ in self.successors[node]:
+                if nxt == pred:
+                    raise ScheduleCycleError(self._cycle_through(pred, node, reached_from))
+                if nxt not in reached_from and self.position[nxt] <= upper:
+                    reached_from[nxt] = node
+                    stack.append(nxt)
+        backward, stack, seen = [], [pred], {pred}
+        while stack:
+            node = stack.pop()
+            backward.append(node)
+            for prv, _, _, _ in self.predecessors[node]:
+                if prv not in seen and self.position[prv] >= lower:
+                    seen.add(prv)
+                    stack.append(prv)
+        backward.sort(key=self.position.__getitem__)
+        forward.sort(key=self.position.__getitem__)
+        nodes = backward + forward
+        for rank, node in zip(sorted(self.position[node] for node in nodes), nodes):
+            self.position[node] = rank
+            self.order[rank] = node
+
+    def set_duration(self, task_id: str, duration_days: int) -> List[str]:
+        node = self.index[task_id]
+        self.duration[node] = max(0, duration_days)
+        changed = self._propagate([node], [node] + [pred for pred, _, _, _ in self.predecessors[node]])
+        changed.add(node)
+        return self._task_ids(changed)
+
+    def update_task(self, task: Task) -> List[str]:
+        return self.set_duration(task.id, task_duration_days(task))
+
+    def add_dependency(self, dependency: TaskDependency) -> List[str]:
+        pred, succ = self._link(dependency)
+        try:
+            self._reorder(pred, succ)
+        except ScheduleCycleError:
+            self._unlink(dependency.id)
+            raise
+        return self._task_ids(self._propagate([succ], [pred]))
+
+    def remove_dependency(self, dependency_id: str) -> List[str]:
+        pred, succ = self._unlink(dependency_id)
+        return self._task_ids(self._propagate([succ], [pred]))
+
+    def update_dependency(self, dependency: TaskDependency) -> List[str]:
+        previous = self.edges[dependency.id]
+        pred, succ = self._unlink(dependency.id)
+        try:
+            changed = set(self.add_dependency(dependency))
+        except (ScheduleCycleError, ValueError):
+            self._attach(dependency.id, *previous)
+            raise
+        changed.update(self._task_ids(self._propagate([succ], [pred])))
+        return sorted(changed, key=lambda task_id: self.position[self.index[task_id]])
+
+    def _task_ids(self, nodes: Iterable[int]) -> List[str]:
+        return [self.ids[node] for node in sorted(nodes, key=self.position.__getitem__)]
+
+    def finish_for_durations(self, durations: Sequence[float]) -> float:
+        """Project finish offset for alternative durations, without touching the schedule."""
+        starts = [0.0] * len(durations)
+        finishes = [0.0] * len(durations)
+        predecessors = self.predecessors
+        for node in self.order:
+            start = 0.0
+            duration = durations[node]
+            for pred, code, lag, _ in predecessors[node]:
+                if code == FINISH_TO_START:
+                    bound = finishes[pred] + lag
+                elif code == START_TO_START:
+                    bound = starts[pred] + lag
+                elif code == FINISH_TO_FINISH:
+                    bound = finishes[pred] + lag - duration
+                else:
+                    bound = starts[pred] + lag - duration
+                if bound > start:
+                    start = bound
+            starts[node] = start
+            finishes[node] = start + duration
+        return max(finishes, default=0.0)
+
+    @property
+    def finish_offset(self) -> int:
+        return max(self.early_finish, default=0)
+
+    @property
+    def project_finish(self) -> datetime:
+        return self.project_start + timedelta(days=self.finish_offset)
+
+    def total_float(self, node: int) -> int:
+        late_finish = self.finish_offset - self.tail[node]
+        return late_finish - self.early_finish[node]
+
+    def free_float(self, node: int) -> int:
+        early_start, early_finish = self.early_start, self.early_finish
+        slack = self.finish_offset - early_finish[node]
+        for succ, code, lag, _ in self.successors[node]:
+            if code == FINISH_TO_START:
+                gap = early_start[succ] - lag - early_finish[node]
+            elif code == START_TO_START:
+                gap = early_start[succ] - lag - early_start[node]
+            elif code == FINISH_TO_FINISH:
+                gap = early_finish[succ] - lag - early_finish[node]
+            else:
+                gap = early_finish[succ] - lag - early_start[node]
+            if gap < slack:
+                slack = gap
+        return slack
+
+    def schedule_for(self, task_id: str) -> TaskSchedule:
+        node = self.index[task_id]
+        start = self.project_start
+        late_finish = self.finish_offset - self.tail[node]
+        total_float = late_finish - self.early_finish[node]
+        return TaskSchedule(
+            task_id=task_id,
+            duration_days=self.duration[node],
+            early_start=start + timedelta(days=self.early_start[node]),
+            early_finish=start + timedelta(days=self.early_finish[node]),
+            late_start=start + timedelta(days=late_finish - self.duration[node]),
+            late_finish=start + timedelta(days=late_finish),
+            total_float=total_float,
+            free_float=self.free_float(node),
+            is_critical=total_float <= 0,
+        )
+
+    def schedules(self) -> List[TaskSchedule]:
+        return [self.schedule_for(self.ids[node]) for node in self.order]
+
+    def critical_path(self) -> List[str]:
+        return [self.ids[node] for node in self.order if self.total_float(node) <= 0]
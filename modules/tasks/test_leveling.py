@@ -0,0 +1,69 @@
+from datetime import date, datetime, timedelta
+
+from modules.projects.models import ProjectSettings
+from modules.tasks.leveling import ResourceLeveler, TaskShift, free_floats
+from modules.tasks.models import DependencyType, Task, TaskAssignment, TaskDependency, TaskPriority, TaskStatus
+from modules.tasks.scheduling import CriticalPathScheduler
+
+START = datetime(2025, 1, 6)  # a Monday
+
+def _task(task_id: str, offset: int, days: int, priority: TaskPriority = TaskPriority.MEDIUM,
+          status: TaskStatus = TaskStatus.NOT_STARTED, project_id: str = "p1") -> Task:
+    start = START + timedelta(days=offset)
+    return Task(task_id, project_id, None, task_id, None, status, priority, start, start + timedelta(days=days),
+                None, None, 0.0, 0.0, 0.0, None, "u", START, START)
+
+def _assign(task_id: str, hours: float, user_id: str = "u1") -> TaskAssignment:
+    return TaskAssignment(f"{task_id}-{user_id}", task_id, user_id, "engineer", hours, None, START, True)
+
+def _settings(project_id: str, working_days, hours: float) -> ProjectSettings:
+    return ProjectSettings(f"s-{project_id}", project_id, "USD", "UTC", list(working_days), hours, False, False)
+
+def test_hours_spread_over_working_days_only():
+    leveler = ResourceLeveler([_task("a", 4, 4), _task("b", 5, 2, project_id="p2")],
+                              [_assign("a", 16), _assign("b", 6)], [_settings("p2", range(7), 10)])
+    assert list(leveler.histogram("u1")) == [8.0, 3.0, 3.0, 8.0]
+    assert leveler.origin == date(2025, 1, 10)
+    assert leveler.capacity == {"u1": 10.0}
+
+def test_weekend_only_task_spreads_over_every_day():
+    leveler = ResourceLeveler([_task("a", 5, 2)], [_assign("a", 8)])
+    assert list(leveler.histogram("u1")) == [4.0, 4.0]
+
+def test_overloads_name_the_tasks_on_each_day():
+    leveler = ResourceLeveler([_task("a", 0, 2), _task("b", 1, 2), _task("done", 0, 2, status=TaskStatus.COMPLETED)],
+                              [_assign("a", 16), _assign("b", 16), _assign("done", 80)])
+    overloads = leveler.overloads()
+    assert [(o.day, o.load_hours, o.capacity_hours, o.task_ids, o.excess_hours) for o in overloads] == [
+        (date(2025, 1, 7), 16.0, 8.0, ["a", "b"], 8.0)]
+
+def test_level_moves_lowest_priority_task_within_its_float():
+    tasks = [_task("a", 0, 2, TaskPriority.HIGH), _task("b", 0, 2, TaskPriority.LOW)]
+    leveler = ResourceLeveler(tasks, [_assign("a", 16), _assign("b", 16)], floats={"a": 5, "b": 5})
+    assert leveler.level() == [TaskShift("b", 2, START + timedelta(days=2), START + timedelta(days=4))]
+    assert leveler.overloads() == []
+    assert list(leveler.histogram("u1"))[:4] == [8.0, 8.0, 8.0, 8.0]
+    assert leveler.level() == []
+    assert leveler.rescheduled() == [TaskShift("b", 2, START + timedelta(days=2), START + timedelta(days=4))]
+
+def test_level_leaves_started_and_float_bound_tasks_in_place():
+    tasks = [_task("a", 0, 2, status=TaskStatus.IN_PROGRESS), _task("b", 0, 2)]
+    leveler = ResourceLeveler(tasks, [_assign("a", 16), _assign("b", 16)], floats={"a": 9, "b": 1})
+    assert leveler.level() == []
+    assert len(leveler.overloads()) == 2
+
+def test_capacity_override_and_shared_assignments():
+    tasks = [_task("a", 0, 1), _task("b", 0, 1)]
+    assignments = [_assign("a", 6), _assign("a", 6, "u2"), _assign("b", 6, "u2")]
+    leveler = ResourceLeveler(tasks, assignments, floats={"a": 3, "b": 3}, capacity={"u2": 12})
+    assert leveler.overloads() == []
+    leveler = ResourceLeveler(tasks, assignments, floats={"a": 3, "b": 3})
+    assert [shift.task_id for shift in leveler.level()] == ["a"]
+    assert (list(leveler.histogram("u1")), list(leveler.histogram("u2"))) == ([0.0, 6.0, 0.0, 0.0],
+                                                                           [6.0, 6.0, 0.0, 0.0])
+
+def test_free_floats_skip_critical_tasks():
+    tasks = [_task("a", 0, 3), _task("b", 0, 1), _task("c", 3, 2)]
+    links = [TaskDependency("ac", "a", "c", DependencyType.FINISH_TO_START, 0, START),
+             TaskDependency("bc", "b", "c", DependencyType.FINISH_TO_START, 0, START)]
+    assert free_floats([CriticalPathScheduler(tasks, links, project_start=START)]) == {"b": 2}
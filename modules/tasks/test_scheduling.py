@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.tasks.models import DependencyType, Task, TaskDependency, TaskPriority, TaskStatus
+from modules.tasks.scheduling import CriticalPathScheduler, ScheduleCycleError
+
+START = datetime(2025, 1, 6)
+
+def _task(task_id: str, days: int) -> Task:
+    return Task(task_id, "p1", None, task_id, None, TaskStatus.NOT_STARTED, TaskPriority.MEDIUM, START,
+                START + timedelta(days=days), None, None, 0.0, 0.0, 0.0, None, "u", START, START)
+
+def _link(link_id: str, pred: str, succ: str, kind=DependencyType.FINISH_TO_START, lag: int = 0) -> TaskDependency:
+    return TaskDependency(link_id, pred, succ, kind, lag, START)
+
+def _chain():
+    tasks = [_task(name, days) for name, days in (("a", 2), ("b", 3), ("c", 4), ("d", 1))]
+    links = [_link("ab", "a", "b"), _link("bc", "b", "c"), _link("cd", "c", "d"), _link("ad", "a", "d", lag=1)]
+    return CriticalPathScheduler(tasks, links, project_start=START)
+
+def _links(scheduler):
+    codes = {0: DependencyType.FINISH_TO_START, 1: DependencyType.START_TO_START,
+             2: DependencyType.FINISH_TO_FINISH, 3: DependencyType.START_TO_FINISH}
+    for link_id, (pred, succ, code, lag) in scheduler.edges.items():
+        yield _link(link_id, scheduler.ids[pred], scheduler.ids[succ], codes[code], lag)
+
+def test_forward_and_backward_pass():
+    scheduler = _chain()
+    assert scheduler.finish_offset == 10
+    assert list(scheduler.early_start) == [0, 2, 5, 9]
+    assert scheduler.total_float(scheduler.index["c"]) == 0
+
+def test_incremental_edits_match_a_fresh_schedule():
+    scheduler = _chain()
+    scheduler.set_duration("b", 6)
+    scheduler.add_dependency(_link("x", "a", "c", DependencyType.START_TO_START, 10))
+    fresh = CriticalPathScheduler([_task("a", 2), _task("b", 6), _task("c", 4), _task("d", 1)],
+                                  list(_links(scheduler)), project_start=START)
+    assert list(scheduler.early_start) == list(fresh.early_start)
+    assert list(scheduler.tail) == list(fresh.tail)
+
+def test_new_link_closing_a_cycle_reports_the_cycle_and_is_rolled_back():
+    scheduler = _chain()
+    with pytest.raises(ScheduleCycleError) as raised:
+        scheduler.add_dependency(_link("dc", "d", "b"))
+    assert raised.value.task_ids == ["d", "b", "c", "d"]
+    assert "dc" not in scheduler.edges
+    with pytest.raises(ScheduleCycleError) as raised:
+        scheduler.add_dependency(_link("cc", "c", "c"))
+    assert raised.value.task_ids == ["c", "c"]
+
+def test_cycle_in_the_initial_graph():
+    with pytest.raises(ScheduleCycleError) as raised:
+        CriticalPathScheduler([_task("a", 1), _task("b", 1)], [_link("ab", "a", "b"), _link("ba", "b", "a")])
+    assert sorted(raised.value.task_ids[:2]) == ["a", "b"]
@@ -0,0 +1,139 @@
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+
+from modules.core.intervals import EffectiveIntervals
+from modules.costing.models import ActualCost, CostStatus, CostType
+from modules.projects.models import ProjectTeamMember
+from modules.timesheets.models import EntryType, LaborRate, Timesheet, TimesheetEntry, TimesheetStatus
+
+CENT = Decimal("0.01")
+
+RateKey = Tuple[str, Optional[str], str]  # user_id, project_id (None for global rates), role
+
+def _effective_day(rate: LaborRate) -> date:
+    return rate.effective_date.date()
+
+def _expiry_day(rate: LaborRate) -> Optional[date]:
+    return None if rate.expiry_date is None else rate.expiry_date.date()
+
+class LaborRateIndex:
+    """LaborRate intervals per (user, project, role), bisected on effective date.
+
+    Each rate is in force until its expiry or the next rate's effective date,
+    so resolving the rate for an entry is O(log n) in the rate history, and an
+    expired rate never hands back to the one it replaced.
+    """
+
+    def __init__(self, rates: Iterable[LaborRate]):
+        self._intervals: Dict[RateKey, EffectiveIntervals[LaborRate]] = {}
+        for rate in rates:
+            if not rate.is_active:
+                continue
+            key = (rate.user_id, rate.project_id, rate.role)
+            intervals = self._intervals.get(key)
+            if intervals is None:
+                intervals = self._intervals[key] = EffectiveIntervals(_effective_day, _expiry_day)
+            intervals.add(rate)
+
+    def _find(self, key: RateKey, day: date) -> Optional[LaborRate]:
+        intervals = self._intervals.get(key)
+        return None if intervals is None else intervals.at(day)
+
+    def lookup(self, user_id: str, project_id: Optional[str], role: str, day: date) -> Optional[LaborRate]:
+        rate = self._find((user_id, project_id, role), day) if project_id is not None else None
+        return rate if rate is not None else self._find((user_id, None, role), day)
+
+def roles_from_team(members: Iterable[ProjectTeamMember]) -> Dict[Tuple[str, str], str]:
+    return {(member.user_id, member.project_id): member.role for member in members if member.is_active}
+
+@dataclass
+class PostingError:
+    timesheet_id: str
+    entry_id: str
+    reason: str
+
+class TimesheetCostPoster:
+    """Turns approved timesheet entries into LABOR ActualCost rows, in chunks."""
+
+    def __init__(self, rates: LaborRateIndex, roles: Dict[Tuple[str, str], str],
+                 cost_centers: Dict[str, str], cost_codes: Dict[Tuple[str, str], str],
+                 default_cost_codes: Dict[str, str], created_by: str, chunk_size: int = 10_000):
+        self.rates = rates
+        self.roles = roles
+        self.cost_centers = cost_centers
+        self.cost_codes = cost_codes
+        self.default_cost_codes = default_cost_codes
+        self.created_by = created_by
+        self.chunk_size = chunk_size
+        self.errors: List[PostingError] = []
+        # Payroll runs repeat the same user/day and hours/rate pairs heavily.
+        self._rates: Dict[Tuple[str, str, date], Optional[LaborRate]] = {}
+        self._amounts: Dict[Tuple[float, float], Decimal] = {}
+
+    def _cost(self, timesheet: Timesheet, entry: TimesheetEntry, posted_at: datetime) -> Optional[ActualCost]:
+        def fail(reason: str) -> None:
+            self.errors.append(PostingError(timesheet.id, entry.id, reason))
+
+        project_id = timesheet.project_id
+        role = self.roles.get((timesheet.user_id, project_id))
+        if role is None:
+            return fail(f"user {timesheet.user_id} has no role on project {project_id}")
+        rate_key = (timesheet.user_id, project_id, entry.entry_date)
+        if rate_key in self._rates:
+            rate = self._rates[rate_key]
+        else:
+            rate = self._rates[rate_key] = self.rates.lookup(timesheet.user_id, project_id, role, entry.entry_date)
+        if rate is None:
+            return fail(f"no {role} labor rate for user {timesheet.user_id} on {entry.entry_date}")
+        cost_center_id = self.cost_centers.get(project_id)
+        if cost_center_id is None:
+            return fail(f"project {project_id} has no labor cost center")
+        cost_code_id = (self.cost_codes.get((project_id, entry.cost_code)) if entry.cost_code
+                        else self.default_cost_codes.get(project_id))
+        if cost_code_id is None:
+            return fail(f"unknown cost code {entry.cost_code!r} for project {project_id}")
+
+        hourly = rate.overtime_rate if entry.entry_type is EntryType.OVERTIME else rate.regular_rate
+        amount = self._amounts.get((entry.hours, hourly))
+        if amount is None:
+            amount = (Decimal(repr(entry.hours)) * Decimal(repr(hourly))).quantize(CENT, rounding=ROUND_HALF_UP)
+            self._amounts[entry.hours, hourly] = amount
+        return ActualCost(
+            id=str(uuid.uuid4()),
+            project_id=project_id,
+            cost_center_id=cost_center_id,
+            cost_code_id=cost_code_id,
+            wbs_node_id=entry.wbs_node_id,
+            task_id=entry.task_id,
+            cost_type=CostType.LABOR,
+            cost_status=CostStatus.ACTUAL,
+            amount=amount,
+            cost_date=datetime.combine(entry.entry_date, time()),
+            reference_number=entry.id,
+            reference_type="Timesheet",
+            description=f"{entry.entry_type.value} {entry.hours}h @ {hourly}",
+            created_by=self.created_by,
+            created_at=posted_at,
+        )
+
+    def post(self, timesheets: Iterable[Timesheet], entries: Iterable[TimesheetEntry]) -> Iterator[List[ActualCost]]:
+        self.errors = []
+        approved = {sheet.id: sheet for sheet in timesheets if sheet.status is TimesheetStatus.APPROVED}
+        posted_at = datetime.now()
+        chunk: List[ActualCost] = []
+        for entry in entries:
+            timesheet = approved.get(entry.timesheet_id)
+            if timesheet is None or not entry.hours:
+                continue
+            cost = self._cost(timesheet, entry, posted_at)
+            if cost is None:
+                continue
+            chunk.append(cost)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
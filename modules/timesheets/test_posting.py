@@ -0,0 +1,37 @@
+from datetime import date, datetime
+
+from modules.timesheets.models import EntryType, LaborRate, Timesheet, TimesheetEntry, TimesheetStatus
+from modules.timesheets.posting import LaborRateIndex, TimesheetCostPoster
+
+NOW = datetime(2025, 1, 1)
+
+def _rate(rate_id: str, regular: float, start: datetime, expiry=None, project_id="p1") -> LaborRate:
+    return LaborRate(rate_id, "u1", project_id, "fitter", regular, regular * 1.5, start, expiry, True)
+
+def test_expired_rate_does_not_fall_back_to_the_rate_it_replaced():
+    index = LaborRateIndex([
+        _rate("old", 40.0, datetime(2024, 1, 1)),
+        _rate("new", 50.0, datetime(2024, 6, 1), expiry=datetime(2024, 12, 31)),
+    ])
+    assert index.lookup("u1", "p1", "fitter", date(2023, 12, 31)) is None
+    assert index.lookup("u1", "p1", "fitter", date(2024, 5, 31)).id == "old"
+    assert index.lookup("u1", "p1", "fitter", date(2024, 6, 1)).id == "new"
+    assert index.lookup("u1", "p1", "fitter", date(2024, 12, 31)).id == "new"
+    assert index.lookup("u1", "p1", "fitter", date(2025, 1, 1)) is None
+
+def test_project_rate_gap_uses_the_global_rate():
+    index = LaborRateIndex([
+        _rate("project", 50.0, datetime(2024, 1, 1), expiry=datetime(2024, 6, 30)),
+        _rate("global", 30.0, datetime(2020, 1, 1), project_id=None),
+    ])
+    assert index.lookup("u1", "p1", "fitter", date(2024, 3, 1)).id == "project"
+    assert index.lookup("u1", "p1", "fitter", date(2024, 7, 1)).id == "global"
+
+def test_errors_are_reset_per_run():
+    poster = TimesheetCostPoster(LaborRateIndex([]), {("u1", "p1"): "fitter"}, {"p1": "cc"}, {}, {"p1": "code"}, "sys")
+    sheet = Timesheet("t1", "u1", "p1", date(2025, 1, 5), TimesheetStatus.APPROVED, 8.0, 0.0,
+                      None, None, None, None, NOW, NOW)
+    entry = TimesheetEntry("e1", "t1", None, None, date(2025, 1, 2), EntryType.REGULAR, 8.0, None, True, None, NOW)
+    for _ in range(2):
+        assert list(poster.post([sheet], [entry])) == []
+        assert [error.entry_id for error in poster.errors] == ["e1"]
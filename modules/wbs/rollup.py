@@ -0,0 +1,151 @@
+from array import array
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from modules.wbs.models import WBSNode
+
+class WBSTreeError(ValueError):
+    pass
+
+class WBSTree:
+    """Flat, breadth-first view of a WBS: every parent precedes its children and
+    each level occupies a contiguous slice of the arrays."""
+
+    def __init__(self, nodes: Sequence[WBSNode]):
+        by_id: Dict[str, WBSNode] = {}
+        for node in nodes:
+            if node.id in by_id:
+                raise WBSTreeError(f"duplicate WBS node id {node.id}")
+            by_id[node.id] = node
+
+        children: Dict[Optional[str], List[WBSNode]] = {}
+        for node in nodes:
+            if node.parent_id is not None and node.parent_id not in by_id:
+                raise WBSTreeError(f"WBS node {node.id} references unknown parent {node.parent_id}")
+            children.setdefault(node.parent_id, []).append(node)
+        for siblings in children.values():
+            siblings.sort(key=lambda n: (n.sequence_order, n.code))
+
+        self.nodes: List[WBSNode] = []
+        self.parent = array('l')
+        self.level = array('l')
+        self.sequence_order = array('l')
+        self.child_count = array('l')
+        self.level_offsets: List[int] = [0]
+
+        frontier = [(node, -1) for node in children.get(None, [])]
+        depth = 0
+        while frontier:
+            next_frontier = []
+            for node, parent_index in frontier:
+                position = len(self.nodes)
+                self.nodes.append(node)
+                self.parent.append(parent_index)
+                self.level.append(depth)
+                self.sequence_order.append(node.sequence_order)
+                kids = children.get(node.id, ())
+                self.child_count.append(len(kids))
+                next_frontier.extend((kid, position) for kid in kids)
+            self.level_offsets.append(len(self.nodes))
+            frontier = next_frontier
+            depth += 1
+
+        if len(self.nodes) != len(by_id):
+            reached = {node.id for node in self.nodes}
+            stuck = sorted(node_id for node_id in by_id if node_id not in reached)
+            raise WBSTreeError(f"WBS parent links form a cycle through {', '.join(stuck[:10])}")
+
+        # Siblings are laid out contiguously, so a node's children are [first_child, first_child + child_count).
+        self.first_child = array('l', [-1]) * len(self.nodes)
+        for position in range(len(self.nodes) - 1, -1, -1):
+            if self.parent[position] >= 0:
+                self.first_child[self.parent[position]] = position
+
+        self.ids: List[str] = [node.id for node in self.nodes]
+        self.index: Dict[str, int] = {node_id: i for i, node_id in enumerate(self.ids)}
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def depth(self) -> int:
+        return len(self.level_offsets) - 1
+
+    def is_leaf(self, position: int) -> bool:
+        return self.child_count[position] == 0
+
+    def children(self, position: int) -> range:
+        first = self.first_child[position]
+        return range(first, first + self.child_count[position]) if first >= 0 else range(0)
+
+    def ancestors(self, position: int) -> List[int]:
+        chain = []
+        position = self.parent[position]
+        while position >= 0:
+            chain.append(position)
+            position = self.parent[position]
+        return chain
+
+    def rollup(self, leaf_values: Sequence[float]) -> array:
+        """Sum leaf values into every ancestor, deepest level first."""
+        totals = array('d', (value if count == 0 else 0.0
+                             for value, count in zip(leaf_values, self.child_count)))
+        parent = self.parent
+        for depth in range(self.depth - 1, 0, -1):
+            for position in range(self.level_offsets[depth], self.level_offsets[depth + 1]):
+                totals[parent[position]] += totals[position]
+        return totals
+
+class WBSRollup:
+    """Maintains rolled-up budget_allocation and planned_hours for a WBS."""
+
+    FIELDS = ('budget_allocation', 'planned_hours')
+
+    def __init__(self, nodes: Sequence[WBSNode], fields: Sequence[str] = FIELDS):
+        self.tree = WBSTree(nodes)
+        self.fields = tuple(fields)
+        self.totals: Dict[str, array] = {
+            field: self.tree.rollup([getattr(node, field) for node in self.tree.nodes])
+            for field in self.fields
+        }
+
+    def total(self, node_id: str, field: str) -> float:
+        return self.totals[field][self.tree.index[node_id]]
+
+    def apply(self, positions: Optional[Iterable[int]] = None) -> int:
+        """Write rolled-up totals onto the summary nodes (all of them, or those at ``positions``)."""
+        changed = 0
+        nodes = self.tree.nodes
+        for position in range(len(nodes)) if positions is None else positions:
+            if self.tree.is_leaf(position):
+                continue
+            node = nodes[position]
+            for field in self.fields:
+                value = self.totals[field][position]
+                if getattr(node, field) != value:
+                    setattr(node, field, value)
+                    changed += 1
+        return changed
+
+    def update_leaf(self, node_id: str, **values: float) -> List[str]:
+        position = self.tree.index[node_id]
+        if not self.tree.is_leaf(position):
+            raise WBSTreeError(f"WBS node {node_id} is not a leaf; its totals are derived")
+        unknown = set(values) - set(self.fields)
+        if unknown:
+            raise WBSTreeError(f"unknown rollup fields: {', '.join(sorted(unknown))}")
+
+        node = self.tree.nodes[position]
+        ancestors = self.tree.ancestors(position)
+        for field, value in values.items():
+            totals = self.totals[field]
+            totals[position] = value
+            setattr(node, field, value)
+            # Re-summing each ancestor's children, in rollup() order, keeps totals identical to a full rollup
+            # where running deltas would drift.
+            for ancestor in ancestors:
+                total = 0.0
+                for child in self.tree.children(ancestor):
+                    total += totals[child]
+                totals[ancestor] = total
+        self.apply(ancestors)
+        return [self.tree.ids[ancestor] for ancestor in ancestors]
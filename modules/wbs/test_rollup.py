@@ -0,0 +1,49 @@
+import random
+from datetime import datetime
+
+import pytest
+
+from modules.wbs.models import WBSNode, WBSNodeType
+from modules.wbs.rollup import WBSRollup, WBSTree, WBSTreeError
+
+NOW = datetime(2025, 1, 1)
+
+def _node(node_id: str, parent_id=None, budget: float = 0.0, hours: float = 0.0, order: int = 0) -> WBSNode:
+    return WBSNode(node_id, "p1", parent_id, node_id, node_id, None, WBSNodeType.WORK_PACKAGE, 0, order,
+                   budget, hours, None, None, None, True, NOW, NOW)
+
+def _random_tree(size: int, rng: random.Random):
+    nodes = [_node("n0"), _node("m0")]
+    for i in range(1, size):
+        parent = rng.choice(nodes)
+        nodes.append(_node(f"n{i}", parent.id, rng.uniform(0, 1e6), rng.uniform(0, 1e3), rng.randrange(5)))
+    return nodes
+
+def test_update_leaf_matches_a_full_rollup_exactly():
+    rng = random.Random(1)
+    nodes = _random_tree(300, rng)
+    rollup = WBSRollup(nodes)
+    leaves = [rollup.tree.ids[p] for p in range(len(rollup.tree)) if rollup.tree.is_leaf(p)]
+    for _ in range(2000):
+        rollup.update_leaf(rng.choice(leaves), budget_allocation=rng.uniform(0, 1e6) / 3)
+    fresh = WBSRollup(nodes)
+    assert list(rollup.totals["budget_allocation"]) == list(fresh.totals["budget_allocation"])
+    assert fresh.apply() == 0
+
+def test_summary_nodes_change_only_through_apply():
+    nodes = [_node("root"), _node("a", "root", 10.0, 1.0), _node("b", "root", 5.0, 2.0, order=1)]
+    rollup = WBSRollup(nodes)
+    assert nodes[0].budget_allocation == 0.0
+    assert rollup.apply() == 2
+    assert (nodes[0].budget_allocation, nodes[0].planned_hours) == (15.0, 3.0)
+    assert rollup.update_leaf("a", planned_hours=4.0) == ["root"]
+    assert nodes[0].planned_hours == 6.0
+    with pytest.raises(WBSTreeError):
+        rollup.update_leaf("root", planned_hours=1.0)
+
+def test_tree_layout_and_cycles():
+    tree = WBSTree([_node("r"), _node("c2", "r", order=2), _node("c1", "r", order=1), _node("g", "c2")])
+    assert tree.ids == ["r", "c1", "c2", "g"]
+    assert [tree.ids[p] for p in tree.children(0)] == ["c1", "c2"]
+    with pytest.raises(WBSTreeError):
+        WBSTree([_node("x", "y"), _node("y", "x")])